@@ -0,0 +1,11 @@
+from django.apps import AppConfig
+from django.db.backends.signals import connection_created
+
+class CoreConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'clever_assignment.core'
+
+    def ready(self):
+        from . import checks  # noqa: F401
+        from .metrics import install_query_counter
+        connection_created.connect(install_query_counter)
@@ -0,0 +1,267 @@
+"""
+Native async read path for DRF views under ASGI.
+
+`AsyncReadView` is a plain async Django view that drives an instance of an
+existing DRF view through the request cycle: content negotiation,
+authentication, permissions, throttling, filtering, pagination,
+serialization, conditional GET and the response cache all reuse the DRF
+view's configuration, while every I/O step uses the async ORM and cache API
+(`aget`, `acount`, async iteration, `aaggregate`, `cache.aget`). Other
+methods (writes, OPTIONS) are delegated to the synchronous DRF view.
+
+Enabled with the ASYNC_READ_API setting (see the photo and photographer URLs).
+"""
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import Http404, HttpResponse
+from django.views import View
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+from rest_framework.throttling import SimpleRateThrottle
+
+from .cache import CachedResponseMixin, aget_generation, cache
+from .conditional import ConditionalGetMixin
+
+
+async def aauthenticate(request):
+    """
+    Authenticate a DRF request. Authenticators providing `aauthenticate` are
+    awaited; others run in a thread.
+    """
+    for authenticator in request.authenticators:
+        if hasattr(authenticator, 'aauthenticate'):
+            user_auth = await authenticator.aauthenticate(request)
+        else:
+            user_auth = await sync_to_async(authenticator.authenticate)(request)
+        if user_auth is not None:
+            request._authenticator = authenticator
+            request.user, request.auth = user_auth
+            return
+    request._authenticator = None
+    request._not_authenticated()
+
+
+async def aallow_request(throttle, request, view):
+    """
+    Async variant of SimpleRateThrottle.allow_request using the async cache
+    API. Throttles that override allow_request run in a thread.
+    """
+    if type(throttle).allow_request is not SimpleRateThrottle.allow_request:
+        return await sync_to_async(throttle.allow_request)(request, view)
+    if throttle.rate is None:
+        return True
+    throttle.key = throttle.get_cache_key(request, view)
+    if throttle.key is None:
+        return True
+    throttle.history = await throttle.cache.aget(throttle.key, [])
+    throttle.now = throttle.timer()
+    while throttle.history and throttle.history[-1] <= throttle.now - throttle.duration:
+        throttle.history.pop()
+    if len(throttle.history) >= throttle.num_requests:
+        return throttle.throttle_failure()
+    throttle.history.insert(0, throttle.now)
+    await throttle.cache.aset(throttle.key, throttle.history, throttle.duration)
+    return True
+
+
+class AsyncReadView(View):
+    """
+    Serve GET/HEAD for `view_class` (a DRF generic view or viewset) natively
+    async; `actions` maps methods to viewset actions, as in
+    `ViewSet.as_view(actions)`. Only JSON is rendered on the async path
+    because the browsable API renders forms with synchronous queries.
+    """
+    view_class = None
+    actions = None
+    view_initkwargs = {}
+    renderer_classes = [JSONRenderer]
+    sync_view = None
+    http_method_names = ['get', 'head', 'post', 'put', 'patch', 'delete', 'options']
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        view_initkwargs = initkwargs.get('view_initkwargs', cls.view_initkwargs)
+        if cls.actions:
+            sync_view = cls.view_class.as_view(cls.actions, **view_initkwargs)
+        else:
+            sync_view = cls.view_class.as_view(**view_initkwargs)
+        view = super().as_view(sync_view=sync_view, **initkwargs)
+        # Like DRF views: authentication is token based, writes are delegated.
+        view.csrf_exempt = True
+        return view
+
+    async def get(self, request, *args, **kwargs):
+        view = self.get_api_view(request, *args, **kwargs)
+        drf_request = view.initialize_request(request, *args, **kwargs)
+        view.request = drf_request
+        view.headers = view.default_response_headers
+        try:
+            await self.initial(view, drf_request, *args, **kwargs)
+            if self.get_action() == 'retrieve':
+                response = await self.retrieve(view, drf_request)
+            else:
+                response = await self.list(view, drf_request)
+        except Exception as exc:
+            response = view.handle_exception(exc)
+        response = view.finalize_response(drf_request, response, *args, **kwargs)
+        if not isinstance(response, Response):
+            return response
+        rendered = self.render(response)
+        key = getattr(response, 'cache_key', None)
+        if key is not None and rendered.status_code == 200:
+            await cache.aset(key, view.cache_entry(rendered), settings.RESPONSE_CACHE_TIMEOUT)
+        return rendered
+
+    async def delegate(self, request, *args, **kwargs):
+        """
+        Run the synchronous DRF view for methods without an async handler.
+        """
+        return await sync_to_async(self.sync_view)(request, *args, **kwargs)
+
+    post = put = patch = delete = options = delegate
+
+    def get_action(self):
+        return self.actions['get'] if self.actions else None
+
+    def get_api_view(self, request, *args, **kwargs):
+        """
+        Instantiate the DRF view the way its as_view() would.
+        """
+        view = self.view_class(**self.view_initkwargs)
+        if self.actions:
+            view.action_map = {**self.actions, 'head': self.actions['get']}
+            view.action = self.get_action()
+        view.renderer_classes = self.renderer_classes
+        view.args, view.kwargs = args, kwargs
+        view.format_kwarg = view.get_format_suffix(**kwargs)
+        return view
+
+    async def initial(self, view, request, *args, **kwargs):
+        """
+        Async counterpart of APIView.initial().
+        """
+        request.accepted_renderer, request.accepted_media_type = view.perform_content_negotiation(request)
+        request.version, request.versioning_scheme = view.determine_version(request, *args, **kwargs)
+        await aauthenticate(request)
+        view.check_permissions(request)
+        durations = []
+        # Checked here too, so disabled throttles cost no thread hop.
+        for throttle in view.get_throttles() if settings.API_THROTTLING else []:
+            if not await aallow_request(throttle, request, view):
+                durations.append(throttle.wait())
+        if durations:
+            view.throttled(request, max([d for d in durations if d is not None], default=None))
+
+    async def list(self, view, request):
+        """
+        Async counterpart of the view's list(), including the response cache
+        and conditional GET when the view uses those mixins.
+        """
+        hit, key = await self.cached(view, request)
+        if hit is not None:
+            return hit
+        validators = None
+        if isinstance(view, ConditionalGetMixin) and view.uses_page_validators(request):
+            queryset = view.filter_queryset(view.get_queryset())
+            page = await view.paginator.apaginate_queryset(queryset, request, view=view)
+            validators = view.get_page_validators(request, page)
+            return await self.respond(view, request, key, validators, lambda: self.page_data(view, page))
+        if isinstance(view, ConditionalGetMixin):
+            aggregated = await view.get_list_queryset().aaggregate(**view.get_list_aggregates())
+            validators = view.get_list_validators(request, aggregated)
+        return await self.respond(view, request, key, validators, lambda: self.list_data(view, request))
+
+    async def retrieve(self, view, request):
+        """
+        Async counterpart of the view's retrieve().
+        """
+        hit, key = await self.cached(view, request)
+        if hit is not None:
+            return hit
+        instance = await self.aget_object(view)
+        validators = None
+        if isinstance(view, ConditionalGetMixin):
+            validators = view.get_validators(request, *view.get_object_state(instance))
+        return await self.respond(view, request, key, validators, lambda: self.retrieve_data(view, instance))
+
+    async def list_data(self, view, request):
+        """
+        Filter, paginate and serialize the list.
+        """
+        queryset = view.filter_queryset(view.get_queryset())
+        paginator = view.paginator
+        if paginator is not None:
+            page = await paginator.apaginate_queryset(queryset, request, view=view)
+            if page is not None:
+                return await self.page_data(view, page)
+        return Response(view.get_serializer([obj async for obj in queryset], many=True).data)
+
+    async def page_data(self, view, page):
+        """
+        Serialize a fetched page.
+        """
+        return view.paginator.get_paginated_response(view.get_serializer(page, many=True).data)
+
+    async def retrieve_data(self, view, instance):
+        """
+        Serialize a single object.
+        """
+        return Response(view.get_serializer(instance).data)
+
+    async def cached(self, view, request):
+        """
+        Return (cached response or None, cache key or None). Hits are
+        answered before any validator query, like CachedResponseMixin.
+        """
+        if not (isinstance(view, CachedResponseMixin) and view.is_cacheable(request)):
+            return None, None
+        generations = [await aget_generation(name) for name in view.cache_generations]
+        key = view.get_cache_key(request, generations)
+        cached = await cache.aget(key)
+        if cached is not None:
+            return view.cached_hit(cached, request), key
+        return None, key
+
+    async def respond(self, view, request, key, validators, get_response):
+        """
+        Answer 304 when the validators match, else build the response by
+        awaiting get_response(), marked for the response cache under key.
+        """
+        if validators is not None:
+            not_modified = view.get_not_modified_response(request, *validators)
+            if not_modified is not None:
+                return not_modified
+
+        response = await get_response()
+        if key is not None:
+            response['X-Cache'] = 'MISS'
+            response.cache_key = key
+        if validators is not None:
+            view.set_validators(response, *validators)
+        return response
+
+    async def aget_object(self, view):
+        """
+        Async counterpart of GenericAPIView.get_object().
+        """
+        queryset = view.filter_queryset(view.get_queryset())
+        lookup_url_kwarg = view.lookup_url_kwarg or view.lookup_field
+        try:
+            instance = await queryset.aget(**{view.lookup_field: view.kwargs[lookup_url_kwarg]})
+        except (queryset.model.DoesNotExist, TypeError, ValueError):
+            # Same outcome as get_object_or_404().
+            raise Http404(f'No {queryset.model._meta.object_name} matches the given query.')
+        view.check_object_permissions(view.request, instance)
+        return instance
+
+    @staticmethod
+    def render(response):
+        """
+        Render a finalized DRF response here, so the ASGI handler does not
+        render it in a thread.
+        """
+        response.render()
+        rendered = HttpResponse(response.content, status=response.status_code)
+        for header, value in response.items():
+            rendered[header] = value
+        return rendered
@@ -0,0 +1,190 @@
+"""
+Helpers for replaying recorded API traffic as a benchmark.
+Used by the `benchmark_api` management command.
+
+A request log is JSON Lines, one request per line:
+
+    {"method": "GET", "path": "/api/v1/photos/?page=2"}
+    {"method": "PATCH", "path": "/api/v1/photos/{{photo_id}}/", "body": {"alt": "x"}, "auth": true}
+
+`name` optionally overrides the endpoint a request is reported under, and
+`{{variable}}` placeholders are filled in from the benchmark context (see
+`load_postman` for the names). The Postman collection can be replayed
+directly as well.
+"""
+import json
+import math
+import re
+from collections import namedtuple
+
+from django.db.models import Q
+
+from clever_assignment.photos.bulk import delete_photos
+from clever_assignment.photos.activity import PhotoCountChanges
+from clever_assignment.photos.facets import apply_deltas, count_photos
+from clever_assignment.photos.models import Photo
+from clever_assignment.photos.variants import expand
+from clever_assignment.photographers.models import Photographer
+from clever_assignment.users.models import User
+
+# Seeded photographers live under this URL, so they can be found and removed.
+SEED_URL = 'https://benchmark.invalid/'
+BENCHMARK_EMAIL = 'benchmark@benchmark.invalid'
+
+ReplayRequest = namedtuple('ReplayRequest', ['name', 'method', 'path', 'body', 'auth'])
+
+VARIABLE = re.compile(r'\{\{(\w+)\}\}')
+ID_SEGMENT = re.compile(r'^(\d+|[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12})$', re.IGNORECASE)
+
+
+def substitute(text, variables):
+    """
+    Replace {{name}} placeholders; unknown names are left as they are.
+    """
+    return VARIABLE.sub(lambda match: str(variables.get(match.group(1), match.group(0))), text)
+
+
+def endpoint_name(method, path):
+    """
+    Group key of a request: the method and the path with ids replaced by
+    {id} and the query string dropped, e.g. 'GET /api/v1/photos/{id}/'.
+    """
+    segments = path.split('?', 1)[0].split('/')
+    return f"{method} {'/'.join('{id}' if ID_SEGMENT.match(s) else s for s in segments)}"
+
+
+def make_request(method, path, body=None, auth=False, name=None):
+    method = method.upper()
+    return ReplayRequest(name or endpoint_name(method, path), method, path, body, auth)
+
+
+def load_log(file, variables):
+    """
+    Read a JSON Lines request log. Raises ValueError for malformed lines.
+    """
+    requests = []
+    for line, text in enumerate(file, start=1):
+        if not text.strip():
+            continue
+        try:
+            entry = json.loads(substitute(text, variables))
+            requests.append(make_request(
+                entry.get('method', 'GET'), entry['path'], entry.get('body'), bool(entry.get('auth')), entry.get('name'),
+            ))
+        except (ValueError, KeyError, AttributeError) as e:
+            raise ValueError(f'Line {line}: not a request ({e!r}).') from e
+    return requests
+
+
+def load_postman(file, variables):
+    """
+    Flatten a Postman v2.1 collection into requests. Variables are
+    base_url (the API root path), access_token, photo_id and photographer_id;
+    requests sending a bearer token are replayed as the benchmark user.
+    """
+    def walk(items):
+        for item in items:
+            if 'item' in item:
+                yield from walk(item['item'])
+                continue
+            request = item['request']
+            url = request['url'] if isinstance(request['url'], str) else request['url']['raw']
+            headers = {header['key'].lower(): header['value'] for header in request.get('header', [])}
+            raw = (request.get('body') or {}).get('raw')
+            yield make_request(
+                request.get('method', 'GET'),
+                substitute(url, variables),
+                json.loads(substitute(raw, variables)) if raw else None,
+                'authorization' in headers,
+                f"{request.get('method', 'GET').upper()} {item['name']}",
+            )
+
+    return list(walk(json.load(file)['item']))
+
+
+def seed_dataset(photographers, photos, owner):
+    """
+    Create photographers and photos (owned by owner) under SEED_URL.
+    Returns (photographers, photos) created.
+    """
+    created_photographers = Photographer.objects.bulk_create([
+        Photographer(name=f'Benchmark Photographer {i}', url=f'{SEED_URL}photographers/{i}')
+        for i in range(photographers)
+    ])
+    batch = []
+    created = 0
+    for i in range(photos if created_photographers else 0):
+        original = f'{SEED_URL}photos/{i}.jpeg'
+        photo = Photo(
+            width=4000 + i % 2000, height=3000 + i % 1000, url=f'{SEED_URL}photo/{i}',
+            photographer=created_photographers[i % len(created_photographers)], owner=owner,
+            avg_color=f'#{(i * 2654435761) % 0xFFFFFF:06X}', alt=f'Benchmark photo {i} of a sunset over the lake',
+            src_original=original, **expand(original, 1),
+        )
+        photo.populate_derived_fields()
+        batch.append(photo)
+        if len(batch) == 1000:
+            created += len(Photo.objects.bulk_create(batch))
+            apply_deltas(count_photos(batch))
+            PhotoCountChanges().add_photos(batch).apply()
+            batch = []
+    created += len(Photo.objects.bulk_create(batch))
+    apply_deltas(count_photos(batch))
+    PhotoCountChanges().add_photos(batch).apply()
+    return len(created_photographers), created
+
+
+def remove_seed_dataset():
+    """
+    Delete the seeded photographers, their photos, the benchmark user and
+    the photos it created. Returns the number of rows deleted.
+    """
+    seeded = Photographer.objects.filter(url__startswith=SEED_URL)
+    deleted = delete_photos(Photo.objects.filter(Q(photographer__in=seeded) | Q(owner__email=BENCHMARK_EMAIL)))
+    deleted += seeded.delete()[0]
+    deleted += User.objects.filter(email=BENCHMARK_EMAIL).delete()[0]
+    return deleted
+
+
+def percentile(values, p):
+    """
+    Nearest-rank percentile of sorted values.
+    """
+    return values[max(0, math.ceil(p / 100 * len(values)) - 1)]
+
+
+def summarize(results, elapsed):
+    """
+    Aggregate (endpoint, status, seconds, queries) results into
+    {endpoint: stats} plus a 'total' entry. queries is None over HTTP.
+    """
+    groups = {}
+    for result in results:
+        groups.setdefault(result[0], []).append(result)
+    groups['total'] = results
+
+    summary = {}
+    for name, rows in groups.items():
+        latencies = sorted(seconds * 1000 for _, _, seconds, _ in rows)
+        statuses = {}
+        for _, status, _, _ in rows:
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+        queries = [count for _, _, _, count in rows if count is not None]
+        summary[name] = {
+            'requests': len(rows),
+            'errors': sum(1 for _, status, _, _ in rows if not 200 <= status < 400),
+            'status': statuses,
+            'throughput_rps': round(len(rows) / elapsed, 2) if elapsed else None,
+            'latency_ms': {
+                'mean': round(sum(latencies) / len(latencies), 3),
+                'p50': round(percentile(latencies, 50), 3),
+                'p95': round(percentile(latencies, 95), 3),
+                'p99': round(percentile(latencies, 99), 3),
+                'max': round(latencies[-1], 3),
+            },
+            'queries_per_request': {
+                'mean': round(sum(queries) / len(queries), 2),
+                'max': max(queries),
+            } if queries else None,
+        }
+    return summary
@@ -0,0 +1,149 @@
+"""
+Versioned response cache for anonymous read endpoints.
+
+Cached responses are keyed on the generation counters of the data they depend
+on. Writes bump the counters (see `bump_generation`), which makes every older
+entry unreachable without scanning or deleting keys; stale entries simply age
+out of the cache.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_http_date_safe
+
+GENERATION_KEY = 'generation:{}'
+
+
+def get_generation(name):
+    """
+    Return the current generation of a counter, creating it if needed.
+    New counters are seeded from the clock so a flushed or evicted counter
+    never comes back with a value an older cache entry was stored under.
+    """
+    key = GENERATION_KEY.format(name)
+    generation = cache.get(key)
+    if generation is None:
+        cache.add(key, time.time_ns() // 1000, timeout=None)
+        generation = cache.get(key)
+    return generation
+
+
+async def aget_generation(name):
+    """
+    Async variant of get_generation.
+    """
+    key = GENERATION_KEY.format(name)
+    generation = await cache.aget(key)
+    if generation is None:
+        await cache.aadd(key, time.time_ns() // 1000, timeout=None)
+        generation = await cache.aget(key)
+    return generation
+
+
+def bump_generation(*names):
+    """
+    Invalidate every cached response that depends on the named counters.
+    """
+    for name in names:
+        key = GENERATION_KEY.format(name)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, time.time_ns() // 1000, timeout=None)
+
+
+def invalidate_on_change(generations):
+    """
+    Return a post_save/post_delete receiver bumping the given counters.
+    """
+    def receiver(sender, **kwargs):
+        bump_generation(*generations)
+    return receiver
+
+
+class CachedResponseMixin:
+    """
+    Serve anonymous `list` and `retrieve` responses from the cache.
+    The key covers the URL, the normalized query parameters, the negotiated
+    renderer and the generations listed in `cache_generations`. Responses carry
+    an `X-Cache: HIT|MISS` header.
+    List it before ConditionalGetMixin: hits are then answered before the
+    validator queries run, and conditional requests are checked against the
+    validators stored with the entry.
+    """
+    cache_generations = ()
+    cache_formats = ('json',)
+    cache_headers = ('ETag', 'Last-Modified')
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(super().retrieve, request, *args, **kwargs)
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        """
+        Return the cached rendered response, or render it and store it.
+        """
+        if not self.is_cacheable(request):
+            return handler(request, *args, **kwargs)
+
+        key = self.get_cache_key(request, [get_generation(name) for name in self.cache_generations])
+        cached = cache.get(key)
+        if cached is not None:
+            return self.cached_hit(cached, request)
+
+        response = handler(request, *args, **kwargs)
+        response['X-Cache'] = 'MISS'
+        if response.status_code == 200:
+            response.add_post_render_callback(
+                lambda rendered: cache.set(key, self.cache_entry(rendered), settings.RESPONSE_CACHE_TIMEOUT)
+            )
+        return response
+
+    def is_cacheable(self, request):
+        """
+        Only anonymous requests negotiated to a cacheable format are cached.
+        """
+        return bool(
+            settings.RESPONSE_CACHE_TIMEOUT
+            and not request.user.is_authenticated
+            and request.accepted_renderer.format in self.cache_formats
+        )
+
+    def cache_entry(self, response):
+        """
+        The value stored for a rendered response.
+        """
+        headers = {name: response[name] for name in self.cache_headers if name in response}
+        return response.content, response['Content-Type'], headers
+
+    def cached_hit(self, entry, request):
+        """
+        Rebuild a response from a cache entry, or answer 304 when the
+        request's preconditions match its stored validators.
+        """
+        content, content_type, headers = entry
+        response = HttpResponse(content, content_type=content_type)
+        for name, value in headers.items():
+            response[name] = value
+        response['X-Cache'] = 'HIT'
+        return get_conditional_response(
+            request, etag=headers.get('ETag'),
+            last_modified=parse_http_date_safe(headers.get('Last-Modified')), response=response,
+        )
+
+    def get_cache_key(self, request, generations):
+        """
+        Build the cache key for a request at the given generations.
+        """
+        params = sorted((name, sorted(values)) for name, values in request.query_params.lists())
+        raw = repr((
+            request.build_absolute_uri(request.path), params, request.accepted_media_type, generations,
+        ))
+        digest = hashlib.sha1(raw.encode('utf-8')).hexdigest()
+        return f'response:{type(self).__name__}:{digest}'
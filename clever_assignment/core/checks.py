@@ -0,0 +1,49 @@
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+
+# Backends whose entries live in the memory of a single process.
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+@register(Tags.caches)
+def check_shared_cache(app_configs, **kwargs):
+    """
+    Caches invalidated through generation counters need a cache every
+    process shares: with a process-local backend, bumps made by other
+    workers or by management commands never reach the serving process.
+    """
+    backend = settings.CACHES['default']['BACKEND']
+    if backend not in PROCESS_LOCAL_CACHES:
+        return []
+    errors = []
+    if settings.RESPONSE_CACHE_TIMEOUT:
+        errors.append(Error(
+            'RESPONSE_CACHE_TIMEOUT is set but the default cache is process-local.',
+            hint='Set CACHE_BACKEND to a shared backend (redis, memcached) or RESPONSE_CACHE_TIMEOUT=0.',
+            obj=backend,
+            id='core.E001',
+        ))
+    if settings.PHOTOGRAPHER_RESOLVER_CACHE_SIZE:
+        errors.append(Error(
+            'PHOTOGRAPHER_RESOLVER_CACHE_SIZE is set but the default cache is process-local.',
+            hint=(
+                'Set CACHE_BACKEND to a shared backend (redis, memcached) or PHOTOGRAPHER_RESOLVER_CACHE_SIZE=0; '
+                'ids of photographers merged or deleted by another process would be reused.'
+            ),
+            obj=backend,
+            id='core.E002',
+        ))
+    if settings.JWT_USER_CACHE_TIMEOUT or settings.JWT_STATELESS_READS:
+        errors.append(Error(
+            'JWT_USER_CACHE_TIMEOUT or JWT_STATELESS_READS is set but the default cache is process-local.',
+            hint=(
+                'Set CACHE_BACKEND to a shared backend (redis, memcached), or JWT_USER_CACHE_TIMEOUT=0 and '
+                'JWT_STATELESS_READS=false; users changed by another process would stay authenticated.'
+            ),
+            obj=backend,
+            id='core.E003',
+        ))
+    return errors
@@ -0,0 +1,164 @@
+"""
+Conditional GET (ETag / Last-Modified / 304) for read endpoints.
+
+Validators are computed from `updated_at` timestamps. Page-number lists use a
+single aggregate over the filtered queryset, so a 304 is answered without
+fetching or serializing the page. Keyset (`?cursor=`) pages never aggregate
+the whole queryset: their ETag covers the rows of the fetched page, so a 304
+costs the indexed page query but no serialization. Lists carry an ETag only:
+MAX(updated_at) does not move when a row is deleted, so a list Last-Modified
+would answer If-Modified-Since with a wrong 304 (the ETag also covers the row
+count).
+"""
+import hashlib
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from rest_framework.response import Response
+
+
+class ConditionalGetMixin:
+    """
+    Emit strong ETags on `list` and `retrieve` (plus Last-Modified on
+    `retrieve`) and answer If-None-Match / If-Modified-Since with 304 Not
+    Modified.
+    `conditional_related` names forward relations whose `updated_at` is part
+    of the representation (e.g. the photographer name embedded in a photo).
+    """
+    conditional_related = ()
+
+    def list(self, request, *args, **kwargs):
+        if self.uses_page_validators(request):
+            page = self.paginate_queryset(self.filter_queryset(self.get_queryset()))
+            return self.conditional_response(
+                lambda request, *args, **kwargs: self.page_response(page), request,
+                self.get_page_validators(request, page), *args, **kwargs
+            )
+        aggregated = self.get_list_queryset().aggregate(**self.get_list_aggregates())
+        validators = self.get_list_validators(request, aggregated)
+        return self.conditional_response(super().list, request, validators, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        validators = self.get_validators(request, *self.get_object_state(instance))
+        return self.conditional_response(
+            lambda request, *args, **kwargs: self.retrieve_instance(instance), request, validators, *args, **kwargs
+        )
+
+    def retrieve_instance(self, instance):
+        """
+        RetrieveModelMixin.retrieve() for the instance already loaded for
+        the validators.
+        """
+        return Response(self.get_serializer(instance).data)
+
+    def page_response(self, page):
+        """
+        ListModelMixin.list() for the page already fetched for the validators.
+        """
+        return self.get_paginated_response(self.get_serializer(page, many=True).data)
+
+    def uses_page_validators(self, request):
+        """
+        Whether the list validators come from the fetched page instead of an
+        aggregate: keyset pages, where a COUNT and MAX over the whole filtered
+        queryset would cost more than the page itself. Views embedding data
+        the aggregate does not cover extend it.
+        """
+        uses_keyset = getattr(self.paginator, 'uses_keyset', None)
+        return uses_keyset is not None and uses_keyset(request)
+
+    def get_page_validators(self, request, page):
+        """
+        Return the (etag, None) validators of a fetched page: the state of
+        each row plus the paginator's state (count or adjacent pages).
+        """
+        rows = [self.get_object_state(instance)[0] for instance in page]
+        return self.get_etag(request, (rows, self.paginator.get_page_state())), None
+
+    def get_list_queryset(self):
+        """
+        The filtered, unordered queryset the list validators are computed over.
+        """
+        return self.filter_queryset(self.get_queryset()).order_by()
+
+    def get_list_aggregates(self):
+        """
+        Aggregates describing the state of the filtered list.
+        """
+        aggregates = {'count': Count('pk'), 'updated_at': Max('updated_at')}
+        aggregates.update({name: Max(f'{name}__updated_at') for name in self.conditional_related})
+        return aggregates
+
+    def get_list_state(self, aggregated):
+        """
+        Return (state, timestamps) for the aggregated list.
+        """
+        timestamps = [aggregated[name] for name in ('updated_at', *self.conditional_related)]
+        return (aggregated['count'], timestamps), timestamps
+
+    def get_list_validators(self, request, aggregated):
+        """
+        Return the (etag, None) validators of the aggregated list.
+        """
+        state, _ = self.get_list_state(aggregated)
+        return self.get_etag(request, state), None
+
+    def get_object_state(self, instance):
+        """
+        Return (state, timestamps) for a single object.
+        """
+        timestamps = [instance.updated_at]
+        timestamps += [getattr(instance, name).updated_at for name in self.conditional_related]
+        return (instance.pk, timestamps), timestamps
+
+    def conditional_response(self, handler, request, validators, *args, **kwargs):
+        """
+        Return 304 when the client's validators match, otherwise the handler's
+        response with ETag and Last-Modified set.
+        """
+        etag, last_modified = validators
+        response = self.get_not_modified_response(request, etag, last_modified)
+        if response is None:
+            response = handler(request, *args, **kwargs)
+        return self.set_validators(response, etag, last_modified)
+
+    def get_validators(self, request, state, timestamps):
+        """
+        Return the (etag, last_modified timestamp) pair for a resource state.
+        """
+        known = [timestamp for timestamp in timestamps if timestamp is not None]
+        last_modified = int(max(known).timestamp()) if known else None
+        return self.get_etag(request, state), last_modified
+
+    @staticmethod
+    def get_not_modified_response(request, etag, last_modified):
+        """
+        Return a 304 response carrying the validators if they match the
+        request's preconditions, else None.
+        """
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        return ConditionalGetMixin.set_validators(response, etag, last_modified) if response else None
+
+    @staticmethod
+    def set_validators(response, etag, last_modified):
+        """
+        Add ETag and Last-Modified to a successful response.
+        """
+        if response.status_code not in (200, 304):
+            return response
+        response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified)
+        return response
+
+    @staticmethod
+    def get_etag(request, state):
+        """
+        Strong ETag over the resource state, the full URL (filters, ordering,
+        page), the negotiated media type and the user (the browsable API
+        renders per-user forms).
+        """
+        raw = repr((state, request.build_absolute_uri(), request.accepted_media_type, request.user.pk))
+        return quote_etag(hashlib.sha1(raw.encode('utf-8')).hexdigest())
@@ -0,0 +1,339 @@
+"""
+Helpers for streaming the Pexels photo CSV into the database in chunks.
+Used by the `import_photos` management command.
+"""
+import csv
+import hashlib
+from collections import namedtuple
+from dataclasses import dataclass, field
+from itertools import islice
+
+import django
+from django.db import IntegrityError, connections, transaction
+from django.db.models import Q
+
+from clever_assignment.photos.activity import PhotoCountChanges
+from clever_assignment.photos.facets import apply_deltas, count_photos, count_rows
+from clever_assignment.photos.models import Photo
+from clever_assignment.photographers.models import Photographer
+from clever_assignment.photographers.resolution import resolver
+
+# Column layout of photos.csv (the Pexels export).
+CSV_COLUMNS = [
+    'id', 'width', 'height', 'url', 'photographer', 'photographer_url', 'photographer_id',
+    'avg_color', 'src.original', 'src.large2x', 'src.large', 'src.medium', 'src.small',
+    'src.portrait', 'src.landscape', 'src.tiny', 'alt',
+]
+
+# Photo model field -> CSV column for the image source URLs.
+SRC_COLUMNS = {
+    'src_original': 'src.original',
+    'src_large2x': 'src.large2x',
+    'src_large': 'src.large',
+    'src_medium': 'src.medium',
+    'src_small': 'src.small',
+    'src_portrait': 'src.portrait',
+    'src_landscape': 'src.landscape',
+    'src_tiny': 'src.tiny',
+}
+
+# Fields overwritten when an incremental sync sees a changed row.
+SYNC_UPDATE_FIELDS = [
+    'width', 'height', 'url', 'avg_color', 'alt', 'photographer', 'source_hash', 'updated_at',
+    *SRC_COLUMNS, *Photo.DERIVED_FIELDS,
+]
+
+ParsedRow = namedtuple(
+    'ParsedRow', ['line', 'photographer_name', 'photographer_url', 'photographer_pexels_id', 'fields'],
+)
+
+
+@dataclass
+class ImportStats:
+    """
+    Running totals for an import, including per-row errors as (line, message).
+    """
+    rows: int = 0
+    photos: int = 0
+    photographers: int = 0
+    updated: int = 0
+    skipped: int = 0
+    deleted: int = 0
+    errors: list = field(default_factory=list)
+
+    def merge(self, other):
+        self.rows += other.rows
+        self.photos += other.photos
+        self.photographers += other.photographers
+        self.updated += other.updated
+        self.skipped += other.skipped
+        self.deleted += other.deleted
+        self.errors.extend(other.errors)
+
+
+def read_chunks(csvfile, chunk_size):
+    """
+    Yield lists of (line_number, row) tuples of at most chunk_size rows.
+    """
+    reader = csv.DictReader(csvfile)
+    rows = ((reader.line_num, row) for row in reader)
+    while chunk := list(islice(rows, chunk_size)):
+        yield chunk
+
+
+def row_hash(row):
+    """
+    Content hash of a CSV row, used to skip unchanged rows on incremental syncs.
+    """
+    values = '\x1f'.join(row.get(column) or '' for column in CSV_COLUMNS)
+    return hashlib.sha1(values.encode('utf-8')).hexdigest()
+
+
+def optional_int(value):
+    """
+    Parse an optional integer CSV value.
+    """
+    return int(value) if value not in (None, '') else None
+
+
+def photo_fields_from_row(row):
+    """
+    Map a CSV row to Photo field values (without the photographer).
+    Raises KeyError for missing columns and ValueError for bad values.
+    """
+    fields = {
+        'pexels_id': optional_int(row['id']),
+        'width': int(row['width']),
+        'height': int(row['height']),
+        'url': row['url'],
+        'avg_color': row['avg_color'],
+        'alt': row['alt'],
+        'source_hash': row_hash(row),
+    }
+    for name, column in SRC_COLUMNS.items():
+        fields[name] = row[column]
+    if not fields['url']:
+        raise ValueError('empty photo url')
+    return fields
+
+
+def parse_chunk(chunk, stats, require_ids=False):
+    """
+    Parse a chunk of CSV rows, recording bad rows in stats.errors.
+    With require_ids, rows without Pexels photo/photographer ids are rejected.
+    """
+    parsed = []
+    for line, row in chunk:
+        stats.rows += 1
+        try:
+            if not row['photographer_url']:
+                raise ValueError('empty photographer url')
+            photographer_pexels_id = optional_int(row['photographer_id'])
+            fields = photo_fields_from_row(row)
+            if require_ids and (fields['pexels_id'] is None or photographer_pexels_id is None):
+                raise ValueError('missing Pexels id or photographer_id')
+            parsed.append(ParsedRow(
+                line, row['photographer'], row['photographer_url'], photographer_pexels_id, fields,
+            ))
+        except KeyError as e:
+            stats.errors.append((line, f'Missing column in CSV: {e}'))
+        except (TypeError, ValueError) as e:
+            stats.errors.append((line, f'Invalid value: {e}'))
+    return parsed
+
+
+def resolve_photographers(parsed, stats):
+    """
+    Return a {(name, url): photographer_id} map for a parsed chunk through the
+    shared resolver: pairs it has not cached are upserted with INSERT ... ON
+    CONFLICT, so photographers inserted concurrently resolve to the existing
+    row. The feed's Pexels ids are then adopted by the photographers that
+    have none; one claimed concurrently is left for a later run.
+    """
+    ids, created = resolver.resolve_many([(row.photographer_name, row.photographer_url) for row in parsed])
+    stats.photographers += created
+    pexels_ids = {
+        row.photographer_url: row.photographer_pexels_id for row in parsed if row.photographer_pexels_id is not None
+    }
+    if pexels_ids:
+        try:
+            with transaction.atomic():
+                adopt_by_url(Photographer, pexels_ids)
+        except IntegrityError:
+            pass
+    return ids
+
+
+def insert_photos(photo_rows):
+    """
+    Insert one chunk of photos inside a single transaction, skipping photos
+    whose URL or Pexels id already exists. photo_rows is a list of
+    (line_number, photo_fields) with photographer_id already resolved.
+    Safe to run in a worker process.
+    """
+    stats = ImportStats()
+    urls = [fields['url'] for _, fields in photo_rows]
+    pexels_ids = [fields['pexels_id'] for _, fields in photo_rows if fields['pexels_id'] is not None]
+    try:
+        with transaction.atomic():
+            existing = Photo.objects.filter(Q(url__in=urls) | Q(pexels_id__in=pexels_ids))
+            seen_urls, seen_ids = set(), set()
+            for url, pexels_id in existing.values_list('url', 'pexels_id'):
+                seen_urls.add(url)
+                seen_ids.add(pexels_id)
+            photos = []
+            for _, fields in photo_rows:
+                if fields['url'] in seen_urls or (fields['pexels_id'] is not None and fields['pexels_id'] in seen_ids):
+                    stats.skipped += 1
+                    continue
+                seen_urls.add(fields['url'])
+                seen_ids.add(fields['pexels_id'])
+                photo = Photo(**fields)
+                photo.populate_derived_fields()
+                photos.append(photo)
+            Photo.objects.bulk_create(photos)
+            apply_deltas(count_photos(photos))
+            PhotoCountChanges().add_photos(photos).apply()
+            stats.photos += len(photos)
+    except Exception as e:
+        stats.skipped = 0
+        stats.photos = 0
+        first, last = photo_rows[0][0], photo_rows[-1][0]
+        stats.errors.append((first, f'Chunk at lines {first}-{last} failed: {e}'))
+    return stats
+
+
+def adopt_by_url(model, pexels_ids_by_url):
+    """
+    Attach Pexels ids to rows imported before ids were stored (matched on URL),
+    so the upsert updates them instead of inserting duplicates.
+    """
+    known = set(model.objects.filter(pexels_id__in=pexels_ids_by_url.values()).values_list('pexels_id', flat=True))
+    orphans = model.objects.filter(
+        pexels_id__isnull=True,
+        url__in=[url for url, pexels_id in pexels_ids_by_url.items() if pexels_id not in known],
+    )
+    adopted = []
+    for obj in orphans.only('pk', 'url'):
+        pexels_id = pexels_ids_by_url[obj.url]
+        if pexels_id not in known:
+            known.add(pexels_id)
+            obj.pexels_id = pexels_id
+            adopted.append(obj)
+    model.objects.bulk_update(adopted, ['pexels_id'])
+
+
+def sync_photographers(parsed, stats):
+    """
+    Upsert the chunk's photographers keyed on their Pexels id and return a
+    {photographer_pexels_id: photographer_id} map. Only new or changed
+    photographers are written.
+    """
+    feed = {}
+    for row in parsed:
+        feed[row.photographer_pexels_id] = (row.photographer_name, row.photographer_url)
+    adopt_by_url(Photographer, {url: pexels_id for pexels_id, (_, url) in feed.items()})
+    existing = {
+        pexels_id: (pk, (name, url))
+        for pexels_id, pk, name, url in Photographer.objects.filter(pexels_id__in=feed).values_list(
+            'pexels_id', 'id', 'name', 'url',
+        )
+    }
+    changed = [
+        Photographer(pexels_id=pexels_id, name=name, url=url)
+        for pexels_id, (name, url) in feed.items()
+        if pexels_id not in existing or existing[pexels_id][1] != (name, url)
+    ]
+    ids = {pexels_id: pk for pexels_id, (pk, _) in existing.items()}
+    if changed:
+        Photographer.objects.bulk_create(
+            changed,
+            update_conflicts=True,
+            unique_fields=['pexels_id'],
+            update_fields=['name', 'url', 'updated_at'],
+        )
+        created = [p.pexels_id for p in changed if p.pexels_id not in existing]
+        stats.photographers += len(created)
+        ids.update(Photographer.objects.filter(pexels_id__in=created).values_list('pexels_id', 'id'))
+    return ids
+
+
+def sync_chunk(parsed, stats):
+    """
+    Apply one chunk of an incremental sync in a single transaction: rows whose
+    content hash is unchanged are skipped, new and changed rows are upserted
+    with INSERT ... ON CONFLICT (pexels_id) DO UPDATE.
+    """
+    with transaction.atomic():
+        photographer_ids = sync_photographers(parsed, stats)
+        adopt_by_url(Photo, {row.fields['url']: row.fields['pexels_id'] for row in parsed})
+        hashes, facet_rows = {}, {}
+        for pexels_id, source_hash, *facet_row in Photo.objects.filter(
+            pexels_id__in=[row.fields['pexels_id'] for row in parsed],
+        ).values_list('pexels_id', 'source_hash', *Photo.TRACKED_FIELDS):
+            hashes[pexels_id] = source_hash
+            facet_rows[pexels_id] = facet_row
+        upserts = {}
+        for row in parsed:
+            pexels_id = row.fields['pexels_id']
+            if hashes.get(pexels_id) == row.fields['source_hash']:
+                stats.skipped += 1
+                continue
+            photo = Photo(**row.fields, photographer_id=photographer_ids[row.photographer_pexels_id])
+            photo.populate_derived_fields()
+            upserts[pexels_id] = photo
+        if upserts:
+            Photo.objects.bulk_create(
+                upserts.values(),
+                update_conflicts=True,
+                unique_fields=['pexels_id'],
+                update_fields=SYNC_UPDATE_FIELDS,
+            )
+            # Updated rows leave the facet values they had.
+            deltas = count_photos(upserts.values())
+            count_rows((facet_rows[pexels_id] for pexels_id in upserts if pexels_id in facet_rows), -1, deltas)
+            apply_deltas(deltas)
+            photographer = Photo.TRACKED_FIELDS.index('photographer_id')
+            changes = PhotoCountChanges()
+            for pexels_id, photo in upserts.items():
+                if pexels_id not in facet_rows:
+                    changes.add(photo.photographer_id, photo.created_at)
+                else:
+                    changes.move(facet_rows[pexels_id][photographer], photo.photographer_id)
+            changes.apply()
+        created = sum(1 for pexels_id in upserts if pexels_id not in hashes)
+        stats.photos += created
+        stats.updated += len(upserts) - created
+
+
+def prune_missing(seen_photo_ids, seen_photographer_ids, batch_size=1000):
+    """
+    Delete imported photos whose Pexels id was not in the feed, then imported
+    photographers that are missing from the feed and have no photos left.
+    Returns the number of deleted photos and photographers.
+    """
+    photos = delete_unseen(Photo.objects.all(), seen_photo_ids, batch_size)
+    photographers = delete_unseen(Photographer.objects.filter(photo__isnull=True), seen_photographer_ids, batch_size)
+    return photos, photographers
+
+
+def delete_unseen(queryset, seen, batch_size):
+    """
+    Stream the Pexels ids of a queryset and delete, in batches, the rows whose
+    id is not in seen. Rows created through the API (no Pexels id) are kept.
+    """
+    rows = queryset.filter(pexels_id__isnull=False).values_list('pk', 'pexels_id')
+    stale = [pk for pk, pexels_id in rows.iterator(chunk_size=batch_size) if pexels_id not in seen]
+    deleted = 0
+    for start in range(0, len(stale), batch_size):
+        deleted += queryset.filter(pk__in=stale[start:start + batch_size]).delete()[0]
+    return deleted
+
+
+def init_worker():
+    """
+    Process pool initializer: make sure Django is set up and that no database
+    connection inherited from the parent process is reused.
+    """
+    django.setup()
+    connections.close_all()
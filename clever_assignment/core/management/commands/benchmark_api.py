@@ -0,0 +1,267 @@
+import argparse
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.error import HTTPError, URLError
+from urllib.request import Request, urlopen
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test import Client
+from django.test.utils import override_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+from clever_assignment.core.benchmark import (
+    BENCHMARK_EMAIL, SEED_URL, load_log, load_postman, remove_seed_dataset, seed_dataset, summarize,
+)
+from clever_assignment.core.cache import bump_generation
+from clever_assignment.photos.models import Photo
+from clever_assignment.photographers.models import Photographer
+from clever_assignment.photographers.resolution import IDENTITY_GENERATION
+from clever_assignment.users.models import User
+
+DEFAULT_COLLECTION = settings.BASE_DIR / 'clever_assignment.postman_collection.json'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+class Command(BaseCommand):
+    """
+    Django management command replaying a request log or the Postman collection
+    as a load test and reporting latency percentiles per endpoint.
+    """
+    help = (
+        'Replay a JSON Lines request log (or the Postman collection) against the API, in-process through the '
+        'full middleware stack or over HTTP with --base-url, at a given concurrency. Reports p50/p95/p99 '
+        'latency, throughput and (in-process) queries per request for each endpoint, optionally as JSON.'
+    )
+
+    def add_arguments(self, parser):
+        source = parser.add_mutually_exclusive_group()
+        source.add_argument('--log', metavar='PATH', help='JSON Lines request log to replay.')
+        source.add_argument(
+            '--postman', metavar='PATH',
+            help='Postman collection to replay (default when no --log: the collection at the repository root).',
+        )
+        parser.add_argument('--repeat', type=int, default=10, help='Times the whole log is replayed.')
+        parser.add_argument('--concurrency', type=int, default=10, help='Requests in flight at once.')
+        parser.add_argument(
+            '--base-url', metavar='URL',
+            help='Replay over HTTP against a running server, e.g. http://localhost:8000 (default: in-process).',
+        )
+        parser.add_argument(
+            '--read-only', action=argparse.BooleanOptionalAction,
+            help=(
+                'Only replay GET, HEAD and OPTIONS requests (default for the Postman collection, whose '
+                'register/create/delete requests only succeed once; --no-read-only replays them anyway).'
+            ),
+        )
+        parser.add_argument('--seed-photographers', type=int, default=0, help='Photographers to seed before the run.')
+        parser.add_argument('--seed-photos', type=int, default=0, help='Photos to seed before the run.')
+        parser.add_argument(
+            '--cleanup', action='store_true',
+            help='Delete the seeded dataset, the benchmark user and its photos after the run.',
+        )
+        parser.add_argument(
+            '--allow-live-db', action='store_true',
+            help='Confirm that --seed-photographers and --cleanup may write to the configured database.',
+        )
+        parser.add_argument(
+            '--throttle', action='store_true',
+            help='Keep API throttling on for in-process runs (off by default so replays are not rate limited).',
+        )
+        parser.add_argument('--output', metavar='PATH', help='Write the results as JSON to PATH.')
+
+    def handle(self, *args, **options):
+        """
+        Main handler for benchmark_api command.
+        """
+        for name in ('repeat', 'concurrency'):
+            if options[name] < 1:
+                raise CommandError(f'--{name} must be positive.')
+        if options['seed_photographers'] < 0 or options['seed_photos'] < 0:
+            raise CommandError('--seed-photographers and --seed-photos must not be negative.')
+        if options['seed_photos'] and not options['seed_photographers']:
+            raise CommandError('--seed-photos requires --seed-photographers.')
+        if (options['seed_photographers'] or options['cleanup']) and not options['allow_live_db']:
+            database = connections[DEFAULT_DB_ALIAS].settings_dict
+            raise CommandError(
+                f'--seed-photographers and --cleanup write to the configured database '
+                f'({database["NAME"]} on {database.get("HOST") or "localhost"}); pass --allow-live-db to confirm.'
+            )
+
+        user = self.prepare_dataset(options['seed_photographers'], options['seed_photos'])
+        requests = self.load_requests(options, self.get_variables(user)) * options['repeat']
+        read_only = options['read_only']
+        if read_only is None:
+            read_only = not options['log']
+        if read_only:
+            requests = [request for request in requests if request.method in SAFE_METHODS]
+        if not requests:
+            raise CommandError('Nothing to replay.')
+        token = str(RefreshToken.for_user(user).access_token)
+
+        try:
+            if options['base_url']:
+                call = self.http_caller(options['base_url'].rstrip('/'), token)
+                elapsed, results = self.replay(requests, call, options['concurrency'])
+            else:
+                elapsed, results = self.replay_in_process(requests, token, options['concurrency'], options['throttle'])
+        finally:
+            if options['cleanup']:
+                self.stdout.write(f'Removed {remove_seed_dataset()} benchmark rows.')
+                bump_generation('photos', 'photographers', IDENTITY_GENERATION)
+
+        summary = summarize(results, elapsed)
+        self.report(summary)
+        if options['output']:
+            meta = {
+                'mode': 'http' if options['base_url'] else 'in-process',
+                'base_url': options['base_url'],
+                'source': str(options['log'] or options['postman'] or DEFAULT_COLLECTION),
+                'requests': len(requests),
+                'repeat': options['repeat'],
+                'concurrency': options['concurrency'],
+                'elapsed_seconds': round(elapsed, 3),
+                'seed': {'photographers': options['seed_photographers'], 'photos': options['seed_photos']},
+                'dataset': {'photographers': Photographer.objects.count(), 'photos': Photo.objects.count()},
+            }
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                json.dump({'meta': meta, 'endpoints': summary}, f, indent=2, sort_keys=True)
+            self.stdout.write(self.style.SUCCESS(f'Wrote results to {options["output"]}.'))
+
+    def prepare_dataset(self, photographers, photos):
+        """
+        Create the benchmark user and, if requested, a fresh seeded dataset
+        (replacing the one of an earlier run).
+        """
+        if photographers:
+            removed = remove_seed_dataset()
+            if removed:
+                self.stdout.write(f'Removed {removed} rows of an earlier benchmark dataset.')
+        user, created = User.objects.get_or_create(email=BENCHMARK_EMAIL)
+        if created:
+            user.set_unusable_password()
+            user.save(update_fields=['password'])
+        if photographers:
+            started = time.monotonic()
+            created_photographers, created_photos = seed_dataset(photographers, photos, user)
+            # Bulk inserts bypass the model signals.
+            bump_generation('photos', 'photographers')
+            self.stdout.write(
+                f'Seeded {created_photographers} photographers and {created_photos} photos '
+                f'in {time.monotonic() - started:.2f}s.'
+            )
+        return user
+
+    @staticmethod
+    def get_variables(user):
+        """
+        Placeholder values: a photo the benchmark user may modify (a seeded
+        one when available) and its photographer.
+        """
+        photo = (
+            Photo.objects.filter(owner=user, photographer__url__startswith=SEED_URL).first()
+            or Photo.objects.filter(owner=user).first()
+            or Photo.objects.first()
+        )
+        return {
+            'base_url': '/api/v1',
+            'photo_id': photo.pk if photo else '',
+            'photographer_id': photo.photographer_id if photo else '',
+        }
+
+    @staticmethod
+    def load_requests(options, variables):
+        path = options['log'] or options['postman'] or DEFAULT_COLLECTION
+        try:
+            with open(path, encoding='utf-8') as f:
+                return load_log(f, variables) if options['log'] else load_postman(f, variables)
+        except FileNotFoundError:
+            raise CommandError(f'{path} file not found.')
+        except (ValueError, KeyError) as e:
+            raise CommandError(f'Cannot read {path}: {e}')
+
+    @staticmethod
+    def replay(requests, call, concurrency):
+        """
+        Issue the requests from a thread pool; call(request) returns
+        (status, seconds, queries).
+        """
+        def run(request):
+            status, seconds, queries = call(request)
+            return request.name, status, seconds, queries
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            results = list(pool.map(run, requests))
+        return time.perf_counter() - started, results
+
+    def replay_in_process(self, requests, token, concurrency, throttle):
+        """
+        Replay through django.test.Client, one client and database connection
+        per thread, counting the queries of each request.
+        """
+        local = threading.local()
+
+        def call(request):
+            client = getattr(local, 'client', None)
+            if client is None:
+                client = local.client = Client()
+            headers = {'HTTP_ACCEPT': 'application/json'}
+            if request.auth:
+                headers['HTTP_AUTHORIZATION'] = f'Bearer {token}'
+            body = json.dumps(request.body) if request.body is not None else ''
+            queries = 0
+
+            def count(execute, sql, params, many, context):
+                nonlocal queries
+                queries += 1
+                return execute(sql, params, many, context)
+
+            # Connections are per thread, so the wrapper only sees this request.
+            with connections[DEFAULT_DB_ALIAS].execute_wrapper(count):
+                started = time.perf_counter()
+                response = client.generic(
+                    request.method, request.path, body, content_type='application/json', **headers,
+                )
+                if response.streaming:
+                    b''.join(response.streaming_content)
+                seconds = time.perf_counter() - started
+            connections.close_all()
+            return response.status_code, seconds, queries
+
+        # The test client uses the host 'testserver'.
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver'], API_THROTTLING=throttle):
+            return self.replay(requests, call, concurrency)
+
+    @staticmethod
+    def http_caller(base_url, token):
+        def call(request):
+            headers = {'Accept': 'application/json', 'Content-Type': 'application/json'}
+            if request.auth:
+                headers['Authorization'] = f'Bearer {token}'
+            data = json.dumps(request.body).encode('utf-8') if request.body is not None else None
+            started = time.perf_counter()
+            try:
+                with urlopen(Request(base_url + request.path, data, headers, method=request.method)) as response:
+                    response.read()
+                    status = response.status
+            except HTTPError as e:
+                e.read()
+                status = e.code
+            except URLError:
+                status = 0
+            return status, time.perf_counter() - started, None
+        return call
+
+    def report(self, summary):
+        self.stdout.write(
+            f'{"endpoint":<40} {"requests":>8} {"req/s":>8} {"p50 ms":>8} {"p95 ms":>8} {"p99 ms":>8} '
+            f'{"queries":>7} {"errors":>6}'
+        )
+        for name, stats in summary.items():
+            latency, queries = stats['latency_ms'], stats['queries_per_request']
+            self.stdout.write(
+                f'{name[:40]:<40} {stats["requests"]:>8} {stats["throughput_rps"] or 0:>8.1f} '
+                f'{latency["p50"]:>8.1f} {latency["p95"]:>8.1f} {latency["p99"]:>8.1f} '
+                f'{queries["mean"] if queries else "-":>7} {stats["errors"]:>6}'
+            )
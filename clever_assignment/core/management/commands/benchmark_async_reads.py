@@ -0,0 +1,125 @@
+import asyncio
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import AsyncRequestFactory, RequestFactory
+from django.test.utils import override_settings
+from clever_assignment.photos.models import Photo
+from clever_assignment.photos.views import AsyncPhotoDetailView, AsyncPhotoListView, PhotoViewSet
+from clever_assignment.photographers.views import AsyncPhotographerListView, PhotographerListView
+
+HEADERS = {'Accept': 'application/json'}
+
+class Command(BaseCommand):
+    """
+    Django management command comparing the synchronous (WSGI) and native async
+    (ASGI) read paths for the photo and photographer endpoints.
+    """
+    help = (
+        'Benchmark the sync and async read views in-process with concurrent requests. '
+        'Throttling and the response cache are disabled so every request hits the database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500, help='Requests per endpoint and path.')
+        parser.add_argument('--concurrency', type=int, default=50, help='Requests in flight at once.')
+        parser.add_argument(
+            '--endpoint', action='append', choices=['photos', 'photo-detail', 'photographers'],
+            help='Endpoint to benchmark (repeatable; default: all).',
+        )
+
+    def handle(self, *args, **options):
+        """
+        Main handler for benchmark_async_reads command.
+        """
+        if options['requests'] < 1 or options['concurrency'] < 1:
+            raise CommandError('--requests and --concurrency must be positive.')
+        endpoints = self.get_endpoints()
+        names = options['endpoint'] or list(endpoints)
+        # Requests are built by the test request factories (host 'testserver').
+        with override_settings(RESPONSE_CACHE_TIMEOUT=0, ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+            for name in names:
+                path, kwargs, sync_view, async_view = endpoints[name]
+                sync = self.run_sync(sync_view, path, kwargs, options['requests'], options['concurrency'])
+                async_ = asyncio.run(
+                    self.run_async(async_view, path, kwargs, options['requests'], options['concurrency'])
+                )
+                self.report(name, 'sync (threads)', sync)
+                self.report(name, 'async', async_)
+
+    @staticmethod
+    def get_endpoints():
+        """
+        Return {name: (path, view kwargs, sync view, async view)}.
+        """
+        no_throttles = {'throttle_classes': []}
+        photo = Photo.objects.only('pk').first()
+        if photo is None:
+            raise CommandError('No photos to read; run import_photos first.')
+        return {
+            'photos': (
+                '/api/v1/photos/', {},
+                PhotoViewSet.as_view({'get': 'list'}, **no_throttles),
+                AsyncPhotoListView.as_view(view_initkwargs=no_throttles),
+            ),
+            'photo-detail': (
+                f'/api/v1/photos/{photo.pk}/', {'pk': photo.pk},
+                PhotoViewSet.as_view({'get': 'retrieve'}, **no_throttles),
+                AsyncPhotoDetailView.as_view(view_initkwargs=no_throttles),
+            ),
+            'photographers': (
+                '/api/v1/photographers/', {},
+                PhotographerListView.as_view(**no_throttles),
+                AsyncPhotographerListView.as_view(view_initkwargs=no_throttles),
+            ),
+        }
+
+    @staticmethod
+    def run_sync(view, path, kwargs, requests, concurrency):
+        """
+        Issue requests from a thread pool, as a threaded WSGI server would.
+        """
+        factory = RequestFactory()
+
+        def call(_):
+            started = time.perf_counter()
+            response = view(factory.get(path, headers=HEADERS), **kwargs)
+            response.render()
+            connections.close_all()
+            return time.perf_counter() - started, response.status_code
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            results = list(pool.map(call, range(requests)))
+        return time.perf_counter() - started, results
+
+    @staticmethod
+    async def run_async(view, path, kwargs, requests, concurrency):
+        """
+        Issue requests as concurrent tasks on one event loop.
+        """
+        factory = AsyncRequestFactory()
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def call():
+            async with semaphore:
+                started = time.perf_counter()
+                response = await view(factory.get(path, headers=HEADERS), **kwargs)
+                return time.perf_counter() - started, response.status_code
+
+        started = time.perf_counter()
+        results = await asyncio.gather(*(call() for _ in range(requests)))
+        return time.perf_counter() - started, results
+
+    def report(self, name, mode, outcome):
+        elapsed, results = outcome
+        latencies = sorted(latency * 1000 for latency, _ in results)
+        errors = sum(1 for _, status in results if status >= 400)
+        p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+        self.stdout.write(
+            f'{name:<14} {mode:<15} {len(results) / elapsed:8.1f} req/s  '
+            f'p50 {statistics.median(latencies):7.1f} ms  p95 {p95:7.1f} ms  {errors} errors'
+        )
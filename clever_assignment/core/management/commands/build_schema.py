@@ -0,0 +1,29 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from clever_assignment.core.schema import build_schema
+
+class Command(BaseCommand):
+    """
+    Django management command to precompute the OpenAPI schema served at /api/schema/.
+    """
+    help = (
+        'Generate the OpenAPI schema as YAML and JSON with a manifest of content hashes '
+        '(run at build or deploy time; the schema views serve these files).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output-dir', default=settings.SCHEMA_ARTIFACT_DIR,
+            help='Directory to write the schema to (default: SCHEMA_ARTIFACT_DIR).',
+        )
+
+    def handle(self, *args, **options):
+        """
+        Main handler for build_schema command.
+        """
+        manifest = build_schema(options['output_dir'])
+        for entry in manifest['files'].values():
+            self.stdout.write(f"{entry['name']}: {entry['size']} bytes, sha256 {entry['sha256']}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote schema {manifest['hash'][:12]} to {options['output_dir']}."
+        ))
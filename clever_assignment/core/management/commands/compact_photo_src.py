@@ -0,0 +1,46 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from clever_assignment.photos.models import Photo
+from clever_assignment.photos.variants import compact_photos, expand_photos, storage_report
+
+class Command(BaseCommand):
+    """
+    Django management command to compact the stored src_* URLs of photos and report the bytes saved.
+    """
+    help = (
+        'Store src_original plus a variant template id for photos whose src_* URLs match a known '
+        'template, then report how many bytes the URLs take compared to explicit storage.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Only report the current storage.')
+        parser.add_argument(
+            '--expand', action='store_true',
+            help='Store every URL explicitly again (after disabling PHOTO_SRC_COMPACT).',
+        )
+        parser.add_argument('--batch-size', type=int, default=2000, help='Rows per UPDATE statement.')
+
+    def handle(self, *args, **options):
+        """
+        Main handler for compact_photo_src command.
+        """
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be positive.')
+        if options['expand']:
+            if not options['dry_run']:
+                self.stdout.write(f'Expanded {expand_photos(Photo)} photos.')
+        elif not options['dry_run']:
+            if not settings.PHOTO_SRC_COMPACT:
+                raise CommandError('Compact storage is disabled (PHOTO_SRC_COMPACT=false).')
+            self.stdout.write(f'Compacted {compact_photos(Photo, options["batch_size"])} photos.')
+        self.report(storage_report(Photo))
+
+    def report(self, report):
+        explicit = report['explicit_bytes']
+        saved = report['saved_bytes']
+        percent = 100 * saved / explicit if explicit else 0
+        self.stdout.write(
+            f"{report['compacted']} of {report['photos']} photos stored compactly. "
+            f"src_* URLs take {report['stored_bytes']} bytes instead of {explicit} "
+            f"({saved} bytes saved, {percent:.1f}%)."
+        )
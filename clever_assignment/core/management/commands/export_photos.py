@@ -0,0 +1,78 @@
+import os
+import sys
+import time
+from django.core.management.base import BaseCommand, CommandError
+from clever_assignment.photos.export import EXPORT_CHUNK_SIZE, EXPORT_RENDERERS
+from clever_assignment.photos.filters import PhotoFilter
+from clever_assignment.photos.models import Photo
+
+RENDERERS = {renderer.format: renderer for renderer in EXPORT_RENDERERS}
+EXTENSIONS = {'.csv': 'csv', '.parquet': 'parquet'}
+
+class Command(BaseCommand):
+    """
+    Django management command to dump photos to a file in the export formats of the API.
+    """
+    help = (
+        'Export photos as NDJSON, CSV (the photos.csv layout, re-importable with import_photos) '
+        'or Parquet, streaming rows from a server-side cursor.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Output file, or - for standard output.')
+        parser.add_argument(
+            '--format', choices=['ndjson', 'csv', 'parquet'],
+            help='Output format (default: from the file extension, else ndjson).',
+        )
+        parser.add_argument('--chunk-size', type=int, default=EXPORT_CHUNK_SIZE, help='Rows fetched per round trip.')
+        parser.add_argument(
+            '--filter', action='append', default=[], metavar='NAME=VALUE',
+            help='Photo list filter, e.g. --filter photographer=<uuid> --filter color=#336699 (repeatable).',
+        )
+
+    def handle(self, *args, **options):
+        """
+        Main handler for export_photos command.
+        """
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size must be positive.')
+        path = options['path']
+        fmt = options['format'] or EXTENSIONS.get(os.path.splitext(path)[1], 'ndjson')
+        if fmt not in RENDERERS:
+            raise CommandError('Parquet export requires the pyarrow package.')
+        renderer = RENDERERS[fmt]()
+        queryset = self.get_queryset(options['filter'])
+
+        started = time.monotonic()
+        size = 0
+        out = sys.stdout.buffer if path == '-' else open(path, 'wb')
+        try:
+            for data in renderer.stream(queryset, options['chunk_size']):
+                out.write(data)
+                size += len(data)
+        finally:
+            if out is not sys.stdout.buffer:
+                out.close()
+        if path != '-':
+            self.stdout.write(self.style.SUCCESS(
+                f'Exported photos to {path} ({fmt}, {size} bytes) in {time.monotonic() - started:.2f}s.'
+            ))
+
+    @staticmethod
+    def get_queryset(filters):
+        """
+        Apply NAME=VALUE filters through the photo list filterset.
+        """
+        data = {}
+        for item in filters:
+            name, sep, value = item.partition('=')
+            if not sep:
+                raise CommandError(f'Invalid --filter {item!r}; expected NAME=VALUE.')
+            data[name] = value
+        filterset = PhotoFilter(data=data, queryset=Photo.objects.order_by('created_at', 'id'))
+        unknown = sorted(set(data) - set(filterset.filters))
+        if unknown:
+            raise CommandError(f'Unknown filter: {", ".join(unknown)}')
+        if not filterset.is_valid():
+            raise CommandError(f'Invalid filters: {dict(filterset.errors)}')
+        return filterset.qs
@@ -1,61 +1,250 @@
 import csv
+import json
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
 from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from clever_assignment.core.cache import bump_generation
+from clever_assignment.core.importing import (
+    ImportStats, init_worker, insert_photos, optional_int, parse_chunk, prune_missing, read_chunks,
+    resolve_photographers, sync_chunk,
+)
+from clever_assignment.core.pool import close_pools
 from clever_assignment.photos.models import Photo
-from clever_assignment.photographers.models import Photographer
+from clever_assignment.photographers.resolution import IDENTITY_GENERATION, resolver
 
 class Command(BaseCommand):
     """
-    Django management command to import photos and photographers from photos.csv.
+    Django management command to import photos and photographers from a Pexels CSV file.
     """
-    help = 'Import photos and photographers from photos.csv.'
+    help = 'Import photos and photographers from a Pexels CSV file (default: photos.csv).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?', default='photos.csv', help='Path to the CSV file.')
+        parser.add_argument(
+            '--bulk', action='store_true',
+            help='Stream the file in chunks and insert each chunk with bulk_create in its own transaction.',
+        )
+        parser.add_argument('--chunk-size', type=int, default=5000, help='Rows per chunk in bulk mode.')
+        parser.add_argument(
+            '--workers', type=int, default=1,
+            help='Number of worker processes inserting chunks in bulk mode.',
+        )
+        parser.add_argument(
+            '--incremental', action='store_true',
+            help='Delta-sync keyed on the Pexels photo and photographer ids: unchanged rows are skipped, '
+                 'new and changed rows are upserted.',
+        )
+        parser.add_argument(
+            '--prune', action='store_true',
+            help='With --incremental, delete imported photos (and photographers) missing from the feed.',
+        )
+        parser.add_argument(
+            '--checkpoint', metavar='PATH',
+            help='With --incremental, record progress in PATH after every chunk and resume from it.',
+        )
 
     def handle(self, *args, **options):
         """
         Main handler for import command.
         Reads CSV and creates Photo and Photographer objects.
         """
+        path = options['path']
+        if options['chunk_size'] < 1 or options['workers'] < 1:
+            raise CommandError('--chunk-size and --workers must be positive.')
+        if (options['prune'] or options['checkpoint']) and not options['incremental']:
+            raise CommandError('--prune and --checkpoint require --incremental.')
+        started = time.monotonic()
         try:
-            with open('photos.csv', newline='', encoding='utf-8') as csvfile:
-                reader = csv.DictReader(csvfile)
-                photo_count = 0
-                photographer_count = 0
-                for row in reader:
-                    try:
-                        photographer, created = Photographer.objects.get_or_create(
-                            url=row['photographer_url'],
-                            defaults={
-                                'name': row['photographer'],
-                            }
-                        )
-                        if created:
-                            photographer_count += 1
-
-                        _, created = Photo.objects.get_or_create(
-                            url=row['url'],
-                            defaults={
-                                'width': row['width'],
-                                'height': row['height'],
-                                'avg_color': row['avg_color'],
-                                'src_original': row['src.original'],
-                                'src_large2x': row['src.large2x'],
-                                'src_large': row['src.large'],
-                                'src_medium': row['src.medium'],
-                                'src_small': row['src.small'],
-                                'src_portrait': row['src.portrait'],
-                                'src_landscape': row['src.landscape'],
-                                'src_tiny': row['src.tiny'],
-                                'alt': row['alt'],
-                                'photographer': photographer,
-                            }
-                        )
-                        if created:
-                            photo_count += 1
-                    except KeyError as e:
-                        self.stderr.write(self.style.ERROR(f'Missing column in CSV: {e}'))
-                    except Exception as e:
-                        self.stderr.write(self.style.ERROR(f'Error importing row: {e}'))
-                self.stdout.write(self.style.SUCCESS(f'Imported {photo_count} photos and {photographer_count} photographers.'))
+            with open(path, newline='', encoding='utf-8') as csvfile:
+                if options['incremental']:
+                    stats = self.incremental_import(
+                        csvfile, path, options['chunk_size'], options['prune'], options['checkpoint'],
+                    )
+                elif options['bulk']:
+                    stats = self.bulk_import(csvfile, options['chunk_size'], options['workers'])
+                else:
+                    stats = self.row_import(csvfile)
         except FileNotFoundError:
-            raise CommandError('photos.csv file not found.')
+            raise CommandError(f'{path} file not found.')
+        except CommandError:
+            raise
         except Exception as e:
             raise CommandError(f'Unexpected error: {e}')
+
+        elapsed = time.monotonic() - started
+        if stats.photos or stats.photographers or stats.updated or stats.deleted:
+            # Bulk writes bypass model signals; invalidate cached reads explicitly.
+            bump_generation('photos', 'photographers')
+        if stats.updated or stats.deleted:
+            # Renamed or pruned photographers must not resolve from stale ids.
+            bump_generation(IDENTITY_GENERATION)
+        for line, message in stats.errors:
+            self.stderr.write(self.style.ERROR(f'Line {line}: {message}'))
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {stats.photos} photos and {stats.photographers} photographers.'
+        ))
+        rate = stats.rows / elapsed if elapsed else stats.rows
+        self.stdout.write(
+            f'Processed {stats.rows} rows in {elapsed:.2f}s ({rate:.0f} rows/sec), '
+            f'{stats.skipped} skipped, {len(stats.errors)} errors.'
+        )
+        if options['incremental']:
+            self.stdout.write(f'Updated {stats.updated} photos, deleted {stats.deleted} rows.')
+
+    def row_import(self, csvfile):
+        """
+        Import row by row: photographers through the shared resolver, photos
+        with get_or_create.
+        """
+        stats = ImportStats()
+        reader = csv.DictReader(csvfile)
+        for row in reader:
+            stats.rows += 1
+            try:
+                photographer_ids, created = resolver.resolve_many([(row['photographer'], row['photographer_url'])])
+                stats.photographers += created
+
+                _, created = Photo.objects.get_or_create(
+                    url=row['url'],
+                    defaults={
+                        'width': row['width'],
+                        'height': row['height'],
+                        'avg_color': row['avg_color'],
+                        'src_original': row['src.original'],
+                        'src_large2x': row['src.large2x'],
+                        'src_large': row['src.large'],
+                        'src_medium': row['src.medium'],
+                        'src_small': row['src.small'],
+                        'src_portrait': row['src.portrait'],
+                        'src_landscape': row['src.landscape'],
+                        'src_tiny': row['src.tiny'],
+                        'alt': row['alt'],
+                        'photographer_id': photographer_ids[(row['photographer'], row['photographer_url'])],
+                    }
+                )
+                if created:
+                    stats.photos += 1
+                else:
+                    stats.skipped += 1
+            except KeyError as e:
+                stats.errors.append((reader.line_num, f'Missing column in CSV: {e}'))
+            except Exception as e:
+                stats.errors.append((reader.line_num, f'Error importing row: {e}'))
+        return stats
+
+    def bulk_import(self, csvfile, chunk_size, workers):
+        """
+        Import in fixed-size chunks. Photographers are resolved in this process
+        through the shared resolver (at most one upsert per chunk) so parallel
+        workers never race to create them; photo inserts optionally fan out
+        over a process pool.
+        """
+        stats = ImportStats()
+
+        def prepare(chunk):
+            parsed = parse_chunk(chunk, stats)
+            photographer_ids = resolve_photographers(parsed, stats)
+            return [
+                (row.line, {**row.fields, 'photographer_id': photographer_ids[(row.photographer_name, row.photographer_url)]})
+                for row in parsed
+            ]
+
+        if workers == 1:
+            for chunk in read_chunks(csvfile, chunk_size):
+                photo_rows = prepare(chunk)
+                if photo_rows:
+                    stats.merge(insert_photos(photo_rows))
+            return stats
+
+        # Forked workers must not share the parent's database connections.
+        connections.close_all()
+        close_pools()
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker) as pool:
+            pending = set()
+            for chunk in read_chunks(csvfile, chunk_size):
+                photo_rows = prepare(chunk)
+                if not photo_rows:
+                    continue
+                if len(pending) >= workers * 2:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        stats.merge(future.result())
+                pending.add(pool.submit(insert_photos, photo_rows))
+            for future in pending:
+                stats.merge(future.result())
+        return stats
+
+    def incremental_import(self, csvfile, path, chunk_size, prune, checkpoint):
+        """
+        Sync the feed chunk by chunk. After each committed chunk the last CSV
+        line is written to the checkpoint file, so a crashed run resumes where
+        it stopped; the checkpoint is removed once the whole file is synced.
+        """
+        stats = ImportStats()
+        source = self.source_signature(path)
+        resume_after = self.load_checkpoint(checkpoint, source) if checkpoint else 0
+        if resume_after:
+            self.stdout.write(f'Resuming after line {resume_after}.')
+        seen_photos, seen_photographers = set(), set()
+
+        for chunk in read_chunks(csvfile, chunk_size):
+            if prune:
+                for _, row in chunk:
+                    for seen, column in ((seen_photos, 'id'), (seen_photographers, 'photographer_id')):
+                        try:
+                            seen.add(optional_int(row.get(column)))
+                        except ValueError:
+                            pass
+            last_line = chunk[-1][0]
+            if last_line <= resume_after:
+                continue
+            parsed = parse_chunk(chunk, stats, require_ids=True)
+            if parsed:
+                sync_chunk(parsed, stats)
+            if checkpoint:
+                self.save_checkpoint(checkpoint, source, last_line)
+
+        if prune:
+            if stats.errors:
+                self.stderr.write(self.style.WARNING('Skipping --prune because some rows failed to import.'))
+            else:
+                stats.deleted = sum(prune_missing(seen_photos, seen_photographers))
+        if checkpoint and os.path.exists(checkpoint):
+            os.remove(checkpoint)
+        return stats
+
+    @staticmethod
+    def source_signature(path):
+        """
+        Identify the input file so a checkpoint is only reused for the same file.
+        """
+        st = os.stat(path)
+        return {'path': os.path.abspath(path), 'size': st.st_size, 'mtime': st.st_mtime}
+
+    def load_checkpoint(self, checkpoint, source):
+        """
+        Return the last committed CSV line recorded in the checkpoint, or 0.
+        """
+        try:
+            with open(checkpoint, encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return 0
+        except ValueError:
+            raise CommandError(f'Checkpoint {checkpoint} is not valid JSON.')
+        if data.get('source') != source:
+            self.stderr.write(self.style.WARNING('Checkpoint belongs to a different file; starting over.'))
+            return 0
+        return data.get('line', 0)
+
+    @staticmethod
+    def save_checkpoint(checkpoint, source, line):
+        """
+        Atomically record the last committed CSV line.
+        """
+        tmp = f'{checkpoint}.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({'source': source, 'line': line}, f)
+        os.replace(tmp, checkpoint)
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+from clever_assignment.core.cache import bump_generation
+from clever_assignment.photos.activity import reconcile_photo_counts
+from clever_assignment.photos.models import Photo
+from clever_assignment.photographers.models import Photographer
+from clever_assignment.photographers.resolution import IDENTITY_GENERATION, merge_duplicate_photographers
+
+class Command(BaseCommand):
+    """
+    Django management command to merge photographers sharing a name and URL.
+    """
+    help = (
+        'Merge duplicate photographers (same name and URL) into the oldest one, moving their photos. '
+        'Each group is merged in its own transaction.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Report the duplicates without changing anything.')
+
+    def handle(self, *args, **options):
+        """
+        Main handler for merge_photographers command.
+        """
+        groups, removed, moved = merge_duplicate_photographers(Photographer, Photo, dry_run=options['dry_run'])
+        if options['dry_run']:
+            self.stdout.write(
+                f'Would merge {groups} duplicate groups: {removed} photographers removed, {moved} photos moved.'
+            )
+            return
+        if groups:
+            # QuerySet.update() on photos bypasses the photo signals.
+            reconcile_photo_counts(Photographer, Photo)
+            bump_generation('photos', 'photographers', IDENTITY_GENERATION)
+        self.stdout.write(self.style.SUCCESS(
+            f'Merged {groups} duplicate groups: {removed} photographers removed, {moved} photos moved.'
+        ))
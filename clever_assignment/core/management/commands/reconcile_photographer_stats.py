@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+from clever_assignment.core.cache import bump_generation
+from clever_assignment.photos.activity import reconcile_photo_counts
+from clever_assignment.photos.models import Photo
+from clever_assignment.photographers.models import Photographer
+
+class Command(BaseCommand):
+    """
+    Django management command to repair the photographer photo counters.
+    """
+    help = (
+        'Recompute photo_count and last_photo_at of the photographers whose stored values differ from the '
+        'photo table, e.g. after writing photos with raw SQL.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Report the drifted photographers without changing anything.')
+        parser.add_argument('--batch-size', type=int, default=500, help='Photographers per UPDATE statement.')
+
+    def handle(self, *args, **options):
+        """
+        Main handler for reconcile_photographer_stats command.
+        """
+        wrong = reconcile_photo_counts(
+            Photographer, Photo, dry_run=options['dry_run'], batch_size=options['batch_size'],
+        )
+        if options['dry_run']:
+            self.stdout.write(f'{wrong} photographers have drifted counters.')
+            return
+        if wrong:
+            bump_generation('photographers')
+        self.stdout.write(self.style.SUCCESS(f'Repaired the counters of {wrong} photographers.'))
@@ -0,0 +1,43 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count, Sum
+from clever_assignment.core.models import RateLimitBucket
+
+class Command(BaseCommand):
+    """
+    Django management command to report the counters of the shared rate limiter.
+    """
+    help = (
+        'Show requests and throttled requests per throttle scope and the most throttled keys. '
+        'With --prune, delete buckets idle for the given number of seconds (their counters are lost).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=10, help='Number of most throttled keys to list.')
+        parser.add_argument('--prune', type=int, metavar='SECONDS', help='Delete buckets idle for this long.')
+
+    def handle(self, *args, **options):
+        """
+        Main handler for throttle_stats command.
+        """
+        if options['prune'] is not None:
+            if options['prune'] < 0:
+                raise CommandError('--prune must not be negative.')
+            # A bucket whose TAT has passed is full again: deleting it only loses its counters.
+            deleted, _ = RateLimitBucket.objects.filter(tat__lt=time.time() - options['prune']).delete()
+            self.stdout.write(self.style.SUCCESS(f'Pruned {deleted} idle buckets.'))
+
+        scopes = (
+            RateLimitBucket.objects.values('scope')
+            .annotate(keys=Count('key'), total=Sum('requests'), denied=Sum('throttled'))
+            .order_by('scope')
+        )
+        for row in scopes:
+            share = 100 * row['denied'] / row['total'] if row['total'] else 0
+            self.stdout.write(
+                f"{row['scope']}: {row['total']} requests from {row['keys']} keys, "
+                f"{row['denied']} throttled ({share:.1f}%)"
+            )
+        top = RateLimitBucket.objects.filter(throttled__gt=0).order_by('-throttled', 'key')[:options['top']]
+        for bucket in top:
+            self.stdout.write(f'  {bucket.key}: {bucket.throttled} of {bucket.requests} throttled')
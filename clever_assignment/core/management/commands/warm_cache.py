@@ -0,0 +1,60 @@
+import time
+from urllib.parse import urlsplit
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+
+DEFAULT_PATHS = [
+    '/api/v1/photos/',
+    '/api/v1/photos/?ordering=-created_at',
+    '/api/v1/photographers/',
+]
+
+class Command(BaseCommand):
+    """
+    Django management command to pre-populate the response cache after a deploy.
+    """
+    help = 'Request the hottest anonymous read pages so they are served from the response cache.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'paths', nargs='*',
+            help='Paths (with query string) to warm, in addition to the first pages of the default lists.',
+        )
+        parser.add_argument('--pages', type=int, default=3, help='Number of pages of each default list to warm.')
+        parser.add_argument(
+            '--base-url', default=f'http://{settings.ALLOWED_HOSTS[0]}',
+            help='Public scheme and host the API is served from; pagination links in cached pages use it.',
+        )
+
+    def handle(self, *args, **options):
+        """
+        Main handler for warm_cache command.
+        """
+        if not settings.RESPONSE_CACHE_TIMEOUT:
+            raise CommandError('The response cache is disabled (RESPONSE_CACHE_TIMEOUT=0).')
+        if options['pages'] < 1:
+            raise CommandError('--pages must be positive.')
+        base = urlsplit(options['base_url'])
+        if not base.netloc:
+            raise CommandError('--base-url must include a scheme and host.')
+        client = Client(HTTP_HOST=base.netloc, secure=base.scheme == 'https')
+
+        paths = []
+        for path in DEFAULT_PATHS:
+            paths.append(path)
+            separator = '&' if '?' in path else '?'
+            paths.extend(f'{path}{separator}page={page}' for page in range(2, options['pages'] + 1))
+        paths.extend(options['paths'])
+
+        warmed = 0
+        started = time.monotonic()
+        for path in paths:
+            response = client.get(path, HTTP_ACCEPT='application/json')
+            state = response.get('X-Cache', 'not cacheable')
+            self.stdout.write(f'{response.status_code} {state} {path}')
+            if response.status_code == 200 and 'X-Cache' in response:
+                warmed += 1
+        self.stdout.write(self.style.SUCCESS(
+            f'Warmed {warmed} of {len(paths)} pages in {time.monotonic() - started:.2f}s.'
+        ))
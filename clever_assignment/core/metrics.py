@@ -0,0 +1,326 @@
+"""
+Per-route request metrics, exposed in the Prometheus text format at
+`/api/v1/metrics/`.
+
+`MetricsMiddleware` records, per resolved URL name and method, request
+counts by status, latency and response size histograms, and the number and
+time of database queries (counted by an execute wrapper installed on every
+connection, so queries run by the async ORM in worker threads are attributed
+too). The throttles count their rejections per scope.
+
+Streaming responses are recorded once their content is exhausted or
+closed, with the queries and time spent producing it.
+
+Updates go to an in-memory registry of the current process, under a lock
+and without I/O. With METRICS_DIR set, a background thread of each process
+also writes its registry to its own file there every METRICS_FLUSH_INTERVAL
+seconds, and the endpoint sums the files of all processes; otherwise it
+serves the current process only. Files of exited processes keep counting, as counters should:
+empty the directory when the service is redeployed.
+"""
+import atexit
+import contextvars
+import glob
+import json
+import os
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+# Upper bounds of the histogram buckets.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (100, 1000, 10000, 100000, 1000000, 10000000)
+
+HELP = {
+    'http_requests_total': ('counter', 'Requests by route, method and status.'),
+    'http_request_duration_seconds': ('histogram', 'Request latency by route and method.'),
+    'http_response_size_bytes': ('histogram', 'Size of non-streaming responses by route and method.'),
+    'db_queries_total': ('counter', 'Database queries by route and method.'),
+    'db_query_duration_seconds_total': ('counter', 'Time spent in database queries by route and method.'),
+    'api_throttled_requests_total': ('counter', 'Requests rejected by a throttle, by scope.'),
+}
+
+# Database work of the request being handled; copied into the threads the async ORM uses.
+current_request = contextvars.ContextVar('metrics_request', default=None)
+
+
+class Registry:
+    """
+    Counters and histograms of one process, keyed on (name, labels).
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.pid = os.getpid()
+        self.started = time.time_ns()
+        self.counters = {}
+        # (name, labels) -> [count per bucket..., +Inf count, sum]
+        self.histograms = {}
+        self.flusher = None
+
+    def inc(self, name, labels, value=1):
+        with self.lock:
+            key = (name, labels)
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, labels, value, buckets):
+        with self.lock:
+            key = (name, labels)
+            counts = self.histograms.get(key)
+            if counts is None:
+                counts = self.histograms[key] = [0] * (len(buckets) + 2)
+            index = next((i for i, bound in enumerate(buckets) if value <= bound), len(buckets))
+            counts[index] += 1
+            counts[-1] += value
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                'counters': [[name, labels, value] for (name, labels), value in self.counters.items()],
+                'histograms': [[name, labels, list(counts)] for (name, labels), counts in self.histograms.items()],
+            }
+
+    def start_flusher(self):
+        """
+        Start this process's flush thread if METRICS_DIR is set, so requests
+        never write the file themselves. Called after every request.
+        """
+        if not settings.METRICS_DIR or (self.flusher is not None and self.pid == os.getpid()):
+            return
+        with self.lock:
+            if os.getpid() != self.pid:
+                # Forked from a process that already had a registry (and thread).
+                self.reset()
+            if self.flusher is None:
+                self.flusher = threading.Thread(target=self.flush_periodically, name='metrics-flush', daemon=True)
+                self.flusher.start()
+
+    def flush_periodically(self):
+        while True:
+            time.sleep(settings.METRICS_FLUSH_INTERVAL)
+            try:
+                self.flush()
+            except OSError:
+                # METRICS_DIR missing or full: retry at the next interval.
+                continue
+
+    def flush(self):
+        if os.getpid() != self.pid:
+            # Forked from a process that already had a registry.
+            self.reset()
+        if not settings.METRICS_DIR:
+            return
+        path = os.path.join(settings.METRICS_DIR, f'metrics-{self.pid}-{self.started}.json')
+        tmp = f'{path}.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self.snapshot(), f)
+        os.replace(tmp, path)
+
+
+registry = Registry()
+atexit.register(registry.flush)
+
+
+def collect():
+    """
+    Snapshots of every process writing to METRICS_DIR, or of this process.
+    """
+    if not settings.METRICS_DIR:
+        return [registry.snapshot()]
+    registry.flush()
+    snapshots = []
+    for path in glob.glob(os.path.join(settings.METRICS_DIR, 'metrics-*.json')):
+        try:
+            with open(path, encoding='utf-8') as f:
+                snapshots.append(json.load(f))
+        except (OSError, ValueError):
+            # Removed or replaced while listing.
+            continue
+    return snapshots
+
+
+def format_labels(labels, extra=()):
+    pairs = [*labels, *extra]
+    if not pairs:
+        return ''
+    escaped = (
+        (name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')) for name, value in pairs
+    )
+    return '{' + ','.join(f'{name}="{value}"' for name, value in escaped) + '}'
+
+
+def render(snapshots):
+    """
+    Sum the snapshots and render them in the Prometheus text format (0.0.4).
+    """
+    counters, histograms = {}, {}
+    for snapshot in snapshots:
+        for name, labels, value in snapshot['counters']:
+            key = (name, tuple(map(tuple, labels)))
+            counters[key] = counters.get(key, 0) + value
+        for name, labels, counts in snapshot['histograms']:
+            key = (name, tuple(map(tuple, labels)))
+            total = histograms.setdefault(key, [0] * len(counts))
+            for i, value in enumerate(counts):
+                total[i] += value
+
+    lines = []
+    for metric, (kind, text) in HELP.items():
+        series = sorted((labels, value) for (name, labels), value in {**counters, **histograms}.items() if name == metric)
+        if not series:
+            continue
+        lines.append(f'# HELP {metric} {text}')
+        lines.append(f'# TYPE {metric} {kind}')
+        for labels, value in series:
+            if kind == 'counter':
+                lines.append(f'{metric}{format_labels(labels)} {value}')
+                continue
+            buckets = LATENCY_BUCKETS if metric == 'http_request_duration_seconds' else SIZE_BUCKETS
+            cumulative = 0
+            for bound, count in zip([*buckets, '+Inf'], value[:-1]):
+                cumulative += count
+                lines.append(f'{metric}_bucket{format_labels(labels, [("le", bound)])} {cumulative}')
+            lines.append(f'{metric}_sum{format_labels(labels)} {value[-1]}')
+            lines.append(f'{metric}_count{format_labels(labels)} {cumulative}')
+    return '\n'.join(lines) + '\n'
+
+
+class QueryStats:
+    __slots__ = ('count', 'seconds')
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+
+def count_queries(execute, sql, params, many, context):
+    """
+    Execute wrapper adding each query to the current request's QueryStats.
+    """
+    stats = current_request.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.count += 1
+        stats.seconds += time.perf_counter() - started
+
+
+def install_query_counter(sender, connection, **kwargs):
+    """
+    connection_created receiver: install count_queries once per connection.
+    """
+    if count_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(count_queries)
+
+
+def route_name(request):
+    """
+    The resolved URL name of a request (its route pattern if unnamed).
+    """
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return '<unmatched>'
+    return match.view_name or match.route
+
+
+class MetricsMiddleware:
+    """
+    Record per-route request metrics. Works on both the sync and the async
+    request path.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        stats = QueryStats()
+        token = current_request.set(stats)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            current_request.reset(token)
+        return self.finish(request, response, started, stats)
+
+    async def __acall__(self, request):
+        stats = QueryStats()
+        token = current_request.set(stats)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_request.reset(token)
+        return self.finish(request, response, started, stats)
+
+    def finish(self, request, response, started, stats):
+        """
+        Record the response now, or once a streaming response has been sent.
+        """
+        if not response.streaming:
+            self.record(request, response, time.perf_counter() - started, stats)
+        elif response.is_async:
+            response.streaming_content = self.astream(response.streaming_content, request, response, started, stats)
+        else:
+            response.streaming_content = self.stream(response.streaming_content, request, response, started, stats)
+        return response
+
+    def stream(self, content, request, response, started, stats):
+        """
+        Relay streaming content, counting the queries each chunk runs.
+        """
+        content = iter(content)
+        try:
+            while True:
+                token = current_request.set(stats)
+                try:
+                    chunk = next(content, None)
+                finally:
+                    current_request.reset(token)
+                if chunk is None:
+                    return
+                yield chunk
+        finally:
+            self.record(request, response, time.perf_counter() - started, stats)
+
+    async def astream(self, content, request, response, started, stats):
+        """
+        Async variant of stream().
+        """
+        content = aiter(content)
+        try:
+            while True:
+                token = current_request.set(stats)
+                try:
+                    chunk = await anext(content, None)
+                finally:
+                    current_request.reset(token)
+                if chunk is None:
+                    return
+                yield chunk
+        finally:
+            self.record(request, response, time.perf_counter() - started, stats)
+
+    @staticmethod
+    def record(request, response, seconds, stats):
+        labels = (('route', route_name(request)), ('method', request.method))
+        registry.inc('http_requests_total', (*labels, ('status', str(response.status_code))))
+        registry.observe('http_request_duration_seconds', labels, seconds, LATENCY_BUCKETS)
+        if not response.streaming:
+            registry.observe('http_response_size_bytes', labels, len(response.content), SIZE_BUCKETS)
+        if stats.count:
+            registry.inc('db_queries_total', labels, stats.count)
+            registry.inc('db_query_duration_seconds_total', labels, stats.seconds)
+        registry.start_flusher()
@@ -0,0 +1,25 @@
+# Generated by Django 5.1.7 on 2026-10-18 03:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RateLimitBucket',
+            fields=[
+                ('key', models.CharField(max_length=255, primary_key=True, serialize=False)),
+                ('scope', models.CharField(max_length=50)),
+                ('tat', models.FloatField()),
+                ('requests', models.PositiveBigIntegerField(default=0)),
+                ('throttled', models.PositiveBigIntegerField(default=0)),
+                ('allowed', models.BooleanField(default=True)),
+            ],
+        ),
+    ]
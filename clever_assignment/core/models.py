@@ -0,0 +1,21 @@
+from django.db import models
+
+class RateLimitBucket(models.Model):
+    """
+    Shared state of one throttle key (see core/throttling.py): the GCRA
+    theoretical arrival time plus request counters.
+    """
+    key = models.CharField(max_length=255, primary_key=True)
+    scope = models.CharField(max_length=50)
+    # Epoch seconds at which the bucket is empty again.
+    tat = models.FloatField()
+    requests = models.PositiveBigIntegerField(default=0)
+    throttled = models.PositiveBigIntegerField(default=0)
+    # Whether the latest request was allowed.
+    allowed = models.BooleanField(default=True)
+
+    def __str__(self):
+        """
+        String representation of RateLimitBucket.
+        """
+        return self.key
@@ -0,0 +1,258 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import namedtuple
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.core.paginator import InvalidPage
+from django.db import connections
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+from rest_framework.utils.urls import replace_query_param
+
+Cursor = namedtuple('Cursor', ['ordering', 'position', 'reverse'])
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Keyset (seek) pagination over the active ordering plus an `id` tie-breaker.
+    Each page is fetched with a `WHERE (ordering) > (last row)` predicate, so
+    deep pages cost the same as the first one and no COUNT(*) is issued.
+    """
+    ordering = '-created_at'
+    tie_breaker = 'id'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """
+        Return one page of results positioned after the decoded cursor.
+        """
+        return self.set_page(list(self.get_page_queryset(queryset, request, view)))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """
+        Async variant of paginate_queryset for async views.
+        """
+        return self.set_page([obj async for obj in self.get_page_queryset(queryset, request, view)])
+
+    def get_page_queryset(self, queryset, request, view):
+        """
+        Return the queryset of the requested page plus one lookahead row.
+        """
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_keyset_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+
+        self.reverse = self.cursor is not None and self.cursor.reverse
+        ordering = self.reverse_ordering(self.ordering) if self.reverse else self.ordering
+        queryset = queryset.order_by(*ordering)
+        if self.cursor is not None:
+            queryset = queryset.filter(self.get_seek_filter(
+                queryset.model, ordering, self.cursor.position, connections[queryset.db].features.nulls_order_largest,
+            ))
+        return queryset[:self.page_size + 1]
+
+    def set_page(self, results):
+        """
+        Record the fetched page and whether there are pages around it.
+        """
+        has_more = len(results) > self.page_size
+        self.page = results[:self.page_size]
+        if self.reverse:
+            self.page.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, self.cursor is not None
+        if not self.page:
+            self.has_next = self.has_previous = False
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+        return self.page
+
+    def get_keyset_ordering(self, request, queryset, view):
+        """
+        Resolve the ordering from the view's OrderingFilter and make it total
+        by appending the primary key in the direction of the last term.
+        """
+        ordering = list(self.get_ordering(request, queryset, view))
+        names = [term.lstrip('-') for term in ordering]
+        if self.tie_breaker not in names and 'pk' not in names:
+            descending = ordering[-1].startswith('-')
+            ordering.append(f'-{self.tie_breaker}' if descending else self.tie_breaker)
+        return tuple(ordering)
+
+    @staticmethod
+    def reverse_ordering(ordering):
+        """
+        Flip the direction of every ordering term.
+        """
+        return tuple(term[1:] if term.startswith('-') else f'-{term}' for term in ordering)
+
+    @staticmethod
+    def get_seek_filter(model, ordering, position, nulls_largest=False):
+        """
+        Build the lexicographic "row after position" predicate for the ordering.
+        The leading column is also bounded on its own so the planner can turn
+        the predicate into an index range scan. Nullable columns are compared
+        the way the backend sorts NULLs (as the largest values when
+        nulls_largest, else as the smallest).
+        """
+        predicate = Q()
+        equal = {}
+        for term, raw_value in zip(ordering, position):
+            value = KeysetPagination.to_python(model, term.lstrip('-'), raw_value)
+            predicate |= Q(**equal) & KeysetPagination.get_after_filter(term, value, nulls_largest)
+            equal[term.lstrip('-')] = value
+        first = ordering[0]
+        return KeysetPagination.get_after_filter(first, equal[first.lstrip('-')], nulls_largest, inclusive=True) & predicate
+
+    @staticmethod
+    def get_after_filter(term, value, nulls_largest, inclusive=False):
+        """
+        Rows after value (or equal to it, if inclusive) in the direction of term.
+        """
+        name = term.lstrip('-')
+        nulls_after = nulls_largest != term.startswith('-')
+        if value is None:
+            if inclusive:
+                return Q(**{f'{name}__isnull': True}) if nulls_after else Q()
+            return Q(pk__in=[]) if nulls_after else Q(**{f'{name}__isnull': False})
+        lookup = ('lt' if term.startswith('-') else 'gt') + ('e' if inclusive else '')
+        predicate = Q(**{f'{name}__{lookup}': value})
+        return predicate | Q(**{f'{name}__isnull': True}) if nulls_after else predicate
+
+    @staticmethod
+    def to_python(model, name, raw_value):
+        """
+        Convert a cursor value back to the Python type of the model field.
+        Annotations (e.g. relevance scores) are kept as decoded JSON values.
+        """
+        try:
+            field = model._meta.pk if name == 'pk' else model._meta.get_field(name)
+        except FieldDoesNotExist:
+            return raw_value
+        try:
+            return field.to_python(raw_value)
+        except ValidationError:
+            raise NotFound(KeysetPagination.invalid_cursor_message)
+
+    def decode_cursor(self, request):
+        """
+        Decode the cursor query parameter; an empty value selects the first page.
+        """
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            padded = encoded + '=' * (-len(encoded) % 4)
+            payload = json.loads(urlsafe_b64decode(padded.encode('ascii')))
+            cursor = Cursor(tuple(payload['o']), tuple(payload['p']), bool(payload.get('r')))
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+        if cursor.ordering != self.ordering or len(cursor.position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return cursor
+
+    def encode_cursor(self, cursor):
+        """
+        Encode a cursor into the current URL.
+        """
+        payload = {'o': list(cursor.ordering), 'p': list(cursor.position)}
+        if cursor.reverse:
+            payload['r'] = 1
+        encoded = urlsafe_b64encode(json.dumps(payload, separators=(',', ':')).encode()).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded.rstrip('='))
+
+    def get_position(self, instance):
+        """
+        Return the JSON-serializable ordering values of an instance.
+        """
+        position = []
+        for term in self.ordering:
+            value = getattr(instance, term.lstrip('-'))
+            position.append(value if isinstance(value, (int, float, str)) or value is None else str(value))
+        return position
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return self.encode_cursor(Cursor(self.ordering, self.get_position(self.page[-1]), False))
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        return self.encode_cursor(Cursor(self.ordering, self.get_position(self.page[0]), True))
+
+
+class PageOrCursorPagination(PageNumberPagination):
+    """
+    Default pagination: page numbers, or keyset pagination when the request
+    carries a `cursor` query parameter (use `?cursor=` for the first page).
+    """
+    keyset_class = KeysetPagination
+
+    def uses_keyset(self, request):
+        return self.keyset_class.cursor_query_param in request.query_params
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """
+        Dispatch to keyset pagination when the cursor parameter is present.
+        """
+        self.keyset = None
+        if self.uses_keyset(request):
+            self.keyset = self.keyset_class()
+            return self.keyset.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """
+        Async variant of paginate_queryset for async views: the count and
+        the page are fetched with the async ORM.
+        """
+        self.keyset = None
+        if self.uses_keyset(request):
+            self.keyset = self.keyset_class()
+            return await self.keyset.apaginate_queryset(queryset, request, view)
+
+        self.request = request
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+        paginator = self.django_paginator_class(queryset, page_size)
+        paginator.count = await queryset.acount()
+        page_number = self.get_page_number(request, paginator)
+        try:
+            self.page = paginator.page(page_number)
+        except InvalidPage as exc:
+            raise NotFound(self.invalid_page_message.format(page_number=page_number, message=str(exc)))
+        if paginator.num_pages > 1 and self.template is not None:
+            self.display_page_controls = True
+        self.page.object_list = [obj async for obj in self.page.object_list]
+        return self.page.object_list
+
+    def get_page_state(self):
+        """
+        What the paginated response carries besides the page's rows: the
+        count for page numbers, which links exist for keyset pages.
+        """
+        if self.keyset is not None:
+            return self.keyset.has_next, self.keyset.has_previous
+        return self.page.paginator.count,
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def to_html(self):
+        if self.keyset is not None:
+            return self.keyset.to_html()
+        return super().to_html()
+
+    def get_schema_operation_parameters(self, view):
+        return (
+            super().get_schema_operation_parameters(view)
+            + self.keyset_class().get_schema_operation_parameters(view)
+        )
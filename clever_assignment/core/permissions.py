@@ -0,0 +1,18 @@
+import hmac
+
+from django.conf import settings
+from rest_framework import permissions
+
+
+class IsMetricsScraper(permissions.BasePermission):
+    """
+    Allow requests carrying `Authorization: Bearer <METRICS_TOKEN>` or coming
+    from an address in METRICS_ALLOWED_IPS.
+    """
+
+    def has_permission(self, request, view):
+        token = settings.METRICS_TOKEN
+        scheme, _, credentials = request.META.get('HTTP_AUTHORIZATION', '').partition(' ')
+        if token and scheme.lower() == 'bearer' and hmac.compare_digest(credentials.encode(), token.encode()):
+            return True
+        return request.META.get('REMOTE_ADDR') in settings.METRICS_ALLOWED_IPS
@@ -0,0 +1,50 @@
+"""
+Helpers for the psycopg connection pools of the PostgreSQL backend.
+
+With POSTGRES_POOL on, Django keeps one pool per database alias and process
+(see DATABASES in settings); a request borrows a connection from it and
+returns it when the request finishes, instead of connecting to Postgres
+for every request.
+"""
+from django.db import connections
+
+
+def pool_stats():
+    """
+    Statistics of the connection pool of each database alias that has one,
+    keyed on alias. Counters cover the life of this process's pool.
+    """
+    stats = {}
+    for connection in connections.all():
+        pool = getattr(connection, 'pool', None)
+        if pool is None:
+            continue
+        # psycopg_pool omits counters that are still zero.
+        raw = pool.get_stats()
+        requests = raw.get('requests_num', 0)
+        wait_ms = raw.get('requests_wait_ms', 0)
+        stats[connection.alias] = {
+            'min_size': raw.get('pool_min', 0),
+            'max_size': raw.get('pool_max', 0),
+            'size': raw.get('pool_size', 0),
+            'in_use': raw.get('pool_size', 0) - raw.get('pool_available', 0),
+            'idle': raw.get('pool_available', 0),
+            'waiting': raw.get('requests_waiting', 0),
+            'requests': requests,
+            'wait_ms_total': wait_ms,
+            'wait_ms_mean': round(wait_ms / requests, 3) if requests else 0,
+            'timeouts': raw.get('requests_errors', 0),
+            'connections_lost': raw.get('connections_lost', 0),
+        }
+    return stats
+
+
+def close_pools():
+    """
+    Close this process's connection pools. Called before forking workers,
+    which would otherwise share the pooled connections' sockets; the pools
+    are recreated on next use.
+    """
+    for connection in connections.all():
+        if getattr(connection, 'pool', None) is not None:
+            connection.close_pool()
@@ -0,0 +1,153 @@
+"""
+Precomputed OpenAPI schema.
+
+`build_schema` generates the schema once (at image build or deploy time)
+into SCHEMA_ARTIFACT_DIR as YAML and JSON, plus a manifest holding a
+content hash of each file. The schema view serves those bytes with
+long-lived Cache-Control and ETag headers instead of introspecting every
+view per request. Swagger UI and Redoc point at a schema URL versioned with
+the hash, so browsers refetch the schema only after a deploy. Without an
+artifact the views generate the schema live in DEBUG and answer 503
+otherwise.
+"""
+import hashlib
+import json
+import os
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from drf_spectacular.generators import SchemaGenerator
+from drf_spectacular.plumbing import set_query_parameters
+from drf_spectacular.renderers import OpenApiJsonRenderer, OpenApiYamlRenderer
+from drf_spectacular.utils import extend_schema
+from drf_spectacular.views import SCHEMA_KWARGS, SpectacularAPIView, SpectacularRedocView, SpectacularSwaggerView
+from rest_framework.exceptions import APIException
+
+MANIFEST = 'manifest.json'
+# Artifact format -> (file name, renderer).
+SCHEMA_FILES = {
+    'yaml': ('openapi.yaml', OpenApiYamlRenderer),
+    'json': ('openapi.json', OpenApiJsonRenderer),
+}
+
+_loaded = {'key': None, 'artifact': None}
+
+
+def build_schema(directory):
+    """
+    Generate the schema and write it with its manifest to directory.
+    Returns the manifest.
+    """
+    schema = SchemaGenerator().get_schema(request=None, public=True)
+    os.makedirs(directory, exist_ok=True)
+    files = {}
+    for fmt, (name, renderer) in SCHEMA_FILES.items():
+        content = renderer().render(schema, renderer_context={})
+        write_atomic(os.path.join(directory, name), content)
+        files[fmt] = {'name': name, 'sha256': hashlib.sha256(content).hexdigest(), 'size': len(content)}
+    manifest = {
+        'version': schema['info'].get('version'),
+        'generated_at': datetime.now(timezone.utc).isoformat(),
+        # One hash for the whole artifact, used to version the schema URL.
+        'hash': hashlib.sha256(''.join(files[fmt]['sha256'] for fmt in sorted(files)).encode()).hexdigest(),
+        'files': files,
+    }
+    # Written last: a reader never sees a manifest describing files not yet in place.
+    write_atomic(os.path.join(directory, MANIFEST), json.dumps(manifest, indent=2).encode('utf-8'))
+    return manifest
+
+
+def write_atomic(path, content):
+    tmp = f'{path}.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(content)
+    os.replace(tmp, path)
+
+
+def load_artifact():
+    """
+    Return {'hash', 'files': {format: (content, etag)}} for the artifact in
+    SCHEMA_ARTIFACT_DIR, or None. Kept in memory until the manifest changes.
+    """
+    path = os.path.join(settings.SCHEMA_ARTIFACT_DIR, MANIFEST)
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+    if _loaded['key'] != (path, mtime):
+        with open(path, encoding='utf-8') as f:
+            manifest = json.load(f)
+        files = {}
+        for fmt, entry in manifest['files'].items():
+            with open(os.path.join(settings.SCHEMA_ARTIFACT_DIR, entry['name']), 'rb') as f:
+                files[fmt] = (f.read(), f'"{entry["sha256"]}"')
+        _loaded.update(key=(path, mtime), artifact={'hash': manifest['hash'], 'files': files})
+    return _loaded['artifact']
+
+
+class SchemaUnavailable(APIException):
+    status_code = 503
+    default_detail = 'The API schema has not been built; run the build_schema management command.'
+    default_code = 'schema_unavailable'
+
+
+def cache_headers(response, etag, **control):
+    response['ETag'] = etag
+    patch_cache_control(response, **(control or {'public': True, 'max_age': settings.SCHEMA_CACHE_MAX_AGE}))
+    return response
+
+
+class SchemaView(SpectacularAPIView):
+    """
+    Serve the prebuilt schema in the negotiated format (YAML or JSON).
+    """
+    @extend_schema(**SCHEMA_KWARGS)
+    def get(self, request, *args, **kwargs):
+        artifact = load_artifact()
+        if artifact is None:
+            if settings.DEBUG:
+                return super().get(request, *args, **kwargs)
+            raise SchemaUnavailable()
+        renderer = request.accepted_renderer
+        content, etag = artifact['files']['json' if renderer.format.endswith('json') else 'yaml']
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            charset = f'; charset={renderer.charset}' if renderer.charset else ''
+            response = HttpResponse(content, content_type=renderer.media_type + charset)
+            response['Content-Disposition'] = f'inline; filename="{self._get_filename(request, None)}"'
+        return cache_headers(response, etag)
+
+
+class ArtifactPageMixin:
+    """
+    Cache the Swagger UI / Redoc pages with the artifact's hash as ETag and
+    point them at the schema URL versioned with that hash. The pages embed a
+    CSRF token, so they are only revalidated, never shared.
+    """
+    page = None
+
+    @extend_schema(exclude=True)
+    def get(self, request, *args, **kwargs):
+        artifact = load_artifact()
+        if artifact is None:
+            return super().get(request, *args, **kwargs)
+        etag = f'"{artifact["hash"][:32]}-{self.page}"'
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = super().get(request, *args, **kwargs)
+        return cache_headers(response, etag, private=True, no_cache=True)
+
+    def _get_schema_url(self, request):
+        url = super()._get_schema_url(request)
+        artifact = load_artifact()
+        return set_query_parameters(url, v=artifact['hash'][:12]) if artifact else url
+
+
+class SwaggerView(ArtifactPageMixin, SpectacularSwaggerView):
+    page = 'swagger'
+
+
+class RedocView(ArtifactPageMixin, SpectacularRedocView):
+    page = 'redoc'
@@ -1,13 +1,38 @@
 # Tests for the core app, including management commands and API endpoints.
 
+from asgiref.sync import async_to_sync
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
 from django.core.management import call_command
-from django.test import TestCase
+from django.core.management.base import CommandError
+from django.test import AsyncRequestFactory, TestCase, TransactionTestCase, override_settings
 from io import StringIO
-from clever_assignment.photos.models import Photo
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+from clever_assignment.photos.activity import reconcile_photo_counts
+from clever_assignment.photos.facets import grouped_counts
+from clever_assignment.photos.models import Photo, PhotoFacetCount
 from clever_assignment.photographers.models import Photographer
+from clever_assignment.users.importing import UserImportStats, create_users, parse_batch
+from clever_assignment.users.models import User
+import json
 import os
+import shutil
+import tempfile
+from django.http import HttpResponse
+from django.db import connections
 from django.urls import reverse
-from rest_framework.test import APITestCase
+from rest_framework.test import APIRequestFactory, APITestCase
+from rest_framework_simplejwt.tokens import RefreshToken
+from clever_assignment.photos.views import AsyncPhotoDetailView, AsyncPhotoListView
+from clever_assignment.photographers.views import AsyncPhotographerDetailView, AsyncPhotographerListView
+from clever_assignment.core.checks import check_shared_cache
+from clever_assignment.core.metrics import MetricsMiddleware, registry
+from clever_assignment.core.models import RateLimitBucket
+from clever_assignment.core.pool import pool_stats
+from clever_assignment.core.schema import load_artifact
+from clever_assignment.core.throttling import AnonRateThrottle, ScopedRateThrottle
 
 class HealthCheckApiTest(APITestCase):
     """
@@ -17,7 +42,7 @@ class HealthCheckApiTest(APITestCase):
         url = reverse('health-check')
         response = self.client.get(url)
         self.assertEqual(response.status_code, 200)
-        self.assertEqual(response.json(), {"status": "ok"})
+        self.assertEqual(response.json(), {"status": "ok", "connection_pools": pool_stats()})
 
 class ImportPhotosCommandTest(TestCase):
     """
@@ -51,3 +76,675 @@ class ImportPhotosCommandTest(TestCase):
         self.assertEqual(photo.photographer, photographer)
         self.assertEqual(photo.alt, 'Test alt')
         self.assertEqual(photographer.name, 'Test Photographer')
+
+class CSVFileMixin:
+    """
+    Helpers to write temporary Pexels-style CSV files.
+    """
+    header = 'id,width,height,url,photographer,photographer_url,photographer_id,avg_color,src.original,src.large2x,src.large,src.medium,src.small,src.portrait,src.landscape,src.tiny,alt\n'
+
+    def write_csv(self, rows):
+        handle, path = tempfile.mkstemp(suffix='.csv')
+        with os.fdopen(handle, 'w', encoding='utf-8') as f:
+            f.write(self.header + ''.join(rows))
+        self.addCleanup(os.remove, path)
+        return path
+
+    def row(self, i, photographer=1, width='100'):
+        return (
+            f'{i},{width},200,http://photo/{i},Photographer {photographer},http://photographer/{photographer},{photographer},#123,'
+            f'http://src/o{i}.jpg,http://src/l2x.jpg,http://src/l.jpg,http://src/m.jpg,http://src/s.jpg,'
+            f'http://src/p.jpg,http://src/ls.jpg,http://src/t.jpg,Alt {i}\n'
+        )
+
+class BulkImportPhotosCommandTest(CSVFileMixin, TestCase):
+    """
+    Test the --bulk mode of import_photos with an explicit CSV path.
+    """
+
+    def test_bulk_import_in_chunks(self):
+        path = self.write_csv([self.row(i, photographer=i % 3) for i in range(10)])
+        out = StringIO()
+        call_command('import_photos', path, '--bulk', '--chunk-size', '4', stdout=out, stderr=StringIO())
+        self.assertIn('Imported 10 photos and 3 photographers.', out.getvalue())
+        self.assertIn('rows/sec', out.getvalue())
+        self.assertEqual(Photo.objects.count(), 10)
+        self.assertEqual(Photographer.objects.count(), 3)
+
+    def test_bulk_import_reports_row_errors_and_skips_existing(self):
+        path = self.write_csv([self.row(1), self.row(2, width='wide'), self.row(3)])
+        call_command('import_photos', path, '--bulk', stdout=StringIO(), stderr=StringIO())
+        out, err = StringIO(), StringIO()
+        call_command('import_photos', path, '--bulk', stdout=out, stderr=err)
+        self.assertIn('Line 3: Invalid value', err.getvalue())
+        self.assertIn('Imported 0 photos and 0 photographers.', out.getvalue())
+        self.assertIn('2 skipped, 1 errors', out.getvalue())
+        self.assertEqual(Photo.objects.count(), 2)
+
+    def test_bulk_import_resolves_photographers_by_name_and_url(self):
+        existing = Photographer.objects.create(name='Photographer 1', url='http://photographer/1')
+        renamed = Photographer.objects.create(name='Renamed', url='http://photographer/2')
+        path = self.write_csv([self.row(i, photographer=i % 3) for i in range(6)])
+        out = StringIO()
+        call_command('import_photos', path, '--bulk', stdout=out, stderr=StringIO())
+        self.assertIn('Imported 6 photos and 2 photographers.', out.getvalue())
+        self.assertEqual(Photo.objects.filter(photographer=existing).count(), 2)
+        self.assertFalse(Photo.objects.filter(photographer=renamed).exists())
+        self.assertEqual(Photographer.objects.filter(url='http://photographer/2').count(), 2)
+
+    def test_missing_file(self):
+        with self.assertRaises(CommandError):
+            call_command('import_photos', '/nonexistent/photos.csv', '--bulk')
+
+class ExportPhotosCommandTest(CSVFileMixin, TestCase):
+    """
+    Test that export_photos writes CSV that import_photos reads back.
+    """
+
+    def test_csv_round_trip(self):
+        source = self.write_csv([self.row(i, photographer=i % 2) for i in range(5)])
+        call_command('import_photos', source, '--bulk', stdout=StringIO(), stderr=StringIO())
+        handle, path = tempfile.mkstemp(suffix='.csv')
+        os.close(handle)
+        self.addCleanup(os.remove, path)
+        out = StringIO()
+        call_command('export_photos', path, stdout=out)
+        self.assertIn('(csv,', out.getvalue())
+        with open(source, encoding='utf-8') as a, open(path, encoding='utf-8') as b:
+            self.assertEqual(sorted(a.read().splitlines()), sorted(b.read().splitlines()))
+
+        Photo.objects.all().delete()
+        Photographer.objects.all().delete()
+        call_command('import_photos', path, '--bulk', stdout=out, stderr=StringIO())
+        self.assertEqual(Photo.objects.count(), 5)
+        self.assertEqual(Photographer.objects.count(), 2)
+
+    def test_invalid_filters(self):
+        call_command('import_photos', self.write_csv([self.row(1), self.row(2)]), '--bulk', stdout=StringIO())
+        with self.assertRaises(CommandError):
+            call_command('export_photos', '-', '--filter', 'unknown=1')
+        with self.assertRaises(CommandError):
+            call_command('export_photos', '-', '--filter', 'photographer=nope')
+
+class IncrementalImportPhotosCommandTest(CSVFileMixin, TestCase):
+    """
+    Test the --incremental delta-sync mode of import_photos.
+    """
+    def sync(self, path, *args):
+        out = StringIO()
+        call_command('import_photos', path, '--incremental', *args, stdout=out, stderr=StringIO())
+        return out.getvalue()
+
+    def test_resync_skips_unchanged_and_updates_changed_rows(self):
+        rows = [self.row(i, photographer=i % 2) for i in range(1, 5)]
+        out = self.sync(self.write_csv(rows))
+        self.assertIn('Imported 4 photos and 2 photographers.', out)
+        self.assertEqual(Photo.objects.get(pexels_id=1).photographer.pexels_id, 1)
+
+        rows[0] = rows[0].replace('Alt 1', 'New alt')
+        out = self.sync(self.write_csv(rows))
+        self.assertIn('Imported 0 photos and 0 photographers.', out)
+        self.assertIn('3 skipped', out)
+        self.assertIn('Updated 1 photos', out)
+        self.assertEqual(Photo.objects.get(pexels_id=1).alt, 'New alt')
+        self.assertEqual(Photo.objects.count(), 4)
+
+    def test_prune_removes_rows_missing_from_feed(self):
+        self.sync(self.write_csv([self.row(1, photographer=1), self.row(2, photographer=2)]))
+        out = self.sync(self.write_csv([self.row(1, photographer=1)]), '--prune')
+        self.assertIn('deleted 2 rows', out)
+        self.assertEqual(list(Photo.objects.values_list('pexels_id', flat=True)), [1])
+        self.assertFalse(Photographer.objects.filter(pexels_id=2).exists())
+
+    def test_facet_rollup_follows_imports(self):
+        rows = [self.row(i, photographer=i % 2) for i in range(1, 5)]
+        call_command('import_photos', self.write_csv(rows[:2]), '--bulk', stdout=StringIO(), stderr=StringIO())
+        rows[0] = self.row(1, photographer=1, width='300')
+        self.sync(self.write_csv(rows))
+        self.assertEqual(PhotoFacetCount.objects.get(dimension='orientation', value='landscape').count, 1)
+        self.sync(self.write_csv(rows[1:]), '--prune')
+        rollup = {
+            (dimension, value): count
+            for dimension, value, count in PhotoFacetCount.objects.filter(count__gt=0).values_list(
+                'dimension', 'value', 'count',
+            )
+        }
+        self.assertEqual(rollup, grouped_counts(Photo.objects.all()))
+        self.assertEqual(rollup[('orientation', 'portrait')], 3)
+
+    def test_photographer_counters_follow_imports(self):
+        rows = [self.row(i, photographer=i % 2) for i in range(1, 5)]
+        call_command('import_photos', self.write_csv(rows[:2]), '--bulk', stdout=StringIO(), stderr=StringIO())
+        rows[0] = self.row(1, photographer=0)
+        self.sync(self.write_csv(rows))
+        self.assertEqual(Photographer.objects.get(pexels_id=0).photo_count, 3)
+        self.sync(self.write_csv(rows[1:]), '--prune')
+        self.assertEqual(reconcile_photo_counts(Photographer, Photo, dry_run=True), 0)
+        counts = dict(Photographer.objects.values_list('pexels_id', 'photo_count'))
+        self.assertEqual(counts, {0: 2, 1: 1})
+        latest = Photo.objects.filter(photographer__pexels_id=1).get().created_at
+        self.assertEqual(Photographer.objects.get(pexels_id=1).last_photo_at, latest)
+
+    def test_adopts_rows_imported_without_pexels_ids(self):
+        path = self.write_csv([self.row(1)])
+        call_command('import_photos', path, stdout=StringIO())
+        Photo.objects.update(pexels_id=None)
+        Photographer.objects.update(pexels_id=None)
+        self.sync(path)
+        self.assertEqual(Photo.objects.count(), 1)
+        self.assertEqual(Photographer.objects.count(), 1)
+        self.assertEqual(Photo.objects.get().pexels_id, 1)
+
+    def test_resumes_from_checkpoint(self):
+        path = self.write_csv([self.row(i) for i in range(1, 6)])
+        checkpoint = f'{path}.checkpoint'
+        signature = {'path': os.path.abspath(path), 'size': os.path.getsize(path), 'mtime': os.path.getmtime(path)}
+        with open(checkpoint, 'w', encoding='utf-8') as f:
+            json.dump({'source': signature, 'line': 3}, f)
+        out = self.sync(path, '--chunk-size', '2', '--checkpoint', checkpoint)
+        self.assertIn('Resuming after line 3.', out)
+        self.assertEqual(sorted(Photo.objects.values_list('pexels_id', flat=True)), [3, 4, 5])
+        self.assertFalse(os.path.exists(checkpoint))
+
+class ImportUsersCommandTest(TestCase):
+    """
+    Test the import_users command with CSV and JSON Lines input.
+    """
+    def write_file(self, suffix, content):
+        handle, path = tempfile.mkstemp(suffix=suffix)
+        with os.fdopen(handle, 'w', encoding='utf-8') as f:
+            f.write(content)
+        self.addCleanup(os.remove, path)
+        return path
+
+    def run_import(self, path, *args):
+        out, err = StringIO(), StringIO()
+        call_command('import_users', path, *args, stdout=out, stderr=err)
+        return out.getvalue(), err.getvalue()
+
+    def test_csv_import_normalizes_and_reports_duplicates(self):
+        User.objects.create_user(email='taken@example.com', password='testpass123')
+        path = self.write_file('.csv', (
+            'email,password,password_hash\n'
+            '  Alice@Example.COM ,secret123,\n'
+            'alice@example.com,other123,\n'
+            'taken@example.com,secret123,\n'
+            'not-an-email,secret123,\n'
+            'bob@example.com,,\n'
+        ))
+        out, err = self.run_import(path, '--workers', '1', '--batch-size', '2')
+        self.assertIn('Created 1 users.', out)
+        self.assertIn('Processed 5 rows', out)
+        self.assertIn('2 duplicates, 2 errors', out)
+        self.assertIn('Hashed 1 passwords', out)
+        self.assertIn('Line 3: duplicate email, alice@example.com appears earlier in the file.', err)
+        self.assertIn('Line 4: duplicate email, taken@example.com is already registered.', err)
+        self.assertIn("Line 5: Invalid email 'not-an-email'.", err)
+        self.assertIn('Line 6: Expected exactly one of password and password_hash.', err)
+        self.assertTrue(User.objects.get(email='alice@example.com').check_password('secret123'))
+
+    def test_jsonl_import_with_pre_hashed_passwords_on_a_pool(self):
+        hashed = make_password('prehashed1')
+        path = self.write_file('.jsonl', '\n'.join([
+            json.dumps({'email': 'one@example.com', 'password_hash': hashed}),
+            json.dumps({'email': 'two@example.com', 'password': 'secret123'}),
+            json.dumps({'email': 'three@example.com', 'password_hash': 'plaintext'}),
+            '{not json',
+        ]))
+        out, err = self.run_import(path, '--workers', '2')
+        self.assertIn('Created 2 users.', out)
+        self.assertIn('2 errors', out)
+        self.assertIn('Line 3: password_hash is not in a format of a configured hasher.', err)
+        self.assertIn('Line 4: Invalid JSON', err)
+        self.assertEqual(User.objects.get(email='one@example.com').password, hashed)
+        self.assertTrue(User.objects.get(email='two@example.com').check_password('secret123'))
+
+    def test_users_registered_during_the_import_are_reported_as_duplicates(self):
+        stats, seen = UserImportStats(), set()
+        parsed = parse_batch([
+            (2, {'email': 'race@example.com', 'password': 'secret123'}),
+            (3, {'email': 'calm@example.com', 'password': 'secret123'}),
+        ], seen, stats)
+        User.objects.create_user(email='race@example.com', password='registered1')
+        create_users(parsed, stats)
+        self.assertEqual(stats.created, 1)
+        self.assertEqual(stats.duplicates, [(2, 'race@example.com was registered during the import.')])
+        self.assertTrue(User.objects.get(email='race@example.com').check_password('registered1'))
+
+class BenchmarkApiCommandTest(TransactionTestCase):
+    """
+    Test the benchmark_api command replaying a request log in-process.
+    Replays run in worker threads with their own connections, so the data
+    has to be committed.
+    """
+    def test_replays_log_and_writes_json(self):
+        handle, log = tempfile.mkstemp(suffix='.jsonl')
+        with os.fdopen(handle, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(json.dumps(entry) for entry in [
+                {'method': 'GET', 'path': '/api/v1/photos/?page=2'},
+                {'method': 'get', 'path': '/api/v1/photos/{{photo_id}}/'},
+                {'method': 'PATCH', 'path': '/api/v1/photos/{{photo_id}}/', 'body': {'alt': 'x'}, 'auth': True},
+                {'method': 'GET', 'path': '/api/v1/health/', 'name': 'health'},
+            ]))
+        self.addCleanup(os.remove, log)
+        handle, output = tempfile.mkstemp(suffix='.json')
+        os.close(handle)
+        self.addCleanup(os.remove, output)
+
+        call_command(
+            'benchmark_api', '--log', log, '--seed-photographers', '3', '--seed-photos', '30',
+            # One thread: SQLite locks the table against a concurrent PATCH.
+            '--repeat', '3', '--concurrency', '1', '--output', output, '--cleanup', '--allow-live-db',
+            stdout=StringIO(),
+        )
+        with open(output, encoding='utf-8') as f:
+            results = json.load(f)
+        endpoints = results['endpoints']
+        self.assertEqual(
+            set(endpoints),
+            {'GET /api/v1/photos/', 'GET /api/v1/photos/{id}/', 'PATCH /api/v1/photos/{id}/', 'health', 'total'},
+        )
+        self.assertEqual(endpoints['total']['requests'], 12)
+        self.assertEqual(endpoints['PATCH /api/v1/photos/{id}/']['status'], {'200': 3})
+        self.assertEqual(endpoints['health']['queries_per_request'], {'max': 0, 'mean': 0.0})
+        self.assertGreater(endpoints['GET /api/v1/photos/']['queries_per_request']['mean'], 0)
+        self.assertLessEqual(
+            endpoints['total']['latency_ms']['p50'], endpoints['total']['latency_ms']['p99'],
+        )
+        self.assertEqual(results['meta']['seed'], {'photographers': 3, 'photos': 30})
+        self.assertFalse(Photo.objects.exists())
+        self.assertFalse(User.objects.exists())
+
+    def test_seeding_requires_allow_live_db(self):
+        with self.assertRaisesMessage(CommandError, '--allow-live-db'):
+            call_command('benchmark_api', '--seed-photographers', '3', stdout=StringIO())
+        self.assertFalse(Photographer.objects.exists())
+
+@override_settings(RESPONSE_CACHE_TIMEOUT=300)
+class ResponseCacheTest(APITestCase):
+    """
+    Test the versioned response cache on photo and photographer reads.
+    """
+    def setUp(self):
+        cache.clear()
+        self.photographer = Photographer.objects.create(name='Cached', url='http://photographer/cached')
+        self.photo = Photo.objects.create(
+            width=100, height=100, url='http://photo/cached', photographer=self.photographer,
+            avg_color='#123456', alt='Cached photo',
+            **{name: 'http://src/x.jpg' for name in (
+                'src_original', 'src_large2x', 'src_large', 'src_medium',
+                'src_small', 'src_portrait', 'src_landscape', 'src_tiny',
+            )},
+        )
+
+    def test_anonymous_list_is_cached_per_query(self):
+        first = self.client.get('/api/v1/photos/')
+        second = self.client.get('/api/v1/photos/')
+        self.assertEqual(first['X-Cache'], 'MISS')
+        self.assertEqual(second['X-Cache'], 'HIT')
+        self.assertEqual(first.content, second.content)
+        self.assertEqual(self.client.get('/api/v1/photos/?ordering=-width')['X-Cache'], 'MISS')
+
+    def test_query_parameter_order_is_normalized(self):
+        self.client.get('/api/v1/photos/?ordering=-width&page=1')
+        self.assertEqual(self.client.get('/api/v1/photos/?page=1&ordering=-width')['X-Cache'], 'HIT')
+
+    def test_writes_invalidate_dependent_responses(self):
+        self.client.get(f'/api/v1/photos/{self.photo.id}/')
+        self.client.get('/api/v1/photographers/')
+        self.photographer.name = 'Renamed'
+        self.photographer.save()
+        photo = self.client.get(f'/api/v1/photos/{self.photo.id}/')
+        self.assertEqual(photo['X-Cache'], 'MISS')
+        self.assertEqual(photo.data['photographer_name'], 'Renamed')
+        self.assertEqual(self.client.get('/api/v1/photographers/')['X-Cache'], 'MISS')
+        self.client.get('/api/v1/photographers/')
+        self.photo.delete()
+        # The photographer's photo_count changed.
+        self.assertEqual(self.client.get('/api/v1/photographers/')['X-Cache'], 'MISS')
+        self.assertEqual(self.client.get('/api/v1/photos/')['X-Cache'], 'MISS')
+
+    def test_authenticated_requests_bypass_cache(self):
+        user = User.objects.create_user(email='cache@example.com', password='testpass123')
+        self.client.force_authenticate(user=user)
+        self.client.get('/api/v1/photos/')
+        self.assertNotIn('X-Cache', self.client.get('/api/v1/photos/'))
+
+    def test_warm_cache_command(self):
+        out = StringIO()
+        call_command('warm_cache', '--pages', '1', '--base-url', 'http://testserver', stdout=out)
+        self.assertIn('Warmed 3 of 3 pages', out.getvalue())
+        self.assertEqual(self.client.get('/api/v1/photographers/')['X-Cache'], 'HIT')
+
+    def test_process_local_cache_fails_the_system_check(self):
+        with override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}):
+            self.assertEqual([error.id for error in check_shared_cache(None)], ['core.E001'])
+            with override_settings(PHOTOGRAPHER_RESOLVER_CACHE_SIZE=100):
+                self.assertEqual([error.id for error in check_shared_cache(None)], ['core.E001', 'core.E002'])
+            with override_settings(RESPONSE_CACHE_TIMEOUT=0):
+                self.assertEqual(check_shared_cache(None), [])
+        with override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache'}}):
+            self.assertEqual(check_shared_cache(None), [])
+
+@override_settings(RESPONSE_CACHE_TIMEOUT=0)
+class AsyncReadViewTest(TestCase):
+    """
+    Test the async read views against their synchronous DRF counterparts.
+    """
+    def setUp(self):
+        cache.clear()
+        self.factory = AsyncRequestFactory()
+        self.user = User.objects.create_user(email='async@example.com', password='testpass123')
+        self.photographer = Photographer.objects.create(name='Async', url='http://photographer/async')
+        self.photos = [
+            Photo.objects.create(
+                width=100 + i, height=100, url=f'http://photo/async{i}', photographer=self.photographer,
+                avg_color='#123456', alt=f'Async photo {i}', owner=self.user,
+                **{name: 'http://src/x.jpg' for name in (
+                    'src_original', 'src_large2x', 'src_large', 'src_medium',
+                    'src_small', 'src_portrait', 'src_landscape', 'src_tiny',
+                )},
+            )
+            for i in range(3)
+        ]
+
+    async def test_list_matches_sync_view(self):
+        path = f'/api/v1/photos/?photographer={self.photographer.id}&ordering=-width'
+        response = await AsyncPhotoListView.as_view()(self.factory.get(path))
+        expected = await self.async_client.get(path)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content), expected.json())
+        self.assertEqual(response['ETag'], expected['ETag'])
+
+    async def test_retrieve_and_not_found(self):
+        photo = self.photos[0]
+        response = await AsyncPhotoDetailView.as_view()(self.factory.get(f'/api/v1/photos/{photo.id}/'), pk=photo.id)
+        self.assertEqual(json.loads(response.content)['alt'], 'Async photo 0')
+        missing = await AsyncPhotoDetailView.as_view()(
+            self.factory.get(f'/api/v1/photos/{self.photographer.id}/'), pk=self.photographer.id,
+        )
+        self.assertEqual(missing.status_code, 404)
+
+    async def test_photographer_with_latest_photos(self):
+        view = AsyncPhotographerDetailView.as_view()
+        url = f'/api/v1/photographers/{self.photographer.id}/?include_photos=2'
+        response = await view(self.factory.get(url), pk=self.photographer.id)
+        data = json.loads(response.content)
+        self.assertEqual(data['photo_count'], 3)
+        self.assertEqual([photo['alt'] for photo in data['latest_photos']], ['Async photo 2', 'Async photo 1'])
+        response = await AsyncPhotographerListView.as_view()(self.factory.get('/api/v1/photographers/?include_photos=1'))
+        self.assertEqual(len(json.loads(response.content)['results'][0]['latest_photos']), 1)
+
+    async def test_conditional_get_and_cursor_pagination(self):
+        view = AsyncPhotographerListView.as_view()
+        first = await view(self.factory.get('/api/v1/photographers/'))
+        response = await view(self.factory.get('/api/v1/photographers/', headers={'If-None-Match': first['ETag']}))
+        self.assertEqual(response.status_code, 304)
+        response = await AsyncPhotoListView.as_view()(self.factory.get('/api/v1/photos/?cursor='))
+        self.assertEqual(len(json.loads(response.content)['results']), 3)
+        request = self.factory.get('/api/v1/photos/?cursor=', headers={'If-None-Match': response['ETag']})
+        self.assertEqual((await AsyncPhotoListView.as_view()(request)).status_code, 304)
+
+    async def test_jwt_authentication_and_delegated_writes(self):
+        token = str(RefreshToken.for_user(self.user).access_token)
+        view = AsyncPhotoDetailView.as_view()
+        photo = self.photos[0]
+        request = self.factory.patch(
+            f'/api/v1/photos/{photo.id}/', data={'alt': 'Patched'}, content_type='application/json',
+            headers={'Authorization': f'Bearer {token}'},
+        )
+        response = await view(request, pk=photo.id)
+        self.assertEqual(response.status_code, 200)
+        request = self.factory.get(f'/api/v1/photos/{photo.id}/', headers={'Authorization': 'Bearer invalid'})
+        response = await view(request, pk=photo.id)
+        self.assertEqual(response.status_code, 401)
+        request = self.factory.get(f'/api/v1/photos/{photo.id}/', headers={'Authorization': f'Bearer {token}'})
+        response = await view(request, pk=photo.id)
+        self.assertEqual(json.loads(response.content)['alt'], 'Patched')
+
+class SharedRateThrottleTest(TestCase):
+    """
+    Test the GCRA throttles backed by the RateLimitBucket table.
+    """
+    class Throttle(AnonRateThrottle):
+        rate = '3/min'
+        clock = 1000.0
+
+        def timer(self):
+            return self.clock
+
+    def setUp(self):
+        self.request = APIRequestFactory().get('/api/v1/photos/')
+        self.request.user = AnonymousUser()
+
+    def check(self, at):
+        throttle = self.Throttle()
+        throttle.clock = at
+        allowed = throttle.allow_request(self.request, None)
+        return allowed, throttle.wait()
+
+    def test_burst_then_steady_rate(self):
+        self.assertEqual([self.check(1000.0)[0] for _ in range(3)], [True, True, True])
+        allowed, wait = self.check(1000.0)
+        self.assertFalse(allowed)
+        self.assertAlmostEqual(wait, 20.0)
+        self.assertFalse(self.check(1019.0)[0])
+        self.assertTrue(self.check(1020.0)[0])
+        self.assertFalse(self.check(1020.0)[0])
+        self.assertEqual([self.check(1200.0)[0] for _ in range(4)], [True, True, True, False])
+
+    def test_counters_and_stats_command(self):
+        with self.assertNumQueries(1):
+            self.check(1000.0)
+        for _ in range(4):
+            self.check(1000.0)
+        bucket = RateLimitBucket.objects.get()
+        self.assertEqual((bucket.scope, bucket.requests, bucket.throttled), ('anon', 5, 2))
+        out = StringIO()
+        call_command('throttle_stats', stdout=out)
+        self.assertIn('anon: 5 requests from 1 keys, 2 throttled (40.0%)', out.getvalue())
+        call_command('throttle_stats', '--prune', '0', stdout=StringIO())
+        self.assertFalse(RateLimitBucket.objects.exists())
+
+    def test_scoped_throttle_keeps_view_scope(self):
+        view = type('View', (), {'throttle_scope': 'autocomplete'})()
+        throttle = ScopedRateThrottle()
+        self.assertTrue(throttle.allow_request(self.request, view))
+        self.assertEqual(RateLimitBucket.objects.get().scope, 'autocomplete')
+        self.assertTrue(ScopedRateThrottle().allow_request(self.request, object()))
+        self.assertEqual(RateLimitBucket.objects.count(), 1)
+
+@override_settings(RESPONSE_CACHE_TIMEOUT=0)
+class MetricsTest(TestCase):
+    """
+    Test the metrics middleware and the Prometheus endpoint.
+    """
+    def setUp(self):
+        registry.reset()
+        photographer = Photographer.objects.create(name='Metrics', url='http://photographer/metrics')
+        self.photo = Photo.objects.create(
+            width=100, height=100, url='http://photo/metrics', photographer=photographer,
+            avg_color='#123456', alt='Metrics photo', src_original='http://src/x.jpg',
+        )
+
+    def scrape(self):
+        response = self.client.get('/api/v1/metrics/')
+        self.assertEqual(response['Content-Type'], 'text/plain; version=0.0.4; charset=utf-8')
+        return response.content.decode()
+
+    def test_requests_are_recorded_per_route(self):
+        self.client.get('/api/v1/photos/')
+        self.client.get('/api/v1/photos/?ordering=-width')
+        self.client.get(f'/api/v1/photos/{self.photo.id}/')
+        self.client.get('/nowhere/')
+        text = self.scrape()
+        self.assertIn('http_requests_total{route="photo-list",method="GET",status="200"} 2', text)
+        self.assertIn('http_requests_total{route="photo-detail",method="GET",status="200"} 1', text)
+        self.assertIn('http_requests_total{route="<unmatched>",method="GET",status="404"} 1', text)
+        self.assertIn('http_request_duration_seconds_bucket{route="photo-list",method="GET",le="+Inf"} 2', text)
+        self.assertIn('http_request_duration_seconds_count{route="photo-list",method="GET"} 2', text)
+        self.assertIn('http_response_size_bytes_count{route="photo-list",method="GET"} 2', text)
+        self.assertRegex(text, r'db_queries_total\{route="photo-list",method="GET"\} [1-9]')
+        self.assertIn('db_query_duration_seconds_total{route="photo-list",method="GET"}', text)
+
+    def test_async_requests_count_orm_queries(self):
+        async def view(request):
+            await Photo.objects.acount()
+            return HttpResponse('ok')
+
+        request = AsyncRequestFactory().get('/api/v1/photos/')
+        response = async_to_sync(MetricsMiddleware(view))(request)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(registry.counters[('db_queries_total', (('route', '<unmatched>'), ('method', 'GET')))], 1)
+
+    def test_streaming_responses_are_recorded_once_sent(self):
+        response = self.client.get('/api/v1/photos/export/')
+        labels = (('route', 'photo-export'), ('method', 'GET'))
+        self.assertNotIn(('db_queries_total', labels), registry.counters)
+        b''.join(response.streaming_content)
+        response.close()
+        self.assertGreater(registry.counters[('db_queries_total', labels)], 0)
+        self.assertEqual(registry.counters[('http_requests_total', (*labels, ('status', '200')))], 1)
+
+    @override_settings(METRICS_TOKEN='scrape-token')
+    def test_endpoint_requires_an_allowed_address_or_the_token(self):
+        self.assertEqual(self.client.get('/api/v1/metrics/', REMOTE_ADDR='10.0.0.1').status_code, 403)
+        response = self.client.get(
+            '/api/v1/metrics/', REMOTE_ADDR='10.0.0.1', HTTP_AUTHORIZATION='Bearer scrape-token',
+        )
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get('/api/v1/metrics/', REMOTE_ADDR='10.0.0.1', HTTP_AUTHORIZATION='Bearer wrong')
+        self.assertEqual(response.status_code, 403)
+
+    def test_throttle_rejections_are_counted(self):
+        request = APIRequestFactory().get('/api/v1/photos/')
+        request.user = AnonymousUser()
+        allowed = [SharedRateThrottleTest.Throttle().allow_request(request, None) for _ in range(5)]
+        self.assertEqual(allowed, [True, True, True, False, False])
+        self.assertIn('api_throttled_requests_total{scope="anon"} 2', self.scrape())
+
+    def test_processes_are_aggregated_through_metrics_dir(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        other = {
+            'counters': [['http_requests_total', [['route', 'photo-list'], ['method', 'GET'], ['status', '200']], 5]],
+            'histograms': [],
+        }
+        with open(os.path.join(directory, 'metrics-1-1.json'), 'w', encoding='utf-8') as f:
+            json.dump(other, f)
+        with override_settings(METRICS_DIR=directory):
+            self.client.get('/api/v1/photos/')
+            text = self.scrape()
+        self.assertIn('http_requests_total{route="photo-list",method="GET",status="200"} 6', text)
+        self.assertEqual(len(os.listdir(directory)), 2)
+
+
+class SchemaArtifactTest(TestCase):
+    """
+    Test build_schema and the schema and docs views serving its artifact.
+    """
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.directory = tempfile.mkdtemp()
+        cls.addClassCleanup(shutil.rmtree, cls.directory)
+        call_command('build_schema', output_dir=cls.directory, stdout=StringIO())
+
+    def setUp(self):
+        overridden = override_settings(SCHEMA_ARTIFACT_DIR=self.directory)
+        overridden.enable()
+        self.addCleanup(overridden.disable)
+        self.artifact = load_artifact()
+
+    def test_build_writes_manifest_and_both_formats(self):
+        with open(os.path.join(self.directory, 'manifest.json'), encoding='utf-8') as f:
+            manifest = json.load(f)
+        self.assertEqual(set(manifest['files']), {'yaml', 'json'})
+        with open(os.path.join(self.directory, 'openapi.json'), encoding='utf-8') as f:
+            self.assertIn('/api/v1/photos/', json.load(f)['paths'])
+        self.assertEqual(self.artifact['hash'], manifest['hash'])
+
+    def test_schema_is_served_with_cache_headers(self):
+        response = self.client.get('/api/schema/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, self.artifact['files']['yaml'][0])
+        self.assertEqual(response['ETag'], self.artifact['files']['yaml'][1])
+        self.assertIn('max-age=86400', response['Cache-Control'])
+        self.assertIn('public', response['Cache-Control'])
+
+        response = self.client.get('/api/schema/', HTTP_ACCEPT='application/vnd.oai.openapi+json')
+        self.assertEqual(response.content, self.artifact['files']['json'][0])
+        self.assertIn('/api/v1/photos/', json.loads(response.content)['paths'])
+
+    def test_unchanged_schema_is_not_modified(self):
+        etag = self.client.get('/api/schema/')['ETag']
+        response = self.client.get('/api/schema/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+
+    def test_docs_point_at_versioned_schema_url(self):
+        response = self.client.get('/api/docs/')
+        self.assertEqual(response.status_code, 200)
+        # The URL is JSON-escaped in the page's script.
+        self.assertIn(f'/api/schema/?v\\u003D{self.artifact["hash"][:12]}', response.content.decode())
+        self.assertIn('no-cache', response['Cache-Control'])
+        self.assertEqual(self.client.get('/api/docs/', HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+    def test_missing_artifact_is_unavailable_outside_debug(self):
+        with override_settings(SCHEMA_ARTIFACT_DIR=os.path.join(self.directory, 'missing')):
+            self.assertEqual(self.client.get('/api/schema/').status_code, 503)
+            with override_settings(DEBUG=True):
+                response = self.client.get('/api/schema/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'/api/v1/photos/', response.content)
+
+
+class ConnectionPoolTest(TransactionTestCase):
+    """
+    Test the connection pool statistics and concurrent requests, each thread
+    borrowing its own connection (from the pool when pooling is configured).
+    """
+    class Pool:
+        def get_stats(self):
+            return {
+                'pool_min': 2, 'pool_max': 10, 'pool_size': 4, 'pool_available': 1,
+                'requests_waiting': 2, 'requests_num': 8, 'requests_wait_ms': 20, 'requests_errors': 1,
+            }
+
+    def test_stats_are_reported_per_pooled_alias(self):
+        with mock.patch.object(type(connections['default']), 'pool', self.Pool(), create=True):
+            stats = self.client.get(reverse('health-check')).json()['connection_pools']
+        self.assertEqual(stats['default'], {
+            'min_size': 2, 'max_size': 10, 'size': 4, 'in_use': 3, 'idle': 1, 'waiting': 2, 'requests': 8,
+            'wait_ms_total': 20, 'wait_ms_mean': 2.5, 'timeouts': 1, 'connections_lost': 0,
+        })
+
+    def test_threaded_load(self):
+        photographer = Photographer.objects.create(name='Pool', url='http://photographer/pool')
+        Photo.objects.bulk_create(
+            Photo(
+                width=100, height=100, url=f'http://photo/pool/{i}', photographer=photographer,
+                avg_color='#123456', alt=f'Pool photo {i}', src_original=f'http://src/pool/{i}.jpg',
+            )
+            for i in range(20)
+        )
+
+        def get(path):
+            try:
+                response = self.client_class().get(path)
+                return response.status_code, response.json()
+            finally:
+                connections.close_all()
+
+        paths = ['/api/v1/photos/', '/api/v1/photographers/?search=Pool', '/api/v1/health/'] * 30
+        with override_settings(API_THROTTLING=False):
+            with ThreadPoolExecutor(max_workers=12) as pool:
+                results = list(pool.map(get, paths))
+        self.assertEqual({status for status, _ in results}, {200})
+        self.assertTrue(all(body['count'] == 20 for (_, body), path in zip(results, paths) if 'photos' in path))
+        for stats in pool_stats().values():
+            # Every borrowed connection went back to the pool.
+            self.assertEqual(stats['in_use'], 0)
+            self.assertLessEqual(stats['size'], stats['max_size'])
+            # The health check does not touch the database.
+            self.assertGreaterEqual(stats['requests'], sum('health' not in path for path in paths))
@@ -0,0 +1,93 @@
+"""
+Rate limiting shared by every worker process.
+
+DRF's throttles keep a list of request timestamps per key in the default
+cache, which is per-process LocMem unless configured, and pickle the whole
+list on each request. These throttles keep the GCRA state of a key (one
+theoretical arrival time, TAT) in the `RateLimitBucket` table instead, and
+check and update it with a single `INSERT ... ON CONFLICT DO UPDATE ...
+RETURNING` statement: one round trip and O(1) work per request, atomic
+across processes.
+
+A rate of N requests per period P spaces requests by T = P / N and allows
+a burst of N: a request at `now` is allowed when `max(tat, now) + T - now
+<= P`, which moves the TAT to `max(tat, now) + T`. Each bucket also counts
+its requests and throttled requests (see the `throttle_stats` command);
+rejections are also counted in the request metrics.
+"""
+from django.conf import settings
+from django.db import connection
+from rest_framework import throttling
+
+from .metrics import registry
+from .models import RateLimitBucket
+
+
+def gcra_sql():
+    """
+    Build the UPSERT checking and updating one bucket.
+    """
+    table = connection.ops.quote_name(RateLimitBucket._meta.db_table)
+    key, scope, tat, requests, throttled, allowed = (
+        connection.ops.quote_name(name) for name in ('key', 'scope', 'tat', 'requests', 'throttled', 'allowed')
+    )
+    start = f'CASE WHEN {table}.{tat} > %(now)s THEN {table}.{tat} ELSE %(now)s END'
+    conforms = f'({start} + %(interval)s - %(now)s <= %(period)s)'
+    return (
+        f'INSERT INTO {table} ({key}, {scope}, {tat}, {requests}, {throttled}, {allowed}) '
+        f'VALUES (%(key)s, %(scope)s, %(now)s + %(interval)s, 1, 0, %(true)s) '
+        f'ON CONFLICT ({key}) DO UPDATE SET '
+        f'{tat} = CASE WHEN {conforms} THEN {start} + %(interval)s ELSE {table}.{tat} END, '
+        f'{requests} = {table}.{requests} + 1, '
+        f'{throttled} = {table}.{throttled} + CASE WHEN {conforms} THEN 0 ELSE 1 END, '
+        f'{allowed} = {conforms} '
+        f'RETURNING {tat}, {allowed}'
+    )
+
+
+class SharedRateThrottle(throttling.SimpleRateThrottle):
+    """
+    SimpleRateThrottle with a GCRA bucket in the database instead of the
+    cache-backed sliding window. Rates, scopes and keys are unchanged.
+    Listed after a DRF throttle class, it keeps that class's key and scope.
+    Every request is allowed while the API_THROTTLING setting is off.
+    """
+    def allow_request(self, request, view):
+        if not settings.API_THROTTLING or self.rate is None:
+            return True
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+        self.now = self.timer()
+        with connection.cursor() as cursor:
+            cursor.execute(gcra_sql(), {
+                'key': self.key[:255],
+                'scope': self.scope[:50],
+                'now': self.now,
+                'interval': self.duration / self.num_requests,
+                'period': self.duration,
+                'true': True,
+            })
+            self.tat, allowed = cursor.fetchone()
+        if not allowed:
+            registry.inc('api_throttled_requests_total', (('scope', self.scope),))
+        return bool(allowed)
+
+    def wait(self):
+        """
+        Seconds until the next request conforms.
+        """
+        interval = self.duration / self.num_requests
+        return max(self.tat + interval - self.duration - self.now, 0)
+
+
+class AnonRateThrottle(throttling.AnonRateThrottle, SharedRateThrottle):
+    pass
+
+
+class UserRateThrottle(throttling.UserRateThrottle, SharedRateThrottle):
+    pass
+
+
+class ScopedRateThrottle(throttling.ScopedRateThrottle, SharedRateThrottle):
+    pass
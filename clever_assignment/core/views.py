@@ -1,11 +1,16 @@
+from django.http import HttpResponse
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
+from .metrics import collect, render
+from .permissions import IsMetricsScraper
+from .pool import pool_stats
 
 class HealthCheckView(APIView):
     """
     API endpoint for health check.
-    Returns a simple status response to verify service is running.
+    Returns a simple status response to verify service is running, with the
+    statistics of this process's database connection pools.
     """
     authentication_classes = []
     permission_classes = []
@@ -14,4 +19,22 @@ class HealthCheckView(APIView):
         """
         Handle GET request for health check.
         """
-        return Response({"status": "ok"}, status=status.HTTP_200_OK)
+        return Response({"status": "ok", "connection_pools": pool_stats()}, status=status.HTTP_200_OK)
+
+
+class MetricsView(APIView):
+    """
+    API endpoint for Prometheus scrapes.
+    Returns the request metrics of all worker processes in the text exposition format.
+    Only served to the configured scraper (METRICS_TOKEN or METRICS_ALLOWED_IPS):
+    the payload describes internal traffic and a scrape reads every process's file.
+    """
+    authentication_classes = []
+    permission_classes = [IsMetricsScraper]
+    throttle_classes = []
+
+    def get(self, request):
+        """
+        Handle GET request for metrics.
+        """
+        return HttpResponse(render(collect()), content_type='text/plain; version=0.0.4; charset=utf-8')
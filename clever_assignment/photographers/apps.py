@@ -1,5 +1,22 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_delete, post_save
 
 class PhotographersConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'clever_assignment.photographers'
+
+    def ready(self):
+        from clever_assignment.core.cache import bump_generation, invalidate_on_change
+        from .resolution import IDENTITY_GENERATION
+        photographer = self.get_model('Photographer')
+        invalidate_photographers = invalidate_on_change(['photographers'])
+        post_save.connect(invalidate_photographers, sender=photographer, weak=False)
+        post_delete.connect(invalidate_photographers, sender=photographer, weak=False)
+
+        def invalidate_identities(sender, created=False, **kwargs):
+            # A new photographer cannot invalidate a cached (name, url) -> id.
+            if not created:
+                bump_generation(IDENTITY_GENERATION)
+
+        post_save.connect(invalidate_identities, sender=photographer, weak=False)
+        post_delete.connect(invalidate_identities, sender=photographer, weak=False)
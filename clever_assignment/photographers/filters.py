@@ -0,0 +1,18 @@
+import django_filters
+
+from .models import Photographer
+
+
+class PhotographerFilter(django_filters.FilterSet):
+    """
+    Ranges over the denormalized photo counters:
+    `?min_photos=10&max_photos=100&last_photo_after=2024-01-01`.
+    """
+    min_photos = django_filters.NumberFilter(field_name='photo_count', lookup_expr='gte', min_value=0)
+    max_photos = django_filters.NumberFilter(field_name='photo_count', lookup_expr='lte', min_value=0)
+    last_photo_after = django_filters.IsoDateTimeFilter(field_name='last_photo_at', lookup_expr='gte')
+    last_photo_before = django_filters.IsoDateTimeFilter(field_name='last_photo_at', lookup_expr='lte')
+
+    class Meta:
+        model = Photographer
+        fields = ['min_photos', 'max_photos', 'last_photo_after', 'last_photo_before']
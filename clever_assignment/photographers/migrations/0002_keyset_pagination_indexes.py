@@ -0,0 +1,21 @@
+# Generated by Django 5.1.7 on 2026-10-18 02:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('photographers', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='photographer',
+            name='photographe_created_ffa65c_idx',
+        ),
+        migrations.AddIndex(
+            model_name='photographer',
+            index=models.Index(fields=['created_at', 'id'], name='photographe_created_fe187a_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.7 on 2026-10-18 02:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('photographers', '0003_url_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='photographer',
+            name='pexels_id',
+            field=models.BigIntegerField(blank=True, null=True, unique=True),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Indexes backing the photographer autocomplete endpoint (PostgreSQL only):
+# a text_pattern_ops B-tree on UPPER(name) for case-insensitive prefix
+# matching (name__istartswith) and a pg_trgm GIN index for similarity.
+
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+FORWARD_SQL = [
+    'CREATE INDEX photographers_name_upper_prefix_idx '
+    'ON photographers_photographer (UPPER(name::text) text_pattern_ops)',
+    'CREATE INDEX photographers_name_trgm_idx '
+    'ON photographers_photographer USING gin (name gin_trgm_ops)',
+]
+
+REVERSE_SQL = [
+    'DROP INDEX IF EXISTS photographers_name_trgm_idx',
+    'DROP INDEX IF EXISTS photographers_name_upper_prefix_idx',
+]
+
+
+def run_postgresql(statements):
+    def operation(apps, schema_editor):
+        if schema_editor.connection.vendor != 'postgresql':
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+    return operation
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('photographers', '0004_pexels_ids'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.RunPython(run_postgresql(FORWARD_SQL), run_postgresql(REVERSE_SQL)),
+    ]
@@ -0,0 +1,43 @@
+# Folds photographers sharing a (name, url) pair before 0007 makes the pair
+# unique. Kept apart from the constraint so the data changes commit before
+# the table is altered. The merge is a frozen copy of
+# photographers.resolution.merge_duplicate_photographers as of this
+# migration, so later changes to that function cannot change what it does.
+
+from django.db import migrations, transaction
+from django.db.models import Count
+from django.utils import timezone
+
+
+def merge_duplicates(apps, schema_editor):
+    Photographer = apps.get_model('photographers', 'Photographer')
+    Photo = apps.get_model('photos', 'Photo')
+    duplicates = (
+        Photographer.objects.values('name', 'url')
+        .annotate(rows=Count('id')).filter(rows__gt=1).order_by('name', 'url')
+    )
+    for group in duplicates:
+        rows = list(Photographer.objects.filter(name=group['name'], url=group['url']).order_by('created_at', 'id'))
+        keeper, extras = rows[0], rows[1:]
+        extra_ids = [extra.pk for extra in extras]
+        with transaction.atomic():
+            pexels_id = keeper.pexels_id or next((extra.pexels_id for extra in extras if extra.pexels_id), None)
+            Photo.objects.filter(photographer_id__in=extra_ids).update(
+                photographer_id=keeper.pk, updated_at=timezone.now(),
+            )
+            Photographer.objects.filter(pk__in=extra_ids).delete()
+            if pexels_id != keeper.pexels_id:
+                keeper.pexels_id = pexels_id
+                keeper.save(update_fields=['pexels_id', 'updated_at'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('photographers', '0005_name_autocomplete_indexes'),
+        ('photos', '0007_color_channels'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicates, migrations.RunPython.noop),
+    ]
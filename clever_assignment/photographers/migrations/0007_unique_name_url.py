@@ -0,0 +1,17 @@
+# Generated by Django 5.1.7 on 2026-10-18 02:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('photographers', '0006_merge_duplicate_photographers'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='photographer',
+            constraint=models.UniqueConstraint(fields=('name', 'url'), name='photographers_name_url_uniq'),
+        ),
+    ]
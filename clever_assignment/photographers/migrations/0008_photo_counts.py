@@ -0,0 +1,42 @@
+# Generated by Django 5.1.7 on 2026-10-18 03:25
+
+from django.db import migrations, models
+
+from clever_assignment.photos.activity import reconcile_photo_counts
+
+
+def populate_photo_counts(apps, schema_editor):
+    """
+    Count the existing photos of every photographer.
+    """
+    reconcile_photo_counts(apps.get_model('photographers', 'Photographer'), apps.get_model('photos', 'Photo'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('photographers', '0007_unique_name_url'),
+        ('photos', '0009_photo_facet_counts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='photographer',
+            name='last_photo_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='photographer',
+            name='photo_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='photographer',
+            index=models.Index(fields=['photo_count', 'id'], name='photographe_photo_c_7edf63_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='photographer',
+            index=models.Index(fields=['last_photo_at', 'id'], name='photographe_last_ph_253a60_idx'),
+        ),
+        migrations.RunPython(populate_photo_counts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,39 @@
+# Replaces the UPPER(name) text_pattern_ops prefix index (0005) with a
+# C-collated UPPER(name), id index. LIKE prefix matches can use a C-collated
+# B-tree as well, and it also returns the matches in the autocomplete's
+# ORDER BY UPPER(name) COLLATE "C", id, so the LIMIT stops the index scan
+# instead of sorting every match (PostgreSQL only).
+
+from django.db import migrations
+
+FORWARD_SQL = [
+    'CREATE INDEX photographers_name_upper_prefix_id_idx '
+    'ON photographers_photographer ((UPPER(name::text) COLLATE "C"), id)',
+    'DROP INDEX IF EXISTS photographers_name_upper_prefix_idx',
+]
+
+REVERSE_SQL = [
+    'CREATE INDEX photographers_name_upper_prefix_idx '
+    'ON photographers_photographer (UPPER(name::text) text_pattern_ops)',
+    'DROP INDEX IF EXISTS photographers_name_upper_prefix_id_idx',
+]
+
+
+def run_postgresql(statements):
+    def operation(apps, schema_editor):
+        if schema_editor.connection.vendor != 'postgresql':
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+    return operation
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('photographers', '0008_photo_counts'),
+    ]
+
+    operations = [
+        migrations.RunPython(run_postgresql(FORWARD_SQL), run_postgresql(REVERSE_SQL)),
+    ]
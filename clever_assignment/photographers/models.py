@@ -5,18 +5,43 @@ class Photographer(models.Model):
 	"""
 	Photographer model representing a photographer entity.
 	Stores name, profile URL, and timestamps.
+	photo_count and last_photo_at are maintained on photo writes (see
+	photos.activity).
 	"""
 	id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+	pexels_id = models.BigIntegerField(null=True, blank=True, unique=True)
 	name = models.CharField(max_length=255)
-	url = models.URLField()
+	url = models.URLField(db_index=True)
 	created_at = models.DateTimeField(auto_now_add=True)
 	updated_at = models.DateTimeField(auto_now=True)
+	photo_count = models.PositiveIntegerField(default=0, editable=False)
+	last_photo_at = models.DateTimeField(null=True, blank=True, editable=False)
 
 	class Meta:
 		indexes = [
 			models.Index(fields=['name']),
-			models.Index(fields=['created_at']),
+			models.Index(fields=['created_at', 'id']),
+			models.Index(fields=['photo_count', 'id']),
+			models.Index(fields=['last_photo_at', 'id']),
 		]
+		constraints = [
+			models.UniqueConstraint(fields=['name', 'url'], name='photographers_name_url_uniq'),
+		]
+
+	# Maintained with F() expressions by photo writes; save() leaves them alone
+	# so a stale instance cannot overwrite them.
+	COUNTER_FIELDS = ['photo_count', 'last_photo_at']
+
+	def save(self, *args, **kwargs):
+		"""
+		Save without writing COUNTER_FIELDS back, unless listed in update_fields.
+		"""
+		if not self._state.adding and kwargs.get('update_fields') is None:
+			kwargs['update_fields'] = [
+				field.name for field in self._meta.concrete_fields
+				if not field.primary_key and field.name not in self.COUNTER_FIELDS
+			]
+		super().save(*args, **kwargs)
 
 	def __str__(self):
 		"""
@@ -0,0 +1,164 @@
+"""
+Race-free photographer resolution by (name, url).
+
+Photographers are unique on (name, url). Missing photographers are inserted
+with a single `INSERT ... ON CONFLICT (name, url) DO UPDATE ... RETURNING`
+statement, which returns the id of the new or the existing row, so concurrent
+writers can never create duplicates. Resolved ids are kept in a bounded
+per-process LRU cache: hot photographers resolve without a query. The cache
+is dropped whenever the IDENTITY_GENERATION counter moves (a photographer was
+renamed, moved or deleted). The counter lives in the default cache, so the LRU
+is only enabled with a cache every process shares (see core.checks).
+"""
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from clever_assignment.core.cache import bump_generation, get_generation
+
+from .models import Photographer
+
+IDENTITY_GENERATION = 'photographer_identities'
+
+# Rows per INSERT ... ON CONFLICT statement.
+UPSERT_BATCH_SIZE = 500
+
+def upsert_photographers(pairs):
+	"""
+	Insert the (name, url) pairs that do not exist yet and return
+	({(name, url): photographer_id}, created_count) for all of them.
+	"""
+	pairs = list(dict.fromkeys(pairs))
+	ids, created = {}, 0
+	if not pairs:
+		return ids, created
+	opts = Photographer._meta
+	fields = [field for field in opts.concrete_fields if not field.generated]
+	quote = connection.ops.quote_name
+	columns = ', '.join(quote(field.column) for field in fields)
+	row_sql = f"({', '.join(['%s'] * len(fields))})"
+	for start in range(0, len(pairs), UPSERT_BATCH_SIZE):
+		batch = pairs[start:start + UPSERT_BATCH_SIZE]
+		params, new_ids = [], set()
+		for name, url in batch:
+			photographer = Photographer(name=name, url=url)
+			new_ids.add(photographer.pk)
+			params += [
+				field.get_db_prep_save(field.pre_save(photographer, True), connection) for field in fields
+			]
+		sql = (
+			f'INSERT INTO {quote(opts.db_table)} ({columns}) VALUES {", ".join([row_sql] * len(batch))} '
+			f'ON CONFLICT ({quote("name")}, {quote("url")}) DO UPDATE SET {quote("name")} = EXCLUDED.{quote("name")} '
+			f'RETURNING {quote(opts.pk.column)}, {quote("name")}, {quote("url")}'
+		)
+		with connection.cursor() as cursor:
+			cursor.execute(sql, params)
+			rows = cursor.fetchall()
+		for pk, name, url in rows:
+			pk = opts.pk.to_python(pk)
+			ids[(name, url)] = pk
+			created += pk in new_ids
+	if created:
+		# Raw inserts do not send post_save.
+		bump_generation('photographers')
+	return ids, created
+
+class PhotographerResolver:
+	"""
+	Bounded LRU cache of (name, url) -> photographer id in front of
+	upsert_photographers().
+	"""
+	def __init__(self, maxsize):
+		self.maxsize = maxsize
+		self.entries = OrderedDict()
+		self.generation = None
+		self.lock = threading.Lock()
+
+	def resolve(self, name, url):
+		"""
+		Return the id of the photographer, creating it if needed.
+		"""
+		ids, _ = self.resolve_many([(name, url)])
+		return ids[(name, url)]
+
+	def resolve_many(self, pairs):
+		"""
+		Return ({(name, url): photographer_id}, created_count) for the pairs;
+		cached pairs cost no query and the others are upserted in one
+		statement per batch.
+		"""
+		if not self.maxsize:
+			return upsert_photographers(pairs)
+		generation = get_generation(IDENTITY_GENERATION)
+		ids, missing, created = {}, [], 0
+		with self.lock:
+			if generation != self.generation:
+				self.entries.clear()
+				self.generation = generation
+			for pair in pairs:
+				if pair in self.entries:
+					self.entries.move_to_end(pair)
+					ids[pair] = self.entries[pair]
+				else:
+					missing.append(pair)
+		if missing:
+			resolved, created = upsert_photographers(missing)
+			ids.update(resolved)
+			# Ids inserted by a transaction that rolls back must not be cached.
+			transaction.on_commit(lambda: self.remember(resolved, generation))
+		return ids, created
+
+	def remember(self, resolved, generation):
+		with self.lock:
+			# A concurrent invalidation wins over ids resolved before it.
+			if generation != self.generation:
+				return
+			self.entries.update(resolved)
+			for pair in resolved:
+				self.entries.move_to_end(pair)
+			while len(self.entries) > self.maxsize:
+				self.entries.popitem(last=False)
+
+	def clear(self):
+		with self.lock:
+			self.entries.clear()
+			self.generation = None
+
+resolver = PhotographerResolver(settings.PHOTOGRAPHER_RESOLVER_CACHE_SIZE)
+
+def merge_duplicate_photographers(photographer_model, photo_model, dry_run=False):
+	"""
+	Merge photographers sharing a (name, url) pair into the oldest one: their
+	photos are moved to it, it inherits a Pexels id if it has none, and the
+	duplicates are deleted. Returns (groups, photographers_removed,
+	photos_moved). Migration 0006 runs a frozen copy of this function.
+	"""
+	duplicates = (
+		photographer_model.objects.values('name', 'url')
+		.annotate(rows=Count('id')).filter(rows__gt=1).order_by('name', 'url')
+	)
+	groups = removed = moved = 0
+	for group in duplicates:
+		groups += 1
+		rows = list(
+			photographer_model.objects.filter(name=group['name'], url=group['url']).order_by('created_at', 'id')
+		)
+		keeper, extras = rows[0], rows[1:]
+		extra_ids = [extra.pk for extra in extras]
+		photos = photo_model.objects.filter(photographer_id__in=extra_ids)
+		if dry_run:
+			removed += len(extras)
+			moved += photos.count()
+			continue
+		with transaction.atomic():
+			pexels_id = keeper.pexels_id or next((extra.pexels_id for extra in extras if extra.pexels_id), None)
+			moved += photos.update(photographer_id=keeper.pk, updated_at=timezone.now())
+			removed += photographer_model.objects.filter(pk__in=extra_ids).delete()[0]
+			if pexels_id != keeper.pexels_id:
+				keeper.pexels_id = pexels_id
+				keeper.save(update_fields=['pexels_id', 'updated_at'])
+	return groups, removed, moved
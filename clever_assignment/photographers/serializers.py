@@ -1,4 +1,5 @@
 from rest_framework import serializers
+from clever_assignment.photos.serializers import PhotoSerializer
 from .models import Photographer
 
 class PhotographerSerializer(serializers.ModelSerializer):
@@ -8,4 +9,28 @@ class PhotographerSerializer(serializers.ModelSerializer):
     """
     class Meta:
         model = Photographer
-        fields = '__all__'
\ No newline at end of file
+        fields = '__all__'
+
+class PhotographerPhotoSerializer(PhotoSerializer):
+    """
+    Photo embedded in a photographer, without the photographer fields.
+    """
+    class Meta(PhotoSerializer.Meta):
+        fields = [
+            name for name in PhotoSerializer.Meta.fields
+            if name not in ('photographer', 'photographer_name', 'photographer_url', 'new_photographer_name', 'new_photographer_url')
+        ]
+
+class PhotographerWithPhotosSerializer(PhotographerSerializer):
+    """
+    Photographer with their latest photos (`?include_photos=N`), newest first.
+    """
+    latest_photos = PhotographerPhotoSerializer(many=True, read_only=True)
+
+class PhotographerAutocompleteSerializer(serializers.ModelSerializer):
+    """
+    Lightweight photographer representation for autocomplete results.
+    """
+    class Meta:
+        model = Photographer
+        fields = ['id', 'name']
@@ -1,7 +1,15 @@
+from io import StringIO
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import IntegrityError, transaction
 from django.test import TestCase
 from rest_framework.test import APIClient
 from rest_framework import status
+from clever_assignment.users.models import User
+from clever_assignment.photos.bulk import delete_photos, update_photos
+from clever_assignment.photos.models import Photo
 from clever_assignment.photographers.models import Photographer
+from clever_assignment.photographers.resolution import PhotographerResolver, upsert_photographers
 
 class PhotographerListTests(TestCase):
 	def setUp(self):
@@ -42,3 +50,260 @@ class PhotographerListTests(TestCase):
 		self.assertEqual(resp.data['count'], 28)
 		self.assertEqual(len(resp.data['results']), 20)
 		self.assertIsNotNone(resp.data['next'])
+
+	def test_cursor_pagination(self):
+		for i in range(25):
+			Photographer.objects.create(name=f'Photographer {i:02d}', url=f'https://example.com/p{i}')
+		resp = self.client.get(f'{self.url}?cursor=&ordering=name')
+		self.assertNotIn('count', resp.data)
+		self.assertEqual(len(resp.data['results']), 20)
+		resp2 = self.client.get(resp.data['next'])
+		self.assertEqual(len(resp2.data['results']), 8)
+		self.assertIsNone(resp2.data['next'])
+		names = [r['name'] for r in resp.data['results'] + resp2.data['results']]
+		self.assertEqual(names, sorted(names))
+
+class PhotographerAutocompleteTests(TestCase):
+	def setUp(self):
+		self.client = APIClient()
+		self.url = '/api/v1/photographers/autocomplete/'
+		for name in ['Anna Smith', 'anne Lee', 'Annabel Jones', 'Bob Annan', 'Charlie Clark']:
+			Photographer.objects.create(name=name, url='https://example.com/p')
+
+	def test_prefix_matches_are_case_insensitive_and_come_first(self):
+		resp = self.client.get(f'{self.url}?q=ann')
+		self.assertEqual(resp.status_code, status.HTTP_200_OK)
+		names = [r['name'] for r in resp.data]
+		self.assertEqual(set(names[:3]), {'Anna Smith', 'Annabel Jones', 'anne Lee'})
+		self.assertEqual(names[3:], ['Bob Annan'])
+		self.assertEqual(set(resp.data[0].keys()), {'id', 'name'})
+
+	def test_limit(self):
+		resp = self.client.get(f'{self.url}?q=anna&limit=1')
+		self.assertEqual(len(resp.data), 1)
+		self.assertIn(resp.data[0]['name'], ['Anna Smith', 'Annabel Jones'])
+
+	def test_empty_query_returns_nothing(self):
+		resp = self.client.get(self.url)
+		self.assertEqual(resp.data, [])
+
+	def test_response_is_cacheable(self):
+		resp = self.client.get(f'{self.url}?q=ch')
+		self.assertEqual([r['name'] for r in resp.data], ['Charlie Clark'])
+		self.assertIn('max-age', resp['Cache-Control'])
+
+class PhotographerResolutionTests(TestCase):
+	def setUp(self):
+		cache.clear()
+		# The shared resolver is disabled with the test suite's local-memory cache.
+		self.resolver = PhotographerResolver(maxsize=100)
+		self.existing = Photographer.objects.create(name='Alice Adams', url='https://example.com/alice')
+
+	def test_name_and_url_are_unique(self):
+		with self.assertRaises(IntegrityError), transaction.atomic():
+			Photographer.objects.create(name='Alice Adams', url='https://example.com/alice')
+		Photographer.objects.create(name='Alice B.', url='https://example.com/alice')
+
+	def test_upsert_returns_existing_and_new_ids(self):
+		ids, created = upsert_photographers([
+			('Alice Adams', 'https://example.com/alice'),
+			('Bob Brown', 'https://example.com/bob'),
+			('Bob Brown', 'https://example.com/bob'),
+		])
+		self.assertEqual(created, 1)
+		self.assertEqual(ids[('Alice Adams', 'https://example.com/alice')], self.existing.pk)
+		bob = Photographer.objects.get(name='Bob Brown')
+		self.assertEqual(ids[('Bob Brown', 'https://example.com/bob')], bob.pk)
+		self.assertIsNotNone(bob.created_at)
+		self.assertEqual(Photographer.objects.count(), 2)
+
+	def test_cached_pairs_resolve_without_queries(self):
+		with self.captureOnCommitCallbacks(execute=True):
+			pk = self.resolver.resolve('Alice Adams', 'https://example.com/alice')
+		self.assertEqual(pk, self.existing.pk)
+		with self.assertNumQueries(0):
+			self.assertEqual(self.resolver.resolve('Alice Adams', 'https://example.com/alice'), self.existing.pk)
+
+	def test_photographer_changes_invalidate_the_cache(self):
+		with self.captureOnCommitCallbacks(execute=True):
+			self.resolver.resolve('Alice Adams', 'https://example.com/alice')
+		self.existing.delete()
+		with self.captureOnCommitCallbacks(execute=True):
+			pk = self.resolver.resolve('Alice Adams', 'https://example.com/alice')
+		self.assertNotEqual(pk, self.existing.pk)
+		self.assertTrue(Photographer.objects.filter(pk=pk).exists())
+
+	def test_cache_is_bounded(self):
+		small = PhotographerResolver(maxsize=2)
+		with self.captureOnCommitCallbacks(execute=True):
+			for i in range(3):
+				small.resolve(f'Photographer {i}', f'https://example.com/p{i}')
+		self.assertEqual(list(small.entries), [
+			('Photographer 1', 'https://example.com/p1'), ('Photographer 2', 'https://example.com/p2'),
+		])
+
+	def test_rolled_back_inserts_are_not_cached(self):
+		with self.assertRaises(RuntimeError), self.captureOnCommitCallbacks(execute=True), transaction.atomic():
+			self.resolver.resolve('Bob Brown', 'https://example.com/bob')
+			raise RuntimeError
+		self.assertEqual(self.resolver.entries, {})
+
+	def test_disabled_cache_always_upserts(self):
+		disabled = PhotographerResolver(maxsize=0)
+		with self.captureOnCommitCallbacks(execute=True):
+			self.assertEqual(disabled.resolve('Alice Adams', 'https://example.com/alice'), self.existing.pk)
+		self.assertEqual(disabled.entries, {})
+
+	def test_merge_command_without_duplicates(self):
+		out = StringIO()
+		call_command('merge_photographers', '--dry-run', stdout=out)
+		self.assertIn('Would merge 0 duplicate groups', out.getvalue())
+
+class PhotographerPhotoCountTests(TestCase):
+	def setUp(self):
+		self.client = APIClient()
+		self.url = '/api/v1/photographers/'
+		self.owner = User.objects.create_user(email='counts@example.com', password='testpass123')
+		self.alice = Photographer.objects.create(name='Alice Adams', url='https://example.com/alice')
+		self.bob = Photographer.objects.create(name='Bob Brown', url='https://example.com/bob')
+		self.idle = Photographer.objects.create(name='Charlie Clark', url='https://example.com/charlie')
+
+	def add_photo(self, photographer, i):
+		return Photo.objects.create(
+			width=100, height=100, url=f'https://example.com/photo/{i}', photographer=photographer,
+			avg_color='#123456', alt=f'Photo {i}', owner=self.owner, src_original=f'https://example.com/{i}.jpg',
+		)
+
+	def counters(self, photographer):
+		photographer.refresh_from_db()
+		return photographer.photo_count, photographer.last_photo_at
+
+	def test_create_delete_and_reassign_update_counters(self):
+		first = self.add_photo(self.alice, 1)
+		second = self.add_photo(self.alice, 2)
+		self.assertEqual(self.counters(self.alice), (2, second.created_at))
+		second.photographer = self.bob
+		second.save()
+		self.assertEqual(self.counters(self.alice), (1, first.created_at))
+		self.assertEqual(self.counters(self.bob), (1, second.created_at))
+		Photo.objects.get(pk=second.pk).delete()
+		self.assertEqual(self.counters(self.bob), (0, None))
+
+	def test_saving_a_stale_photographer_keeps_counters(self):
+		self.add_photo(self.alice, 1)
+		self.alice.name = 'Alice A.'
+		self.alice.save()
+		self.assertEqual(self.counters(self.alice)[0], 1)
+
+	def test_bulk_update_and_delete_update_counters(self):
+		photos = [self.add_photo(self.alice, i) for i in range(3)]
+		update_photos(Photo.objects.filter(pk__in=[p.pk for p in photos[:2]]), {'photographer_id': self.bob.pk})
+		self.assertEqual(self.counters(self.alice), (1, photos[2].created_at))
+		self.assertEqual(self.counters(self.bob), (2, photos[1].created_at))
+		delete_photos(Photo.objects.filter(photographer=self.bob))
+		self.assertEqual(self.counters(self.bob), (0, None))
+
+	def test_ordering_and_ranges(self):
+		for i in range(3):
+			self.add_photo(self.bob, i)
+		self.add_photo(self.alice, 3)
+		resp = self.client.get(f'{self.url}?ordering=-photo_count')
+		self.assertEqual([r['name'] for r in resp.data['results']], ['Bob Brown', 'Alice Adams', 'Charlie Clark'])
+		self.assertEqual(resp.data['results'][0]['photo_count'], 3)
+		resp = self.client.get(f'{self.url}?min_photos=1&max_photos=2')
+		self.assertEqual([r['name'] for r in resp.data['results']], ['Alice Adams'])
+		resp = self.client.get(self.url, {'last_photo_before': self.counters(self.bob)[1].isoformat()})
+		self.assertEqual([r['name'] for r in resp.data['results']], ['Bob Brown'])
+
+	def test_cursor_pagination_over_missing_last_photo(self):
+		for i in range(25):
+			Photographer.objects.create(name=f'Idle {i}', url=f'https://example.com/idle{i}')
+		self.add_photo(self.alice, 1)
+		self.add_photo(self.bob, 2)
+		for ordering in ('last_photo_at', '-last_photo_at'):
+			names, url = [], f'{self.url}?cursor=&ordering={ordering}'
+			while url:
+				resp = self.client.get(url)
+				names += [r['name'] for r in resp.data['results']]
+				url = resp.data['next']
+			self.assertEqual(len(set(names)), 28)
+
+	def test_reconcile_command_repairs_drift(self):
+		photo = self.add_photo(self.alice, 1)
+		Photographer.objects.filter(pk=self.alice.pk).update(photo_count=5)
+		Photographer.objects.filter(pk=self.idle.pk).update(last_photo_at=photo.created_at)
+		out = StringIO()
+		call_command('reconcile_photographer_stats', '--dry-run', stdout=out)
+		self.assertIn('2 photographers have drifted counters', out.getvalue())
+		call_command('reconcile_photographer_stats', stdout=StringIO())
+		self.assertEqual(self.counters(self.alice), (1, photo.created_at))
+		self.assertEqual(self.counters(self.idle), (0, None))
+
+class PhotographerDetailTests(TestCase):
+	def setUp(self):
+		cache.clear()
+		self.client = APIClient()
+		self.owner = User.objects.create_user(email='detail@example.com', password='testpass123')
+		self.photographers = [
+			Photographer.objects.create(name=f'Photographer {i}', url=f'https://example.com/p{i}') for i in range(4)
+		]
+		for photographer in self.photographers:
+			for i in range(3):
+				Photo.objects.create(
+					width=100, height=100, url=f'https://example.com/{photographer.pk}/{i}', photographer=photographer,
+					avg_color='#123456', alt=f'Photo {i}', owner=self.owner, src_original='https://example.com/o.jpg',
+				)
+
+	def test_retrieve(self):
+		photographer = self.photographers[0]
+		resp = self.client.get(f'/api/v1/photographers/{photographer.pk}/')
+		self.assertEqual(resp.status_code, status.HTTP_200_OK)
+		self.assertEqual(resp.data['name'], 'Photographer 0')
+		self.assertEqual(resp.data['photo_count'], 3)
+		self.assertNotIn('latest_photos', resp.data)
+		self.assertEqual(self.client.get(f'/api/v1/photographers/{self.owner.pk}/').status_code, status.HTTP_404_NOT_FOUND)
+
+	def test_retrieve_with_latest_photos(self):
+		photographer = self.photographers[0]
+		resp = self.client.get(f'/api/v1/photographers/{photographer.pk}/?include_photos=2')
+		self.assertEqual([photo['alt'] for photo in resp.data['latest_photos']], ['Photo 2', 'Photo 1'])
+		self.assertNotIn('photographer_name', resp.data['latest_photos'][0])
+
+	def test_list_embeds_photos_in_constant_queries(self):
+		self.client.force_authenticate(user=self.owner)
+		url = '/api/v1/photographers/?include_photos=2'
+		# Throttle, count, page and one prefetch; the ETag is built from the page.
+		with self.assertNumQueries(4):
+			resp = self.client.get(url)
+		self.assertEqual([len(r['latest_photos']) for r in resp.data['results']], [2, 2, 2, 2])
+		for i in range(4, 12):
+			Photographer.objects.create(name=f'Photographer {i}', url=f'https://example.com/p{i}')
+		with self.assertNumQueries(4):
+			resp = self.client.get(url)
+		self.assertEqual(len(resp.data['results']), 12)
+
+	def test_photo_changes_change_the_etag(self):
+		photographer = self.photographers[0]
+		url = f'/api/v1/photographers/{photographer.pk}/?include_photos=1'
+		etag = self.client.get(url)['ETag']
+		self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_304_NOT_MODIFIED)
+		photo = Photo.objects.filter(photographer=photographer).latest('created_at')
+		photo.alt = 'Renamed'
+		photo.save()
+		resp = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+		self.assertEqual(resp.status_code, status.HTTP_200_OK)
+		self.assertEqual(resp.data['latest_photos'][0]['alt'], 'Renamed')
+
+	def test_photo_edits_change_the_list_etag(self):
+		self.client.force_authenticate(user=self.owner)
+		url = '/api/v1/photographers/?include_photos=1'
+		etag = self.client.get(url)['ETag']
+		photographer = self.photographers[2]
+		updated_at = Photographer.objects.get(pk=photographer.pk).updated_at
+		photo = Photo.objects.filter(photographer=photographer).latest('created_at')
+		self.client.patch('/api/v1/photos/bulk/', {'ids': [str(photo.pk)], 'data': {'alt': 'Renamed'}}, format='json')
+		# The photographer row itself is left alone.
+		self.assertEqual(Photographer.objects.get(pk=photographer.pk).updated_at, updated_at)
+		resp = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+		self.assertEqual(resp.status_code, status.HTTP_200_OK)
+		self.assertIn('Renamed', [r['latest_photos'][0]['alt'] for r in resp.data['results']])
@@ -1,6 +1,20 @@
+from django.conf import settings
 from django.urls import path
-from .views import PhotographerListView
+from .views import (
+    AsyncPhotographerDetailView, AsyncPhotographerListView, PhotographerAutocompleteView, PhotographerDetailView,
+    PhotographerListView,
+)
 
 urlpatterns = [
-    path('', PhotographerListView.as_view(), name='photographer-list'),
-]
\ No newline at end of file
+    path(
+        '',
+        (AsyncPhotographerListView if settings.ASYNC_READ_API else PhotographerListView).as_view(),
+        name='photographer-list',
+    ),
+    path('autocomplete/', PhotographerAutocompleteView.as_view(), name='photographer-autocomplete'),
+    path(
+        '<uuid:pk>/',
+        (AsyncPhotographerDetailView if settings.ASYNC_READ_API else PhotographerDetailView).as_view(),
+        name='photographer-detail',
+    ),
+]
@@ -1,14 +1,156 @@
+from django.contrib.postgres.search import TrigramWordSimilarity
+from django.db import connections
+from django.db.models import Prefetch
+from django.db.models.functions import Collate, Upper
 from rest_framework import generics
+from rest_framework.response import Response
+from clever_assignment.core.async_views import AsyncReadView
+from clever_assignment.core.cache import CachedResponseMixin
+from clever_assignment.core.conditional import ConditionalGetMixin
+from clever_assignment.core.throttling import ScopedRateThrottle
+from clever_assignment.photos.models import Photo
+from .filters import PhotographerFilter
 from .models import Photographer
-from .serializers import PhotographerSerializer
+from .serializers import PhotographerAutocompleteSerializer, PhotographerSerializer, PhotographerWithPhotosSerializer
 
-class PhotographerListView(generics.ListAPIView):
+class LatestPhotosMixin:
+	"""
+	`?include_photos=N` embeds each photographer's latest N photos as
+	`latest_photos`. They are fetched with one prefetch query over a sliced
+	queryset (a ROW_NUMBER() window per photographer), whatever the page size.
+	Editing a photo does not touch its photographer, so with embedded photos
+	the validators come from the fetched page or object instead of an
+	aggregate: the ids and updated_at of the photos are read from the
+	prefetch that runs anyway, without joining the photo table.
+	"""
+	include_photos_param = 'include_photos'
+	max_include_photos = 50
+
+	def get_include_photos(self):
+		"""
+		Number of photos to embed, clamped to [0, max_include_photos].
+		"""
+		try:
+			count = int(self.request.query_params.get(self.include_photos_param, 0))
+		except ValueError:
+			return 0
+		return min(max(count, 0), self.max_include_photos)
+
+	def get_queryset(self):
+		queryset = super().get_queryset()
+		count = self.get_include_photos()
+		if count:
+			photos = Photo.objects.order_by('-created_at', '-id')[:count]
+			queryset = queryset.prefetch_related(Prefetch('photo_set', queryset=photos, to_attr='latest_photos'))
+		return queryset
+
+	def get_serializer_class(self):
+		return PhotographerWithPhotosSerializer if self.get_include_photos() else super().get_serializer_class()
+
+	def uses_page_validators(self, request):
+		return bool(self.get_include_photos()) or super().uses_page_validators(request)
+
+	def get_object_state(self, instance):
+		state, timestamps = super().get_object_state(instance)
+		if self.get_include_photos():
+			photos = [(photo.pk, photo.updated_at) for photo in instance.latest_photos]
+			state = (state, photos)
+			timestamps = [*timestamps, *(updated_at for _, updated_at in photos)]
+		return state, timestamps
+
+class PhotographerListView(LatestPhotosMixin, CachedResponseMixin, ConditionalGetMixin, generics.ListAPIView):
 	"""
 	API endpoint to list photographers.
-	Supports search and ordering by name and creation date.
+	Supports search, ordering by name, creation date, photo count and latest
+	photo, photo count / latest photo ranges, and embedding each
+	photographer's latest photos.
+	Reads support conditional GET; anonymous reads are served from the
+	versioned response cache.
 	"""
 	queryset = Photographer.objects.all()
 	serializer_class = PhotographerSerializer
+	filterset_class = PhotographerFilter
 	search_fields = ['name']
-	ordering_fields = ['name', 'created_at']
-	ordering = ['created_at']
\ No newline at end of file
+	ordering_fields = ['name', 'created_at', 'photo_count', 'last_photo_at']
+	ordering = ['created_at']
+	cache_generations = ('photographers', 'photos')
+
+class AsyncPhotographerListView(AsyncReadView):
+	"""
+	Async photographer list.
+	"""
+	view_class = PhotographerListView
+
+class PhotographerDetailView(LatestPhotosMixin, CachedResponseMixin, ConditionalGetMixin, generics.RetrieveAPIView):
+	"""
+	API endpoint to retrieve a photographer, optionally with their latest photos.
+	"""
+	queryset = Photographer.objects.all()
+	serializer_class = PhotographerSerializer
+	filter_backends = []
+	cache_generations = ('photographers', 'photos')
+
+class AsyncPhotographerDetailView(AsyncReadView):
+	"""
+	Async photographer retrieve.
+	"""
+	view_class = PhotographerDetailView
+
+	def get_action(self):
+		return 'retrieve'
+
+class PhotographerAutocompleteView(generics.GenericAPIView):
+	"""
+	API endpoint for photographer name type-ahead.
+	Returns the top `limit` {id, name} matches for `q`: case-insensitive
+	prefix matches first, then (on PostgreSQL) trigram word matches.
+	"""
+	queryset = Photographer.objects.all()
+	serializer_class = PhotographerAutocompleteSerializer
+	pagination_class = None
+	filter_backends = []
+	throttle_classes = [ScopedRateThrottle]
+	throttle_scope = 'autocomplete'
+	default_limit = 10
+	max_limit = 50
+	min_trigram_length = 3
+
+	def get(self, request):
+		"""
+		Handle GET request for autocomplete.
+		"""
+		query = request.query_params.get('q', '').strip()
+		try:
+			limit = min(max(int(request.query_params.get('limit', self.default_limit)), 1), self.max_limit)
+		except ValueError:
+			limit = self.default_limit
+		results = self.get_matches(query, limit) if query else []
+		response = Response(self.get_serializer(results, many=True).data)
+		response['Cache-Control'] = 'public, max-age=60'
+		return response
+
+	def get_matches(self, query, limit):
+		"""
+		Return up to limit {id, name} dicts, prefix matches first.
+		Prefix matches are ordered like the UPPER(name) COLLATE "C", id index
+		on PostgreSQL, so the scan stops after limit rows.
+		"""
+		queryset = self.get_queryset().values('id', 'name')
+		postgresql = connections[queryset.db].vendor == 'postgresql'
+		prefix_key = Collate(Upper('name'), 'C') if postgresql else Upper('name')
+		matches = list(
+			queryset.alias(prefix_key=prefix_key).filter(name__istartswith=query).order_by('prefix_key', 'id')[:limit]
+		)
+		if len(matches) >= limit:
+			return matches
+		seen = [match['id'] for match in matches]
+		if postgresql:
+			if len(query) < self.min_trigram_length:
+				return matches
+			others = queryset.filter(name__trigram_word_similar=query).annotate(
+				similarity=TrigramWordSimilarity(query, 'name'),
+			).order_by('-similarity', 'name')
+		else:
+			others = queryset.filter(name__icontains=f' {query}').order_by('name')
+		matches.extend(others.exclude(id__in=seen).values('id', 'name')[:limit - len(matches)])
+		return matches
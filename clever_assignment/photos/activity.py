@@ -0,0 +1,163 @@
+"""
+Photo counters denormalized on Photographer: `photo_count` and
+`last_photo_at` (the creation time of their newest photo).
+
+Writes adjust the counters in place with `F()` expressions instead of
+recounting the photo table:
+
+- `Photo.save()` and `delete()` (and queryset deletes), through the
+  post_save/post_delete receivers below;
+- the bulk endpoints, `import_photos` and the benchmark seed, which bypass
+  the signals, through `PhotoCountChanges`.
+
+Adding photos only moves `last_photo_at` forward; removing or moving a photo
+recomputes it for the photographers involved from the (photographer,
+created_at) index. `reconcile_photo_counts` (the
+`reconcile_photographer_stats` command) repairs drift left by raw SQL.
+"""
+from collections import Counter, defaultdict
+
+from django.db.models import Case, Count, F, IntegerField, OuterRef, Subquery, Value, When
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+
+from clever_assignment.photographers.models import Photographer
+
+from .models import Photo
+
+# Photographers per UPDATE statement.
+BATCH_SIZE = 500
+
+
+def photo_count_of(photo_model):
+    return Coalesce(Subquery(
+        photo_model.objects.filter(photographer=OuterRef('pk')).order_by()
+        .values('photographer').annotate(photos=Count('pk')).values('photos'),
+        output_field=IntegerField(),
+    ), 0)
+
+
+def last_photo_at_of(photo_model):
+    return Subquery(
+        photo_model.objects.filter(photographer=OuterRef('pk')).order_by('-created_at').values('created_at')[:1]
+    )
+
+
+class PhotoCountChanges:
+    """
+    Counter changes collected over a write and applied with one UPDATE per
+    batch of photographers.
+    """
+
+    def __init__(self):
+        self.counts = Counter()
+        self.latest = {}
+        self.stale = set()
+
+    def add(self, photographer_id, created_at=None):
+        """
+        One more photo for photographer_id. Without created_at its
+        last_photo_at is recomputed.
+        """
+        self.counts[photographer_id] += 1
+        if created_at is None:
+            self.stale.add(photographer_id)
+        elif self.latest.get(photographer_id) is None or created_at > self.latest[photographer_id]:
+            self.latest[photographer_id] = created_at
+
+    def remove(self, photographer_id):
+        self.counts[photographer_id] -= 1
+        self.stale.add(photographer_id)
+
+    def move(self, old_photographer_id, new_photographer_id):
+        if old_photographer_id != new_photographer_id:
+            self.remove(old_photographer_id)
+            self.add(new_photographer_id)
+
+    def add_photos(self, photos):
+        for photo in photos:
+            self.add(photo.photographer_id, photo.created_at)
+        return self
+
+    def apply(self):
+        """
+        Write the changes. Photographers are updated in id order, so
+        concurrent writers lock them in the same order.
+        """
+        pks = sorted(pk for pk in self.counts.keys() | self.latest.keys() | self.stale if pk is not None)
+        now = timezone.now()
+        for start in range(0, len(pks), BATCH_SIZE):
+            batch = pks[start:start + BATCH_SIZE]
+            by_delta, by_latest = defaultdict(list), defaultdict(list)
+            for pk in batch:
+                if self.counts[pk]:
+                    by_delta[self.counts[pk]].append(pk)
+                if pk not in self.stale and pk in self.latest:
+                    by_latest[self.latest[pk]].append(pk)
+            last_photo_at = [
+                When(pk__in=ids, then=Greatest(Coalesce(F('last_photo_at'), Value(latest)), Value(latest)))
+                for latest, ids in by_latest.items()
+            ]
+            stale = [pk for pk in batch if pk in self.stale]
+            if stale:
+                last_photo_at.append(When(pk__in=stale, then=last_photo_at_of(Photo)))
+            changes = {'updated_at': now}
+            if by_delta:
+                changes['photo_count'] = F('photo_count') + Case(
+                    *(When(pk__in=ids, then=Value(delta)) for delta, ids in by_delta.items()),
+                    default=Value(0),
+                )
+            if last_photo_at:
+                changes['last_photo_at'] = Case(*last_photo_at, default=F('last_photo_at'))
+            Photographer.objects.filter(pk__in=batch).update(**changes)
+
+
+def count_saved_photo(sender, instance, created, raw=False, **kwargs):
+    """
+    post_save receiver: count a new photo, or move a reassigned one.
+    """
+    if raw:
+        return
+    changes = PhotoCountChanges()
+    if created:
+        changes.add(instance.photographer_id, instance.created_at)
+    else:
+        previous = getattr(instance, 'loaded_values', None)
+        if not previous:
+            return
+        changes.move(previous['photographer_id'], instance.photographer_id)
+    changes.apply()
+
+
+def count_deleted_photo(sender, instance, **kwargs):
+    """
+    post_delete receiver.
+    """
+    values = getattr(instance, 'loaded_values', None) or instance.get_tracked_values()
+    changes = PhotoCountChanges()
+    changes.remove(values['photographer_id'])
+    changes.apply()
+
+
+def reconcile_photo_counts(photographer_model, photo_model, dry_run=False, batch_size=BATCH_SIZE):
+    """
+    Recompute the counters of photographers whose stored values differ from
+    the photo table. The models are arguments so the migration can pass its
+    historical models. Returns the number of photographers that were wrong.
+    """
+    actual = photographer_model.objects.annotate(
+        actual_count=photo_count_of(photo_model),
+        actual_last_photo_at=last_photo_at_of(photo_model),
+    ).order_by('pk').values_list('pk', 'photo_count', 'actual_count', 'last_photo_at', 'actual_last_photo_at')
+    wrong = [
+        pk for pk, count, actual_count, last, actual_last in actual.iterator(chunk_size=batch_size)
+        if count != actual_count or last != actual_last
+    ]
+    if not dry_run:
+        for start in range(0, len(wrong), batch_size):
+            photographer_model.objects.filter(pk__in=wrong[start:start + batch_size]).update(
+                photo_count=photo_count_of(photo_model),
+                last_photo_at=last_photo_at_of(photo_model),
+                updated_at=timezone.now(),
+            )
+    return len(wrong)
@@ -1,5 +1,22 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_delete, post_migrate, post_save, pre_migrate
 
 class PhotosConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'clever_assignment.photos'
+
+    def ready(self):
+        from clever_assignment.core.cache import invalidate_on_change
+        from .activity import count_deleted_photo, count_saved_photo
+        from .facets import remove_facet_counts, update_facet_counts
+        from .search import install_sqlite_search, uninstall_sqlite_search
+        pre_migrate.connect(uninstall_sqlite_search, sender=self)
+        post_migrate.connect(install_sqlite_search, sender=self)
+        # Photo writes also change their photographer's counters.
+        invalidate_photos = invalidate_on_change(['photos', 'photographers'])
+        post_save.connect(invalidate_photos, sender=self.get_model('Photo'), weak=False)
+        post_delete.connect(invalidate_photos, sender=self.get_model('Photo'), weak=False)
+        post_save.connect(update_facet_counts, sender=self.get_model('Photo'))
+        post_delete.connect(remove_facet_counts, sender=self.get_model('Photo'))
+        post_save.connect(count_saved_photo, sender=self.get_model('Photo'))
+        post_delete.connect(count_deleted_photo, sender=self.get_model('Photo'))
@@ -0,0 +1,207 @@
+"""
+Batched photo writes for the `/api/v1/photos/bulk/` endpoint.
+"""
+from django.db import connections, transaction
+from django.utils import timezone
+from rest_framework import serializers
+
+from clever_assignment.core.cache import bump_generation
+from clever_assignment.photographers.models import Photographer
+from clever_assignment.photographers.resolution import resolver
+
+from .activity import PhotoCountChanges
+from .colors import color_channels
+from .facets import apply_deltas, count_photos, count_rows
+from .models import Photo
+from .variants import VARIANT_FIELDS
+
+# Rows per UPDATE/DELETE statement in bulk updates and deletes.
+BATCH_SIZE = 1000
+
+SRC_FIELDS = ['src_original', *VARIANT_FIELDS]
+
+
+def resolve_photographers(items):
+    """
+    Resolve the photographers referenced by validated bulk items in a constant
+    number of queries. `new_photographer_name`/`new_photographer_url` pairs go
+    through the shared resolver (cached pairs cost nothing, the others are
+    upserted in one statement) and every photographer is then loaded by id in
+    one query.
+    Returns ({photographer_id: Photographer}, {(name, url): Photographer}).
+    """
+    ids = {data['photographer'] for _, data in items if data.get('photographer')}
+    pairs = [
+        (data['new_photographer_name'], data['new_photographer_url'])
+        for _, data in items
+        if not data.get('photographer') and data.get('new_photographer_name') and data.get('new_photographer_url')
+    ]
+    pair_ids, _ = resolver.resolve_many(pairs)
+    ids.update(pair_ids.values())
+    by_id = Photographer.objects.in_bulk(ids) if ids else {}
+    return by_id, {pair: by_id[pk] for pair, pk in pair_ids.items()}
+
+
+def create_photos(items, owner):
+    """
+    Insert validated bulk items in one transaction.
+    items is a list of (index, validated_data). Returns ({index: Photo},
+    {index: errors}) for the created photos and the items that were rejected
+    because their photographer does not exist.
+    """
+    created, errors = {}, {}
+    does_not_exist = serializers.PrimaryKeyRelatedField.default_error_messages['does_not_exist']
+    with transaction.atomic():
+        by_id, by_pair = resolve_photographers(items)
+        for index, data in items:
+            data = dict(data)
+            name = data.pop('new_photographer_name', None)
+            url = data.pop('new_photographer_url', None)
+            photographer_id = data.pop('photographer', None)
+            if photographer_id:
+                photographer = by_id.get(photographer_id)
+                if photographer is None:
+                    errors[index] = {'photographer': [does_not_exist.format(pk_value=photographer_id)]}
+                    continue
+            else:
+                photographer = by_pair[(name, url)]
+            photo = Photo(**data, photographer=photographer, owner=owner)
+            photo.populate_derived_fields()
+            created[index] = photo
+        Photo.objects.bulk_create(created.values())
+        apply_deltas(count_photos(created.values()))
+        PhotoCountChanges().add_photos(created.values()).apply()
+    if created:
+        # bulk_create does not send post_save.
+        bump_generation('photos', 'photographers')
+    return created, errors
+
+
+def batched_pks(queryset, batch_size):
+    """
+    Yield the primary keys of a queryset in lists of at most batch_size.
+    """
+    batch = []
+    for pk in queryset.order_by().values_list('pk', flat=True).iterator(chunk_size=batch_size):
+        batch.append(pk)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def update_photos(queryset, changes, batch_size=BATCH_SIZE):
+    """
+    Apply validated field changes to every photo in queryset with one UPDATE
+    statement per batch of primary keys (the queryset is only read to select
+    the keys, so it may carry annotations and permission filters). Derived color fields and updated_at
+    are maintained here because QuerySet.update() bypasses save().
+    Returns the number of updated photos.
+    """
+    values = dict(changes)
+    name = values.pop('new_photographer_name', None)
+    url = values.pop('new_photographer_url', None)
+    if name and url:
+        values['photographer_id'] = resolver.resolve(name, url)
+    if 'avg_color' in values:
+        values.update(color_channels(values['avg_color']))
+    values['updated_at'] = timezone.now()
+
+    src_changes = {name: values.pop(name) for name in SRC_FIELDS if name in values}
+    tracked_changes = {name: values[name] for name in Photo.TRACKED_FIELDS if name in values}
+
+    updated = 0
+    for batch in batched_pks(queryset, batch_size):
+        with transaction.atomic():
+            moves = update_tracked_counts(batch, tracked_changes) if tracked_changes else None
+            updated += Photo.objects.filter(pk__in=batch).update(**values)
+            if moves:
+                # last_photo_at is recomputed, so after the UPDATE.
+                moves.apply()
+            if src_changes:
+                update_src_fields(batch, src_changes)
+    if updated:
+        bump_generation('photos', 'photographers')
+    return updated
+
+
+def update_tracked_counts(pks, changes):
+    """
+    Move a batch of photos between facet rollup rows (and photographers, for
+    a photographer_id change) for changes to Photo.TRACKED_FIELDS. The rows
+    are locked until the caller's transaction applies the UPDATE. Returns the
+    photographer counter changes, to apply after the UPDATE.
+    """
+    rows = list(Photo.objects.filter(pk__in=pks).select_for_update().values_list(*Photo.TRACKED_FIELDS))
+    deltas = count_rows(rows, sign=-1)
+    positions = [(Photo.TRACKED_FIELDS.index(name), value) for name, value in changes.items()]
+    photographer = Photo.TRACKED_FIELDS.index('photographer_id')
+    moves = PhotoCountChanges()
+    for row in rows:
+        old_photographer_id = row[photographer]
+        row = list(row)
+        for position, value in positions:
+            row[position] = value
+        count_rows([row], deltas=deltas)
+        moves.move(old_photographer_id, row[photographer])
+    apply_deltas(deltas)
+    return moves
+
+
+def update_src_fields(pks, changes):
+    """
+    Apply src_* changes to a batch of photos. The stored form depends on the
+    other URLs of each photo (see photos.variants), so the rows are loaded,
+    changed, compacted again and written with one bulk UPDATE.
+    """
+    photos = list(Photo.objects.filter(pk__in=pks).only('pk', *SRC_FIELDS, 'src_template'))
+    for photo in photos:
+        for name, value in changes.items():
+            setattr(photo, name, value)
+        photo.src_template = photo.get_src_template()
+        if photo.src_template is not None:
+            # bulk_update() writes attribute values as they are.
+            for name in VARIANT_FIELDS:
+                setattr(photo, name, '')
+    Photo.objects.bulk_update(photos, [*SRC_FIELDS, 'src_template'])
+
+
+def delete_by_pks(model, pks, using):
+    """
+    Run a plain `DELETE ... WHERE pk IN (...)` for a batch of primary keys,
+    without the deletion collector or signals. Returns the deleted row count.
+    """
+    connection = connections[using]
+    opts = model._meta
+    quote = connection.ops.quote_name
+    sql = (
+        f'DELETE FROM {quote(opts.db_table)} '
+        f'WHERE {quote(opts.pk.column)} IN ({", ".join(["%s"] * len(pks))})'
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [opts.pk.get_db_prep_value(pk, connection) for pk in pks])
+        return cursor.rowcount
+
+
+def delete_photos(queryset, batch_size=BATCH_SIZE):
+    """
+    Delete every photo in queryset with one DELETE statement per batch.
+    Nothing references photos, so the collector (which would load every row
+    to send post_delete) is skipped; the facet rollup and the photographer
+    counters are adjusted per batch instead. Returns the number of deleted photos.
+    """
+    deleted = 0
+    photographer = Photo.TRACKED_FIELDS.index('photographer_id')
+    for batch in batched_pks(queryset, batch_size):
+        with transaction.atomic():
+            rows = list(Photo.objects.filter(pk__in=batch).select_for_update().values_list(*Photo.TRACKED_FIELDS))
+            apply_deltas(count_rows(rows, sign=-1))
+            deleted += delete_by_pks(Photo, batch, queryset.db)
+            removed = PhotoCountChanges()
+            for row in rows:
+                removed.remove(row[photographer])
+            removed.apply()
+    if deleted:
+        bump_generation('photos', 'photographers')
+    return deleted
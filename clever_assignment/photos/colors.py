@@ -0,0 +1,59 @@
+"""
+Color helpers for Photo.avg_color: hex parsing and sRGB -> CIELAB (D65)
+conversion, so color similarity can be measured as CIE76 Delta E.
+"""
+import re
+
+HEX_COLOR_RE = re.compile(r'^#?([0-9a-fA-F]{3}|[0-9a-fA-F]{6})$')
+
+# D65 reference white.
+_WHITE = (0.95047, 1.0, 1.08883)
+
+
+def hex_to_rgb(value):
+    """
+    Parse '#rgb' or '#rrggbb' into an (r, g, b) tuple of ints, or None.
+    """
+    match = HEX_COLOR_RE.match((value or '').strip())
+    if not match:
+        return None
+    digits = match.group(1)
+    if len(digits) == 3:
+        digits = ''.join(c * 2 for c in digits)
+    return tuple(int(digits[i:i + 2], 16) for i in (0, 2, 4))
+
+
+def _linearize(channel):
+    c = channel / 255
+    return c / 12.92 if c <= 0.04045 else ((c + 0.055) / 1.055) ** 2.4
+
+
+def _f(t):
+    return t ** (1 / 3) if t > (6 / 29) ** 3 else t / (3 * (6 / 29) ** 2) + 4 / 29
+
+
+def rgb_to_lab(rgb):
+    """
+    Convert an sRGB (r, g, b) tuple to CIELAB (L, a, b).
+    """
+    r, g, b = (_linearize(c) for c in rgb)
+    x = (0.4124 * r + 0.3576 * g + 0.1805 * b) / _WHITE[0]
+    y = (0.2126 * r + 0.7152 * g + 0.0722 * b) / _WHITE[1]
+    z = (0.0193 * r + 0.1192 * g + 0.9505 * b) / _WHITE[2]
+    fx, fy, fz = _f(x), _f(y), _f(z)
+    return (116 * fy - 16, 500 * (fx - fy), 200 * (fy - fz))
+
+
+def color_channels(value):
+    """
+    Return the derived Photo color fields for a hex color. All values are None
+    when the color cannot be parsed.
+    """
+    rgb = hex_to_rgb(value)
+    if rgb is None:
+        return dict.fromkeys(('color_r', 'color_g', 'color_b', 'lab_l', 'lab_a', 'lab_b'))
+    lab = rgb_to_lab(rgb)
+    return {
+        'color_r': rgb[0], 'color_g': rgb[1], 'color_b': rgb[2],
+        'lab_l': lab[0], 'lab_a': lab[1], 'lab_b': lab[2],
+    }
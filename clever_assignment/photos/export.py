@@ -0,0 +1,247 @@
+"""
+Streaming photo exports for `GET /api/v1/photos/export/` and the
+`export_photos` command.
+
+Rows are read with `QuerySet.iterator()` (a server-side cursor on
+PostgreSQL) as plain value tuples and encoded chunk by chunk, so memory use
+does not grow with the size of the export:
+
+- `csv`: the Pexels column layout `import_photos` reads.
+- `ndjson` and `parquet`: the fields of the API representation. Parquet is
+  written one row group per chunk and needs the optional `pyarrow` package.
+
+Under ASGI the response streams from `astream()`, an async iterator over the
+same chunks: Django buffers a synchronous iterator completely before an ASGI
+response is sent.
+"""
+import csv
+import io
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+from clever_assignment.core.importing import CSV_COLUMNS
+
+from .variants import VARIANT_FIELDS, expand
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+# Rows fetched per round trip and encoded per Parquet row group.
+EXPORT_CHUNK_SIZE = 2000
+
+# CSV column -> Photo lookup, in the order of photos.csv.
+CSV_LOOKUPS = {
+    'id': 'pexels_id',
+    'width': 'width',
+    'height': 'height',
+    'url': 'url',
+    'photographer': 'photographer__name',
+    'photographer_url': 'photographer__url',
+    'photographer_id': 'photographer__pexels_id',
+    'avg_color': 'avg_color',
+    'src.original': 'src_original',
+    'src.large2x': 'src_large2x',
+    'src.large': 'src_large',
+    'src.medium': 'src_medium',
+    'src.small': 'src_small',
+    'src.portrait': 'src_portrait',
+    'src.landscape': 'src_landscape',
+    'src.tiny': 'src_tiny',
+    'alt': 'alt',
+}
+
+# API field -> Photo lookup, as PhotoSerializer represents a photo.
+RECORD_LOOKUPS = {
+    'id': 'id',
+    'width': 'width',
+    'height': 'height',
+    'aspect_ratio': 'aspect_ratio',
+    'orientation': 'orientation',
+    'megapixels': 'megapixels',
+    'url': 'url',
+    'photographer': 'photographer_id',
+    'avg_color': 'avg_color',
+    'src_original': 'src_original',
+    'src_large2x': 'src_large2x',
+    'src_large': 'src_large',
+    'src_medium': 'src_medium',
+    'src_small': 'src_small',
+    'src_portrait': 'src_portrait',
+    'src_landscape': 'src_landscape',
+    'src_tiny': 'src_tiny',
+    'alt': 'alt',
+    'owner': 'owner_id',
+    'photographer_name': 'photographer__name',
+    'photographer_url': 'photographer__url',
+    'created_at': 'created_at',
+    'updated_at': 'updated_at',
+}
+
+
+def export_rows(queryset, lookups, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Yield value tuples for lookups from a server-side cursor, keeping the
+    queryset's filters and ordering. Variant URLs of compacted photos are
+    rebuilt from their template.
+    """
+    lookups = list(lookups.values())
+    variants = [(index, lookup) for index, lookup in enumerate(lookups) if lookup in VARIANT_FIELDS]
+    rows = queryset.values_list(*lookups, 'src_original', 'src_template').iterator(chunk_size=chunk_size)
+    for *row, src_original, template_id in rows:
+        if template_id is not None:
+            urls = expand(src_original, template_id)
+            for index, lookup in variants:
+                row[index] = urls[lookup]
+        yield row
+
+
+def chunked(rows, size):
+    """
+    Yield lists of at most size rows.
+    """
+    rows = iter(rows)
+    while chunk := list(islice(rows, size)):
+        yield chunk
+
+
+class ExportRenderer(BaseRenderer):
+    """
+    Base class for export formats. `stream(queryset)` yields the encoded
+    export; `render()` is only used for error responses, which are JSON.
+    """
+    lookups = RECORD_LOOKUPS
+    extension = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        response = (renderer_context or {}).get('response')
+        if response is not None:
+            response['Content-Type'] = JSONRenderer.media_type
+        return JSONRenderer().render(data, accepted_media_type, renderer_context)
+
+    def stream(self, queryset, chunk_size=EXPORT_CHUNK_SIZE):
+        for chunk in chunked(export_rows(queryset, self.lookups, chunk_size), chunk_size):
+            yield self.encode(chunk)
+
+    async def astream(self, queryset, chunk_size=EXPORT_CHUNK_SIZE):
+        """
+        Async iterator over stream(). Each chunk is fetched and encoded in
+        the ORM's thread, so the event loop is free while it is prepared.
+        """
+        chunks = self.stream(queryset, chunk_size)
+        next_chunk = sync_to_async(next)
+        try:
+            while (chunk := await next_chunk(chunks, None)) is not None:
+                yield chunk
+        finally:
+            # Closes the server-side cursor when the client goes away early.
+            await sync_to_async(chunks.close)()
+
+    def encode(self, rows):
+        raise NotImplementedError('ExportRenderer.encode() must be implemented.')
+
+
+class NDJSONRenderer(ExportRenderer):
+    """
+    One JSON object per line.
+    """
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+    charset = 'utf-8'
+    extension = 'ndjson'
+
+    def encode(self, rows):
+        names = list(self.lookups)
+        encoder = JSONEncoder(ensure_ascii=False, separators=(',', ':'))
+        lines = [encoder.encode(dict(zip(names, row))) for row in rows]
+        return ''.join(f'{line}\n' for line in lines).encode('utf-8')
+
+
+class CSVRenderer(ExportRenderer):
+    """
+    photos.csv layout, readable by `import_photos`.
+    """
+    media_type = 'text/csv'
+    format = 'csv'
+    charset = 'utf-8'
+    extension = 'csv'
+    lookups = CSV_LOOKUPS
+
+    def stream(self, queryset, chunk_size=EXPORT_CHUNK_SIZE):
+        yield self.encode([CSV_COLUMNS])
+        yield from super().stream(queryset, chunk_size)
+
+    def encode(self, rows):
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        return buffer.getvalue().encode('utf-8')
+
+
+class ChunkSink(io.RawIOBase):
+    """
+    Write-only file that hands over what was written since the last drain().
+    """
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+class ParquetRenderer(ExportRenderer):
+    """
+    Parquet file with one row group per chunk (requires pyarrow).
+    """
+    media_type = 'application/vnd.apache.parquet'
+    format = 'parquet'
+    charset = None
+    render_style = 'binary'
+    extension = 'parquet'
+
+    @staticmethod
+    def get_schema():
+        string, timestamp = pyarrow.string(), pyarrow.timestamp('us', tz='UTC')
+        types = {
+            'width': pyarrow.int32(), 'height': pyarrow.int32(),
+            'aspect_ratio': pyarrow.float64(), 'megapixels': pyarrow.float64(),
+            'created_at': timestamp, 'updated_at': timestamp,
+        }
+        return pyarrow.schema([(name, types.get(name, string)) for name in RECORD_LOOKUPS])
+
+    def stream(self, queryset, chunk_size=EXPORT_CHUNK_SIZE):
+        schema = self.get_schema()
+        uuids = {'id', 'photographer', 'owner'}
+        sink = ChunkSink()
+        with pyarrow.parquet.ParquetWriter(sink, schema) as writer:
+            for chunk in chunked(export_rows(queryset, self.lookups, chunk_size), chunk_size):
+                columns = [
+                    [None if value is None else str(value) for value in column] if name in uuids else list(column)
+                    for name, column in zip(schema.names, zip(*chunk))
+                ]
+                writer.write_table(pyarrow.Table.from_arrays(columns, schema=schema))
+                yield sink.drain()
+        yield sink.drain()
+
+
+EXPORT_RENDERERS = [NDJSONRenderer, CSVRenderer]
+if pyarrow is not None:
+    EXPORT_RENDERERS.append(ParquetRenderer)
@@ -0,0 +1,230 @@
+"""
+Faceted photo counts for `GET /api/v1/photos/facets/`.
+
+Photos are counted per value of three dimensions: `avg_color`,
+`photographer` (its id) and `orientation` (landscape, portrait or square,
+from width and height).
+
+Unfiltered requests read the `PhotoFacetCount` rollup instead of
+aggregating the photo table. Every write path adjusts the rollup by the
+difference it makes, with one UPSERT per write:
+
+- `Photo.save()` and `delete()`, and queryset deletes, through the
+  post_save/post_delete receivers below;
+- the bulk endpoints and `import_photos`, which bypass the signals, through
+  `apply_deltas`.
+
+Requests with list filters or a search aggregate the matching photos in a
+single statement: one scan grouped by `GROUPING SETS` (one set per
+dimension) on PostgreSQL, a UNION ALL of one GROUP BY per dimension on other
+backends. `rebuild_counts` (the `rebuild_facets` command) recomputes the
+rollup from scratch.
+"""
+import uuid
+from collections import Counter
+
+from django.db import connection, connections, transaction
+from django.db.models import CharField, Count, F, Value
+from django.db.models.functions import Cast
+
+from .models import Photo, PhotoFacetCount, orientation_expression
+
+DIMENSIONS = ('avg_color', 'photographer', 'orientation')
+
+# Rollup rows per UPSERT statement (three parameters each).
+UPSERT_BATCH_SIZE = 300
+
+
+def facet_expressions():
+    """
+    SQL expression of each dimension's value, matching Photo.get_facet_values().
+    """
+    return {
+        'avg_color': F('avg_color'),
+        'photographer': Cast('photographer_id', CharField()),
+        # Not the generated column: migration 0009 runs before it exists.
+        'orientation': orientation_expression(),
+    }
+
+
+def normalize_value(dimension, value):
+    """
+    Photographer ids come back from SQL as text in the backend's UUID format
+    (hex without dashes on SQLite); the rollup stores the canonical form.
+    """
+    if dimension == 'photographer' and value is not None:
+        return str(uuid.UUID(value))
+    return value
+
+
+def grouped_counts(queryset, dimensions=DIMENSIONS):
+    """
+    Count the photos of queryset per value of each dimension in one
+    statement. Returns {(dimension, value): count}. Also used by migrations
+    with the historical Photo model.
+    """
+    dimensions = list(dimensions)
+    if not dimensions:
+        return {}
+    queryset = queryset.order_by()
+    if connections[queryset.db].vendor == 'postgresql':
+        rows = grouping_sets_counts(queryset, dimensions)
+    else:
+        rows = union_counts(queryset, dimensions)
+    return {(dimension, normalize_value(dimension, value)): count for dimension, value, count in rows}
+
+
+def grouping_sets_counts(queryset, dimensions):
+    """
+    Yield (dimension, value, count) from one scan of queryset grouped by
+    GROUPING SETS ((value of dimension 1), (value of dimension 2), ...).
+    GROUPING() tells which set a row belongs to, since values may be NULL.
+    """
+    expressions = facet_expressions()
+    aliases = [f'facet_{index}' for index in range(len(dimensions))]
+    values = queryset.annotate(**{
+        alias: Cast(expressions[dimension], CharField()) for alias, dimension in zip(aliases, dimensions)
+    }).values(*aliases)
+    db_connection = connections[queryset.db]
+    sql, params = values.query.get_compiler(queryset.db).as_sql()
+    columns = [db_connection.ops.quote_name(alias) for alias in aliases]
+    sql = (
+        f'SELECT {", ".join(f"GROUPING({column})" for column in columns)}, {", ".join(columns)}, COUNT(*) '
+        f'FROM ({sql}) facet_rows GROUP BY GROUPING SETS ({", ".join(f"({column})" for column in columns)})'
+    )
+    with db_connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        for row in cursor.fetchall():
+            index = row[:len(dimensions)].index(0)
+            yield dimensions[index], row[len(dimensions) + index], row[-1]
+
+
+def union_counts(queryset, dimensions):
+    """
+    Yield (dimension, value, count) from a UNION ALL of one GROUP BY per
+    dimension, for backends without GROUPING SETS (SQLite).
+    """
+    expressions = facet_expressions()
+    parts = [
+        queryset.annotate(
+            facet_dimension=Value(dimension, output_field=CharField()),
+            facet_value=Cast(expressions[dimension], CharField()),
+        ).values('facet_dimension', 'facet_value').annotate(facet_count=Count('pk')).values_list(
+            'facet_dimension', 'facet_value', 'facet_count',
+        )
+        for dimension in dimensions
+    ]
+    return parts[0].union(*parts[1:], all=True) if len(parts) > 1 else parts[0]
+
+
+def count_rows(rows, sign=1, deltas=None):
+    """
+    Deltas adding (or, with sign=-1, removing) photos given as
+    Photo.TRACKED_FIELDS value tuples to the rollup.
+    """
+    deltas = Counter() if deltas is None else deltas
+    for row in rows:
+        for dimension, value in Photo.facet_values_of(*row).items():
+            deltas[(dimension, value)] += sign
+    return deltas
+
+
+def count_photos(photos, sign=1):
+    """
+    count_rows() for Photo instances.
+    """
+    return count_rows(([getattr(photo, name) for name in Photo.TRACKED_FIELDS] for photo in photos), sign)
+
+
+def apply_deltas(deltas):
+    """
+    Add {(dimension, value): delta} to the rollup with INSERT ... ON CONFLICT
+    DO UPDATE. Rows are written in key order, so concurrent writers lock them
+    in the same order.
+    """
+    rows = sorted((dimension, value, delta) for (dimension, value), delta in deltas.items() if delta)
+    if not rows:
+        return
+    table = connection.ops.quote_name(PhotoFacetCount._meta.db_table)
+    dimension, value, count = (connection.ops.quote_name(name) for name in ('dimension', 'value', 'count'))
+    with connection.cursor() as cursor:
+        for start in range(0, len(rows), UPSERT_BATCH_SIZE):
+            batch = rows[start:start + UPSERT_BATCH_SIZE]
+            cursor.execute(
+                f'INSERT INTO {table} ({dimension}, {value}, {count}) '
+                f'VALUES {", ".join(["(%s, %s, %s)"] * len(batch))} '
+                f'ON CONFLICT ({dimension}, {value}) DO UPDATE SET {count} = {table}.{count} + excluded.{count}',
+                [param for row in batch for param in row],
+            )
+
+
+def rebuild_counts():
+    """
+    Replace the rollup with counts of the whole photo table.
+    Returns (rollup rows, values whose count was wrong).
+    """
+    with transaction.atomic():
+        counts = grouped_counts(Photo.objects.all())
+        stored = dict(
+            ((dimension, value), count)
+            for dimension, value, count in PhotoFacetCount.objects.filter(count__gt=0).values_list(
+                'dimension', 'value', 'count',
+            )
+        )
+        wrong = sum(1 for key in counts.keys() | stored.keys() if counts.get(key, 0) != stored.get(key, 0))
+        PhotoFacetCount.objects.all().delete()
+        PhotoFacetCount.objects.bulk_create(
+            [PhotoFacetCount(dimension=dimension, value=value, count=count) for (dimension, value), count in counts.items()],
+            batch_size=1000,
+        )
+    return len(counts), wrong
+
+
+def update_facet_counts(sender, instance, created, raw=False, **kwargs):
+    """
+    post_save receiver: move the photo between rollup rows.
+    """
+    if raw:
+        return
+    deltas = Counter({key: 1 for key in instance.get_facet_values().items()})
+    previous = None if created else getattr(instance, 'loaded_values', None)
+    if previous:
+        for key in Photo.facet_values_of(**previous).items():
+            deltas[key] -= 1
+    apply_deltas(deltas)
+
+
+def remove_facet_counts(sender, instance, **kwargs):
+    """
+    post_delete receiver: take the photo out of the rollup.
+    """
+    values = getattr(instance, 'loaded_values', None) or instance.get_tracked_values()
+    apply_deltas({key: -1 for key in Photo.facet_values_of(**values).items()})
+
+
+def rollup_facets(dimensions, limit):
+    """
+    The top `limit` values of each dimension from the rollup.
+    """
+    return {
+        dimension: list(
+            PhotoFacetCount.objects.filter(dimension=dimension, count__gt=0)
+            .order_by('-count', 'value')
+            .values_list('value', 'count')[:limit]
+        )
+        for dimension in dimensions
+    }
+
+
+def query_facets(queryset, dimensions, limit):
+    """
+    The top `limit` values of each dimension among the photos of queryset.
+    """
+    counts = grouped_counts(queryset, dimensions)
+    facets = {dimension: [] for dimension in dimensions}
+    for (dimension, value), count in counts.items():
+        facets[dimension].append((value, count))
+    return {
+        dimension: sorted(values, key=lambda item: (-item[1], item[0]))[:limit]
+        for dimension, values in facets.items()
+    }
@@ -0,0 +1,130 @@
+import re
+
+import django_filters
+from django.core.exceptions import ValidationError
+from django.core.validators import RegexValidator
+from django.db.models import F
+from django.db.models.functions import Sqrt
+from rest_framework import filters
+
+from .colors import HEX_COLOR_RE, hex_to_rgb, rgb_to_lab
+from .models import ORIENTATIONS, Photo
+
+# `16:9`, `4/3` or a decimal ratio such as `1.5`.
+ASPECT_RATIO_RE = re.compile(r'^\s*(\d+(?:\.\d+)?)\s*(?:[:/]\s*(\d+(?:\.\d+)?)\s*)?$')
+
+
+def parse_aspect_ratio(value):
+    """
+    Width / height of an ASPECT_RATIO_RE value, or None if it is not one.
+    """
+    match = ASPECT_RATIO_RE.match(value)
+    if not match:
+        return None
+    width, height = float(match[1]), float(match[2] or 1)
+    return width / height if width and height else None
+
+
+def validate_aspect_ratio(value):
+    if parse_aspect_ratio(value) is None:
+        raise ValidationError('Enter a positive aspect ratio such as 16:9, 4/3 or 1.5.')
+
+
+class PhotoFilter(django_filters.FilterSet):
+    """
+    Exact filters plus nearest-color search: `?color=#336699&tolerance=15`
+    keeps photos whose average color is within `tolerance` CIE76 Delta E of
+    `color` and annotates them with `color_distance`.
+    Dimension filters use the width/height indexes and the generated
+    orientation, aspect_ratio and megapixels columns, e.g.
+    `?orientation=landscape&min_width=4000` or `?aspect_ratio=4:3`.
+    """
+    DEFAULT_TOLERANCE = 10
+    DEFAULT_ASPECT_RATIO_TOLERANCE = 0.01
+
+    # Plain UUID filters: unlike ModelChoiceFilter they do not query the
+    # related row during validation, so the async read path can use them.
+    photographer = django_filters.UUIDFilter()
+    owner = django_filters.UUIDFilter()
+    color = django_filters.CharFilter(
+        method='filter_color',
+        validators=[RegexValidator(HEX_COLOR_RE, 'Enter a hex color such as #336699.')],
+        help_text='Hex color; returns photos with a similar average color, nearest first.',
+    )
+    tolerance = django_filters.NumberFilter(
+        method='filter_tolerance', min_value=0,
+        help_text=f'Maximum Delta E distance for `color` (default {DEFAULT_TOLERANCE}).',
+    )
+    min_width = django_filters.NumberFilter(field_name='width', lookup_expr='gte', min_value=0)
+    max_width = django_filters.NumberFilter(field_name='width', lookup_expr='lte', min_value=0)
+    min_height = django_filters.NumberFilter(field_name='height', lookup_expr='gte', min_value=0)
+    max_height = django_filters.NumberFilter(field_name='height', lookup_expr='lte', min_value=0)
+    min_megapixels = django_filters.NumberFilter(field_name='megapixels', lookup_expr='gte', min_value=0)
+    max_megapixels = django_filters.NumberFilter(field_name='megapixels', lookup_expr='lte', min_value=0)
+    orientation = django_filters.ChoiceFilter(choices=ORIENTATIONS)
+    aspect_ratio = django_filters.CharFilter(
+        method='filter_aspect_ratio',
+        validators=[validate_aspect_ratio],
+        help_text='Width:height ratio (16:9, 4/3 or 1.5); returns photos within `aspect_ratio_tolerance` of it.',
+    )
+    aspect_ratio_tolerance = django_filters.NumberFilter(
+        method='filter_tolerance', min_value=0,
+        help_text=f'Maximum difference from `aspect_ratio` (default {DEFAULT_ASPECT_RATIO_TOLERANCE}).',
+    )
+
+    class Meta:
+        model = Photo
+        fields = ['photographer', 'avg_color', 'owner']
+
+    def filter_tolerance(self, queryset, name, value):
+        """
+        Tolerances only parameterize the color and aspect ratio filters.
+        """
+        return queryset
+
+    def filter_aspect_ratio(self, queryset, name, value):
+        """
+        Range scan on the aspect_ratio index.
+        """
+        ratio = parse_aspect_ratio(value)
+        tolerance = self.form.cleaned_data.get('aspect_ratio_tolerance')
+        tolerance = self.DEFAULT_ASPECT_RATIO_TOLERANCE if tolerance is None else float(tolerance)
+        return queryset.filter(aspect_ratio__range=(ratio - tolerance, ratio + tolerance))
+
+    def filter_color(self, queryset, name, value):
+        """
+        Prefilter on the Lab bounding box (served by the lab_l, lab_a, lab_b
+        index), then keep rows inside the tolerance sphere.
+        """
+        tolerance = self.form.cleaned_data.get('tolerance')
+        if tolerance is None:
+            tolerance = self.DEFAULT_TOLERANCE
+        tolerance = float(tolerance)
+        lab = rgb_to_lab(hex_to_rgb(value))
+        box = {
+            f'{field}__range': (channel - tolerance, channel + tolerance)
+            for field, channel in zip(('lab_l', 'lab_a', 'lab_b'), lab)
+        }
+        distance = Sqrt(sum(
+            (F(field) - channel) * (F(field) - channel)
+            for field, channel in zip(('lab_l', 'lab_a', 'lab_b'), lab)
+        ))
+        return queryset.filter(**box).annotate(color_distance=distance).filter(color_distance__lte=tolerance)
+
+
+class PhotoOrderingFilter(filters.OrderingFilter):
+    """
+    OrderingFilter that orders by relevance when a search annotated the
+    queryset and the client did not ask for an explicit ordering.
+    """
+    relevance_ordering = ['-search_rank', 'color_distance']
+
+    def get_ordering(self, request, queryset, view):
+        """
+        Prefix the default ordering with the relevance annotations present on the queryset.
+        """
+        ordering = super().get_ordering(request, queryset, view)
+        if request.query_params.get(self.ordering_param):
+            return ordering
+        relevance = [term for term in self.relevance_ordering if term.lstrip('-') in queryset.query.annotations]
+        return [*relevance, *(ordering or [])]
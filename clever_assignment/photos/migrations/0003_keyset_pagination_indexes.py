@@ -0,0 +1,36 @@
+# Generated by Django 5.1.7 on 2026-10-18 02:34
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('photographers', '0002_keyset_pagination_indexes'),
+        ('photos', '0002_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='photo',
+            name='photos_phot_created_84134a_idx',
+        ),
+        migrations.AddIndex(
+            model_name='photo',
+            index=models.Index(fields=['created_at', 'id'], name='photos_phot_created_cf67ae_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='photo',
+            index=models.Index(fields=['width', 'id'], name='photos_phot_width_6442d6_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='photo',
+            index=models.Index(fields=['height', 'id'], name='photos_phot_height_41277a_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='photo',
+            index=models.Index(fields=['photographer', 'created_at', 'id'], name='photos_phot_photogr_2877f8_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.7 on 2026-10-18 02:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('photos', '0003_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='photo',
+            name='url',
+            field=models.URLField(db_index=True),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.7 on 2026-10-18 02:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('photos', '0004_url_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='photo',
+            name='pexels_id',
+            field=models.BigIntegerField(blank=True, null=True, unique=True),
+        ),
+        migrations.AddField(
+            model_name='photo',
+            name='source_hash',
+            field=models.CharField(blank=True, default='', editable=False, max_length=40),
+        ),
+    ]
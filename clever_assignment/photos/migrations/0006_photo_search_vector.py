@@ -0,0 +1,70 @@
+# Full-text search document for photos (PostgreSQL only; SQLite uses the FTS5
+# table installed by clever_assignment.photos.search on post_migrate).
+
+from django.db import migrations
+
+FORWARD_SQL = [
+    'ALTER TABLE photos_photo ADD COLUMN search_vector tsvector',
+    """
+    CREATE FUNCTION photos_photo_search_vector_update() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector :=
+            setweight(to_tsvector('english', coalesce(NEW.alt, '')), 'A') ||
+            setweight(to_tsvector('english', coalesce(
+                (SELECT name FROM photographers_photographer WHERE id = NEW.photographer_id), ''
+            )), 'B');
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER photos_photo_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF alt, photographer_id ON photos_photo
+    FOR EACH ROW EXECUTE FUNCTION photos_photo_search_vector_update()
+    """,
+    """
+    CREATE FUNCTION photographers_photographer_search_vector_update() RETURNS trigger AS $$
+    BEGIN
+        UPDATE photos_photo SET alt = alt WHERE photographer_id = NEW.id;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER photographers_photographer_search_vector_trigger
+    AFTER UPDATE OF name ON photographers_photographer
+    FOR EACH ROW WHEN (OLD.name IS DISTINCT FROM NEW.name)
+    EXECUTE FUNCTION photographers_photographer_search_vector_update()
+    """,
+    'UPDATE photos_photo SET alt = alt',
+    'CREATE INDEX photos_photo_search_vector_gin ON photos_photo USING gin (search_vector)',
+]
+
+REVERSE_SQL = [
+    'DROP TRIGGER IF EXISTS photographers_photographer_search_vector_trigger ON photographers_photographer',
+    'DROP FUNCTION IF EXISTS photographers_photographer_search_vector_update()',
+    'DROP TRIGGER IF EXISTS photos_photo_search_vector_trigger ON photos_photo',
+    'DROP FUNCTION IF EXISTS photos_photo_search_vector_update()',
+    'ALTER TABLE photos_photo DROP COLUMN IF EXISTS search_vector',
+]
+
+
+def run_postgresql(statements):
+    def operation(apps, schema_editor):
+        if schema_editor.connection.vendor != 'postgresql':
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+    return operation
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('photographers', '0004_pexels_ids'),
+        ('photos', '0005_pexels_ids'),
+    ]
+
+    operations = [
+        migrations.RunPython(run_postgresql(FORWARD_SQL), run_postgresql(REVERSE_SQL)),
+    ]
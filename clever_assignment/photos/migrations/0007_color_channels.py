@@ -0,0 +1,72 @@
+# Generated by Django 5.1.7 on 2026-10-18 02:41
+
+from django.conf import settings
+from django.db import migrations, models
+
+from clever_assignment.photos.colors import color_channels
+
+BATCH_SIZE = 2000
+
+
+def backfill_color_channels(apps, schema_editor):
+    """
+    Decode avg_color into the new channel columns in batches.
+    """
+    Photo = apps.get_model('photos', 'Photo')
+    fields = ['color_r', 'color_g', 'color_b', 'lab_l', 'lab_a', 'lab_b']
+    batch = []
+    for photo in Photo.objects.only('pk', 'avg_color').iterator(chunk_size=BATCH_SIZE):
+        for name, value in color_channels(photo.avg_color).items():
+            setattr(photo, name, value)
+        batch.append(photo)
+        if len(batch) >= BATCH_SIZE:
+            Photo.objects.bulk_update(batch, fields)
+            batch = []
+    Photo.objects.bulk_update(batch, fields)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('photographers', '0005_name_autocomplete_indexes'),
+        ('photos', '0006_photo_search_vector'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='photo',
+            name='color_b',
+            field=models.PositiveSmallIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='photo',
+            name='color_g',
+            field=models.PositiveSmallIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='photo',
+            name='color_r',
+            field=models.PositiveSmallIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='photo',
+            name='lab_a',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='photo',
+            name='lab_b',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='photo',
+            name='lab_l',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(backfill_color_channels, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='photo',
+            index=models.Index(fields=['lab_l', 'lab_a', 'lab_b'], name='photos_phot_lab_l_412bfa_idx'),
+        ),
+    ]
@@ -0,0 +1,110 @@
+# Generated by Django 5.1.7 on 2026-10-18 02:59
+#
+# Compacts the existing photos whatever PHOTO_SRC_COMPACT says at migrate
+# time: loaded rows are expanded either way, and `compact_photo_src --expand`
+# stores every URL explicitly again. The templates and the compaction loop
+# are frozen copies of photos.variants as of this migration, so later
+# changes to that module cannot change what it does.
+
+import clever_assignment.photos.variants
+from django.db import migrations, models
+from django.db.models import Value
+from django.db.models.functions import Concat
+
+BATCH_SIZE = 2000
+
+VARIANT_TEMPLATES = {
+    1: {
+        'src_large2x': '?auto=compress&cs=tinysrgb&dpr=2&h=650&w=940',
+        'src_large': '?auto=compress&cs=tinysrgb&h=650&w=940',
+        'src_medium': '?auto=compress&cs=tinysrgb&h=350',
+        'src_small': '?auto=compress&cs=tinysrgb&h=130',
+        'src_portrait': '?auto=compress&cs=tinysrgb&fit=crop&h=1200&w=800',
+        'src_landscape': '?auto=compress&cs=tinysrgb&fit=crop&h=627&w=1200',
+        'src_tiny': '?auto=compress&cs=tinysrgb&dpr=1&fit=crop&h=200&w=280',
+    },
+}
+VARIANT_FIELDS = list(VARIANT_TEMPLATES[1])
+
+
+def compact_existing_photos(apps, schema_editor):
+    """
+    Store existing photos compactly when their URLs match a template, with
+    one UPDATE per template and batch.
+    """
+    Photo = apps.get_model('photos', 'Photo')
+    blank = dict.fromkeys(VARIANT_FIELDS, '')
+    pending = {template_id: [] for template_id in VARIANT_TEMPLATES}
+    rows = Photo.objects.values_list('pk', 'src_original', *VARIANT_FIELDS).iterator(chunk_size=BATCH_SIZE)
+    for pk, src_original, *variants in rows:
+        if not src_original:
+            continue
+        variants = dict(zip(VARIANT_FIELDS, variants))
+        for template_id, suffixes in VARIANT_TEMPLATES.items():
+            if all(variants[name] == src_original + suffix for name, suffix in suffixes.items()):
+                pending[template_id].append(pk)
+                break
+        for template_id, pks in pending.items():
+            if len(pks) >= BATCH_SIZE:
+                Photo.objects.filter(pk__in=pks).update(src_template=template_id, **blank)
+                pks.clear()
+    for template_id, pks in pending.items():
+        Photo.objects.filter(pk__in=pks).update(src_template=template_id, **blank)
+
+
+def expand_existing_photos(apps, schema_editor):
+    Photo = apps.get_model('photos', 'Photo')
+    for template_id, suffixes in VARIANT_TEMPLATES.items():
+        urls = {name: Concat('src_original', Value(suffix)) for name, suffix in suffixes.items()}
+        Photo.objects.filter(src_template=template_id).update(src_template=None, **urls)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('photos', '0007_color_channels'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='photo',
+            name='src_template',
+            field=models.PositiveSmallIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AlterField(
+            model_name='photo',
+            name='src_landscape',
+            field=clever_assignment.photos.variants.VariantURLField(),
+        ),
+        migrations.AlterField(
+            model_name='photo',
+            name='src_large',
+            field=clever_assignment.photos.variants.VariantURLField(),
+        ),
+        migrations.AlterField(
+            model_name='photo',
+            name='src_large2x',
+            field=clever_assignment.photos.variants.VariantURLField(),
+        ),
+        migrations.AlterField(
+            model_name='photo',
+            name='src_medium',
+            field=clever_assignment.photos.variants.VariantURLField(),
+        ),
+        migrations.AlterField(
+            model_name='photo',
+            name='src_portrait',
+            field=clever_assignment.photos.variants.VariantURLField(),
+        ),
+        migrations.AlterField(
+            model_name='photo',
+            name='src_small',
+            field=clever_assignment.photos.variants.VariantURLField(),
+        ),
+        migrations.AlterField(
+            model_name='photo',
+            name='src_tiny',
+            field=clever_assignment.photos.variants.VariantURLField(),
+        ),
+        migrations.RunPython(compact_existing_photos, expand_existing_photos),
+    ]
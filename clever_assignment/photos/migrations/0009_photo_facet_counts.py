@@ -0,0 +1,44 @@
+# Generated by Django 5.1.7 on 2026-10-18 03:17
+
+from django.db import migrations, models
+
+from clever_assignment.photos.facets import grouped_counts
+
+
+def populate_facet_counts(apps, schema_editor):
+    """
+    Fill the rollup from the existing photos.
+    """
+    Photo = apps.get_model('photos', 'Photo')
+    PhotoFacetCount = apps.get_model('photos', 'PhotoFacetCount')
+    PhotoFacetCount.objects.bulk_create(
+        [
+            PhotoFacetCount(dimension=dimension, value=value, count=count)
+            for (dimension, value), count in grouped_counts(Photo.objects.all()).items()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('photos', '0008_compact_src_variants'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PhotoFacetCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dimension', models.CharField(max_length=20)),
+                ('value', models.CharField(max_length=64)),
+                ('count', models.IntegerField(default=0)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['dimension', '-count'], name='photos_facet_dimension_count')],
+                'constraints': [models.UniqueConstraint(fields=('dimension', 'value'), name='photos_facet_dimension_value_uniq')],
+            },
+        ),
+        migrations.RunPython(populate_facet_counts, migrations.RunPython.noop),
+    ]
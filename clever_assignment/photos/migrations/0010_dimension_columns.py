@@ -0,0 +1,106 @@
+# Generated by Django 5.1.7 on 2026-10-18 03:30
+#
+# The new columns are STORED generated columns, so the database keeps them
+# current on every write path, including QuerySet.update() and the bulk
+# upserts of import_photos. Adding one rewrites the table under an ACCESS
+# EXCLUSIVE lock, and Django would issue one ALTER TABLE per field; on
+# PostgreSQL add_dimension_columns adds all three in a single ALTER TABLE,
+# so the table is rewritten once. The indexes are then built CONCURRENTLY,
+# which cannot run in a transaction, hence atomic = False. Both run as
+# RunPython after state-only operations, which give them the new fields.
+
+import django.db.models.expressions
+import django.db.models.functions.comparison
+from django.conf import settings
+from django.db import migrations, models
+
+COLUMNS = ['aspect_ratio', 'megapixels', 'orientation']
+INDEXES = [
+    models.Index(fields=['orientation', 'created_at', 'id'], name='photos_phot_orienta_fa98d7_idx'),
+    models.Index(fields=['orientation', 'width', 'id'], name='photos_phot_orienta_b2dc3a_idx'),
+    models.Index(fields=['aspect_ratio', 'id'], name='photos_phot_aspect__b5f3fc_idx'),
+    models.Index(fields=['megapixels', 'id'], name='photos_phot_megapix_72bf14_idx'),
+]
+
+
+def add_dimension_columns(apps, schema_editor):
+    """
+    Add the generated columns, with one ALTER TABLE on PostgreSQL.
+    """
+    Photo = apps.get_model('photos', 'Photo')
+    fields = [Photo._meta.get_field(name) for name in COLUMNS]
+    if schema_editor.connection.vendor != 'postgresql':
+        for field in fields:
+            schema_editor.add_field(Photo, field)
+        return
+    clauses, params = [], []
+    for field in fields:
+        definition, field_params = schema_editor.column_sql(Photo, field)
+        clauses.append(f'ADD COLUMN {schema_editor.quote_name(field.column)} {definition}')
+        params.extend(field_params)
+    schema_editor.execute(
+        f'ALTER TABLE {schema_editor.quote_name(Photo._meta.db_table)} {", ".join(clauses)}', params or None,
+    )
+
+
+def remove_dimension_columns(apps, schema_editor):
+    Photo = apps.get_model('photos', 'Photo')
+    for name in COLUMNS:
+        schema_editor.remove_field(Photo, Photo._meta.get_field(name))
+
+
+def add_dimension_indexes(apps, schema_editor):
+    """
+    Build the indexes without blocking writes on PostgreSQL.
+    """
+    Photo = apps.get_model('photos', 'Photo')
+    concurrently = {'concurrently': True} if schema_editor.connection.vendor == 'postgresql' else {}
+    for index in INDEXES:
+        schema_editor.add_index(Photo, index, **concurrently)
+
+
+def remove_dimension_indexes(apps, schema_editor):
+    Photo = apps.get_model('photos', 'Photo')
+    concurrently = {'concurrently': True} if schema_editor.connection.vendor == 'postgresql' else {}
+    for index in INDEXES:
+        schema_editor.remove_index(Photo, index, **concurrently)
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('photographers', '0008_photo_counts'),
+        ('photos', '0009_photo_facet_counts'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddField(
+                    model_name='photo',
+                    name='aspect_ratio',
+                    field=models.GeneratedField(db_persist=True, expression=models.Case(models.When(height__gt=0, then=django.db.models.expressions.CombinedExpression(django.db.models.functions.comparison.Cast('width', models.FloatField()), '/', models.F('height'))), default=None, output_field=models.FloatField()), output_field=models.FloatField()),
+                ),
+                migrations.AddField(
+                    model_name='photo',
+                    name='megapixels',
+                    field=models.GeneratedField(db_persist=True, expression=models.ExpressionWrapper(django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(django.db.models.functions.comparison.Cast('width', models.FloatField()), '*', models.F('height')), '/', models.Value(1000000.0)), output_field=models.FloatField()), output_field=models.FloatField()),
+                ),
+                migrations.AddField(
+                    model_name='photo',
+                    name='orientation',
+                    field=models.GeneratedField(db_persist=True, expression=models.Case(models.When(then=models.Value('landscape'), width__gt=models.F('height')), models.When(then=models.Value('portrait'), width__lt=models.F('height')), default=models.Value('square')), output_field=models.CharField(choices=[('landscape', 'Landscape'), ('portrait', 'Portrait'), ('square', 'Square')], max_length=9)),
+                ),
+            ],
+        ),
+        migrations.RunPython(add_dimension_columns, remove_dimension_columns),
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddIndex(model_name='photo', index=index) for index in INDEXES
+            ],
+        ),
+        migrations.RunPython(add_dimension_indexes, remove_dimension_indexes),
+    ]
@@ -1,6 +1,21 @@
 from django.db import models
+from django.db.models.functions import Cast
 from django.conf import settings
 import uuid
+from .colors import color_channels
+from .variants import VARIANT_FIELDS, VariantURLField, expand, match_template
+
+ORIENTATIONS = [('landscape', 'Landscape'), ('portrait', 'Portrait'), ('square', 'Square')]
+
+def orientation_expression():
+	"""
+	SQL counterpart of Photo.orientation_of().
+	"""
+	return models.Case(
+		models.When(width__gt=models.F('height'), then=models.Value('landscape')),
+		models.When(width__lt=models.F('height'), then=models.Value('portrait')),
+		default=models.Value('square'),
+	)
 
 class Photo(models.Model):
 	"""
@@ -8,19 +23,29 @@ class Photo(models.Model):
 	Stores image metadata, photographer, owner, and timestamps.
 	"""
 	id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+	pexels_id = models.BigIntegerField(null=True, blank=True, unique=True)
 	width = models.IntegerField()
 	height = models.IntegerField()
-	url = models.URLField()
+	url = models.URLField(db_index=True)
 	photographer = models.ForeignKey('photographers.Photographer', on_delete=models.RESTRICT)
 	avg_color = models.CharField(max_length=20)
+	# Decoded from avg_color on save, for nearest-color search.
+	color_r = models.PositiveSmallIntegerField(null=True, blank=True, editable=False)
+	color_g = models.PositiveSmallIntegerField(null=True, blank=True, editable=False)
+	color_b = models.PositiveSmallIntegerField(null=True, blank=True, editable=False)
+	lab_l = models.FloatField(null=True, blank=True, editable=False)
+	lab_a = models.FloatField(null=True, blank=True, editable=False)
+	lab_b = models.FloatField(null=True, blank=True, editable=False)
 	src_original = models.URLField()
-	src_large2x = models.URLField()
-	src_large = models.URLField()
-	src_medium = models.URLField()
-	src_small = models.URLField()
-	src_portrait = models.URLField()
-	src_landscape = models.URLField()
-	src_tiny = models.URLField()
+	# Derived from src_original; stored as '' when src_template rebuilds them.
+	src_large2x = VariantURLField()
+	src_large = VariantURLField()
+	src_medium = VariantURLField()
+	src_small = VariantURLField()
+	src_portrait = VariantURLField()
+	src_landscape = VariantURLField()
+	src_tiny = VariantURLField()
+	src_template = models.PositiveSmallIntegerField(null=True, blank=True, editable=False)
 	alt = models.TextField()
 	owner = models.ForeignKey(
 		settings.AUTH_USER_MODEL,
@@ -29,18 +54,172 @@ class Photo(models.Model):
 		on_delete=models.SET_NULL,
 		related_name='photos',
 	)
+	# Computed by the database from width and height (NULL aspect ratio for a zero height).
+	aspect_ratio = models.GeneratedField(
+		expression=models.Case(
+			models.When(height__gt=0, then=Cast('width', models.FloatField()) / models.F('height')),
+			default=None,
+			output_field=models.FloatField(),
+		),
+		output_field=models.FloatField(),
+		db_persist=True,
+	)
+	orientation = models.GeneratedField(
+		expression=orientation_expression(),
+		output_field=models.CharField(max_length=9, choices=ORIENTATIONS),
+		db_persist=True,
+	)
+	megapixels = models.GeneratedField(
+		expression=models.ExpressionWrapper(
+			Cast('width', models.FloatField()) * models.F('height') / models.Value(1000000.0),
+			output_field=models.FloatField(),
+		),
+		output_field=models.FloatField(),
+		db_persist=True,
+	)
+	source_hash = models.CharField(max_length=40, blank=True, default='', editable=False)
 	created_at = models.DateTimeField(auto_now_add=True)
 	updated_at = models.DateTimeField(auto_now=True)
 
 	class Meta:
 		indexes = [
-			models.Index(fields=['created_at']),
+			models.Index(fields=['created_at', 'id']),
+			models.Index(fields=['width', 'id']),
+			models.Index(fields=['height', 'id']),
+			models.Index(fields=['photographer', 'created_at', 'id']),
 			models.Index(fields=['owner']),
 			models.Index(fields=['avg_color']),
+			models.Index(fields=['lab_l', 'lab_a', 'lab_b']),
+			models.Index(fields=['orientation', 'created_at', 'id']),
+			models.Index(fields=['orientation', 'width', 'id']),
+			models.Index(fields=['aspect_ratio', 'id']),
+			models.Index(fields=['megapixels', 'id']),
 		]
 
+	# Columns the database computes from width and height.
+	GENERATED_FIELDS = ['aspect_ratio', 'orientation', 'megapixels']
+	# Fields computed from other fields by populate_derived_fields().
+	DERIVED_FIELDS = ['color_r', 'color_g', 'color_b', 'lab_l', 'lab_a', 'lab_b', 'src_template']
+	# Fields whose values before a save are remembered in `loaded_values`, for
+	# the facet rollup and the photographer counters (attribute names).
+	TRACKED_FIELDS = ['avg_color', 'photographer_id', 'width', 'height']
+
+	@classmethod
+	def from_db(cls, db, field_names, values):
+		"""
+		Rebuild the variant URLs of compacted rows as they are loaded.
+		"""
+		instance = super().from_db(db, field_names, values)
+		instance.expand_variants()
+		if all(name in instance.__dict__ for name in cls.TRACKED_FIELDS):
+			instance.loaded_values = instance.get_tracked_values()
+		return instance
+
+	def expand_variants(self):
+		"""
+		Set the loaded variant fields from src_original and src_template.
+		"""
+		loaded = self.__dict__
+		if loaded.get('src_template') is None or 'src_original' not in loaded:
+			return
+		for name, url in expand(self.src_original, self.src_template).items():
+			if name in loaded:
+				setattr(self, name, url)
+
+	def populate_derived_fields(self):
+		"""
+		Compute the derived color channels from avg_color and the variant
+		template of the src_* URLs (when compact storage is enabled).
+		Called on save and by bulk write paths that bypass save().
+		"""
+		for name, value in color_channels(self.avg_color).items():
+			setattr(self, name, value)
+		self.src_template = self.get_src_template()
+
+	def get_src_template(self):
+		"""
+		Id of the variant template matching the src_* URLs, or None.
+		"""
+		if not settings.PHOTO_SRC_COMPACT:
+			return None
+		return match_template(self.src_original, {name: getattr(self, name) for name in VARIANT_FIELDS})
+
+	@staticmethod
+	def orientation_of(width, height):
+		"""
+		'landscape', 'portrait' or 'square'.
+		"""
+		if width > height:
+			return 'landscape'
+		return 'portrait' if width < height else 'square'
+
+	@classmethod
+	def facet_values_of(cls, avg_color, photographer_id, width, height):
+		"""
+		Value of each facet dimension (see photos.facets) for TRACKED_FIELDS values.
+		"""
+		return {
+			'avg_color': avg_color,
+			'photographer': str(photographer_id),
+			'orientation': cls.orientation_of(width, height),
+		}
+
+	def get_facet_values(self):
+		"""
+		Value of each facet dimension for this photo.
+		"""
+		return self.facet_values_of(**self.get_tracked_values())
+
+	def get_tracked_values(self):
+		return {name: getattr(self, name) for name in self.TRACKED_FIELDS}
+
+	def save(self, *args, **kwargs):
+		"""
+		Keep derived fields in sync with the fields they are computed from.
+		The post_save receivers maintaining the facet rollup and photographer
+		counters see the previous TRACKED_FIELDS values in `loaded_values`.
+		"""
+		self.populate_derived_fields()
+		update_fields = kwargs.get('update_fields')
+		if update_fields is not None:
+			kwargs['update_fields'] = {*update_fields, *self.DERIVED_FIELDS}
+		if not self._state.adding and not hasattr(self, 'loaded_values'):
+			self.loaded_values = Photo.objects.filter(pk=self.pk).values(*self.TRACKED_FIELDS).first()
+		previous = None if self._state.adding else self.loaded_values
+		super().save(*args, **kwargs)
+		self.loaded_values = self.get_tracked_values()
+		if previous and (previous['width'], previous['height']) != (self.width, self.height):
+			# Inserts return the generated columns; updates leave them stale, so
+			# they are reloaded on access.
+			for name in self.GENERATED_FIELDS:
+				self.__dict__.pop(name, None)
+
 	def __str__(self):
 		"""
 		String representation of Photo.
 		"""
 		return f"Photo {self.id}: {self.alt}"
+
+
+class PhotoFacetCount(models.Model):
+	"""
+	Rollup of the number of photos per facet value, kept current by the
+	photo write paths (see photos.facets).
+	"""
+	dimension = models.CharField(max_length=20)
+	value = models.CharField(max_length=64)
+	count = models.IntegerField(default=0)
+
+	class Meta:
+		constraints = [
+			models.UniqueConstraint(fields=['dimension', 'value'], name='photos_facet_dimension_value_uniq'),
+		]
+		indexes = [
+			models.Index(fields=['dimension', '-count'], name='photos_facet_dimension_count'),
+		]
+
+	def __str__(self):
+		"""
+		String representation of PhotoFacetCount.
+		"""
+		return f"{self.dimension}={self.value}: {self.count}"
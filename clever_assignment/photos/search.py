@@ -0,0 +1,153 @@
+"""
+Full-text search over photos.
+
+Each photo has a search document made of its alt text and its photographer's
+name, maintained by database triggers so it stays current for every write
+path (ORM saves, bulk_create imports, queryset updates, photographer renames):
+
+- PostgreSQL: a weighted `search_vector` tsvector column with a GIN index,
+  created by migration 0006_photo_search_vector.
+- SQLite (tests and local development): an FTS5 table, installed after
+  migrations by `install_sqlite_search` because SQLite drops triggers when
+  Django rebuilds a table during later migrations (and refuses to rebuild a
+  table other triggers reference, so they are dropped before migrating).
+"""
+import re
+
+from django.db import connections
+from django.db.models import BooleanField, FloatField
+from django.db.models.expressions import RawSQL
+from rest_framework.filters import SearchFilter
+
+SQLITE_FTS_TABLE = 'photos_photo_fts'
+
+SQLITE_SEARCH_SQL = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {SQLITE_FTS_TABLE}
+    USING fts5(photo_id UNINDEXED, alt, photographer_name, tokenize='porter unicode61')
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS photos_photo_fts_insert AFTER INSERT ON photos_photo BEGIN
+        INSERT INTO photos_photo_fts (photo_id, alt, photographer_name)
+        VALUES (new.id, new.alt, (SELECT name FROM photographers_photographer WHERE id = new.photographer_id));
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS photos_photo_fts_update AFTER UPDATE OF alt, photographer_id ON photos_photo BEGIN
+        UPDATE photos_photo_fts
+        SET alt = new.alt,
+            photographer_name = (SELECT name FROM photographers_photographer WHERE id = new.photographer_id)
+        WHERE photo_id = new.id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS photos_photo_fts_delete AFTER DELETE ON photos_photo BEGIN
+        DELETE FROM photos_photo_fts WHERE photo_id = old.id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS photographers_photographer_fts_update
+    AFTER UPDATE OF name ON photographers_photographer BEGIN
+        UPDATE photos_photo_fts SET photographer_name = new.name
+        WHERE photo_id IN (SELECT id FROM photos_photo WHERE photographer_id = new.id);
+    END
+    """,
+    f'DELETE FROM {SQLITE_FTS_TABLE}',
+    f"""
+    INSERT INTO {SQLITE_FTS_TABLE} (photo_id, alt, photographer_name)
+    SELECT photo.id, photo.alt, photographer.name
+    FROM photos_photo photo
+    JOIN photographers_photographer photographer ON photographer.id = photo.photographer_id
+    """,
+]
+
+
+SQLITE_TRIGGERS = [
+    'photos_photo_fts_insert',
+    'photos_photo_fts_update',
+    'photos_photo_fts_delete',
+    'photographers_photographer_fts_update',
+]
+
+
+def uninstall_sqlite_search(sender, using, **kwargs):
+    """
+    pre_migrate handler: drop the FTS triggers, which reference
+    photographers_photographer and would make SQLite refuse to rebuild that
+    table during a migration. install_sqlite_search recreates them.
+    """
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for trigger in SQLITE_TRIGGERS:
+            cursor.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+
+
+def install_sqlite_search(sender, using, **kwargs):
+    """
+    post_migrate handler: (re)create the SQLite FTS5 table and its triggers,
+    then rebuild the index from the current rows.
+    """
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for statement in SQLITE_SEARCH_SQL:
+            cursor.execute(statement)
+
+
+def search_tokens(terms):
+    """
+    Reduce free text to word tokens, which are safe to splice into tsquery and
+    FTS5 query syntax.
+    """
+    return re.findall(r'\w+', ' '.join(terms))
+
+
+class PhotoSearchFilter(SearchFilter):
+    """
+    Ranked full-text search over the maintained photo search document.
+    All words must match; the last word also matches as a prefix so the
+    filter works while the user is typing. Matching photos are annotated with
+    `search_rank` (higher is more relevant), which PhotoOrderingFilter uses as
+    the default ordering.
+    """
+    search_description = 'Full-text search over the alt text and photographer name.'
+
+    def filter_queryset(self, request, queryset, view):
+        """
+        Filter by the search parameter and annotate the relevance rank.
+        """
+        tokens = search_tokens(self.get_search_terms(request))
+        if not tokens:
+            return queryset
+        if connections[queryset.db].vendor == 'postgresql':
+            return self.filter_postgresql(queryset, tokens)
+        return self.filter_sqlite(queryset, tokens)
+
+    @staticmethod
+    def filter_postgresql(queryset, tokens):
+        query = ' & '.join(tokens[:-1] + [f'{tokens[-1]}:*'])
+        tsquery = "to_tsquery('english', %s)"
+        return queryset.filter(
+            RawSQL(f'photos_photo.search_vector @@ {tsquery}', (query,), output_field=BooleanField()),
+        ).annotate(
+            search_rank=RawSQL(f'ts_rank_cd(photos_photo.search_vector, {tsquery})', (query,), output_field=FloatField()),
+        )
+
+    @staticmethod
+    def filter_sqlite(queryset, tokens):
+        query = ' '.join([f'"{token}"' for token in tokens[:-1]] + [f'"{tokens[-1]}"*'])
+        return queryset.filter(
+            RawSQL(
+                f'photos_photo.id IN (SELECT photo_id FROM {SQLITE_FTS_TABLE} WHERE {SQLITE_FTS_TABLE} MATCH %s)',
+                (query,), output_field=BooleanField(),
+            ),
+        ).annotate(
+            search_rank=RawSQL(
+                f'(SELECT -bm25({SQLITE_FTS_TABLE}) FROM {SQLITE_FTS_TABLE} '
+                f'WHERE {SQLITE_FTS_TABLE} MATCH %s AND photo_id = photos_photo.id)',
+                (query,), output_field=FloatField(),
+            ),
+        )
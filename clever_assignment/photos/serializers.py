@@ -1,6 +1,8 @@
 from rest_framework import serializers
+from .facets import DIMENSIONS
 from .models import Photo
 from clever_assignment.photographers.models import Photographer
+from clever_assignment.photographers.resolution import resolver
 
 class PhotoSerializer(serializers.ModelSerializer):
     """
@@ -17,14 +19,14 @@ class PhotoSerializer(serializers.ModelSerializer):
     class Meta:
         model = Photo
         fields = [
-            'id', 'width', 'height', 'url', 'photographer', 'avg_color',
+            'id', 'width', 'height', 'aspect_ratio', 'orientation', 'megapixels', 'url', 'photographer', 'avg_color',
             'src_original', 'src_large2x', 'src_large', 'src_medium', 'src_small',
             'src_portrait', 'src_landscape', 'src_tiny', 'alt', 'owner',
             'photographer_name', 'photographer_url',
             'new_photographer_name', 'new_photographer_url',
             'created_at', 'updated_at',
         ]
-        read_only_fields = ['id', 'owner', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'aspect_ratio', 'orientation', 'megapixels', 'owner', 'created_at', 'updated_at']
 
     def validate(self, data):
         """
@@ -48,10 +50,7 @@ class PhotoSerializer(serializers.ModelSerializer):
         new_url = validated_data.pop('new_photographer_url', None)
 
         if new_name and new_url:
-            photographer, _ = Photographer.objects.get_or_create(
-                name=new_name, url=new_url,
-            )
-            instance.photographer = photographer
+            instance.photographer_id = resolver.resolve(new_name, new_url)
 
         return super().update(instance, validated_data)
 
@@ -60,12 +59,78 @@ class PhotoSerializer(serializers.ModelSerializer):
         new_url = validated_data.pop('new_photographer_url', None)
 
         if new_name and new_url and 'photographer' not in validated_data:
-            photographer, _ = Photographer.objects.get_or_create(
-                name=new_name, url=new_url,
-            )
-            validated_data['photographer'] = photographer
+            validated_data['photographer_id'] = resolver.resolve(new_name, new_url)
 
         request = self.context.get('request')
         if request and hasattr(request, 'user'):
             validated_data['owner'] = request.user
         return super().create(validated_data)
+
+
+class PhotoBulkItemSerializer(PhotoSerializer):
+    """
+    Validates one item of a bulk create without touching the database:
+    the photographer is checked as a UUID here and resolved for the whole
+    batch at once by `clever_assignment.photos.bulk.create_photos`.
+    """
+    photographer = serializers.UUIDField(required=False)
+
+
+class PhotoBulkChangesSerializer(PhotoSerializer):
+    """
+    Field changes applied by a bulk update (validated with partial=True). As with a
+    regular update, the photographer can only be changed through
+    `new_photographer_name`/`new_photographer_url`.
+    """
+    def validate(self, data):
+        data.pop('photographer', None)
+        if bool(data.get('new_photographer_name')) != bool(data.get('new_photographer_url')):
+            raise serializers.ValidationError(
+                'Provide both "new_photographer_name" and "new_photographer_url" to change the photographer.'
+            )
+        if not data:
+            raise serializers.ValidationError('No updatable fields provided.')
+        return data
+
+
+class PhotoBulkSelectionSerializer(serializers.Serializer):
+    """
+    Selects the photos a bulk update or delete applies to: either an explicit
+    `ids` list or `filters` for the photo list filterset.
+    """
+    ids = serializers.ListField(child=serializers.UUIDField(), required=False, allow_empty=False)
+    filters = serializers.DictField(required=False, allow_empty=False)
+    dry_run = serializers.BooleanField(default=False)
+
+    def validate(self, data):
+        if ('ids' in data) == ('filters' in data):
+            raise serializers.ValidationError('Provide exactly one of "ids" or "filters".')
+        return data
+
+
+class PhotoBulkUpdateSerializer(PhotoBulkSelectionSerializer):
+    """
+    Bulk update request: a selection plus the field changes in `data`.
+    """
+    data = serializers.DictField()
+
+    def validate_data(self, value):
+        changes = PhotoBulkChangesSerializer(data=value, partial=True)
+        changes.is_valid(raise_exception=True)
+        return changes.validated_data
+
+
+class PhotoFacetQuerySerializer(serializers.Serializer):
+    """
+    Query parameters of the facets endpoint: comma-separated `dimensions`
+    (default all) and the number of values returned per dimension.
+    """
+    dimensions = serializers.CharField(required=False, default=','.join(DIMENSIONS))
+    limit = serializers.IntegerField(required=False, default=20, min_value=1, max_value=500)
+
+    def validate_dimensions(self, value):
+        dimensions = list(dict.fromkeys(name.strip() for name in value.split(',') if name.strip()))
+        unknown = [name for name in dimensions if name not in DIMENSIONS]
+        if unknown or not dimensions:
+            raise serializers.ValidationError(f'Choose from: {", ".join(DIMENSIONS)}.')
+        return dimensions
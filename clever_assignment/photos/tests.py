@@ -1,9 +1,22 @@
-from django.test import TestCase
+import csv
+import io
+import json
+from io import StringIO
+from unittest import mock, skipUnless
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import DatabaseError, connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from rest_framework.test import APIClient
 from rest_framework import status
 from clever_assignment.users.models import User
 from clever_assignment.photographers.models import Photographer
-from clever_assignment.photos.models import Photo
+from clever_assignment.photos.bulk import update_photos
+from clever_assignment.photos.facets import DIMENSIONS, grouped_counts, grouping_sets_counts, union_counts
+from clever_assignment.photos.models import Photo, PhotoFacetCount
+from clever_assignment.photos.export import NDJSONRenderer, pyarrow
+from clever_assignment.photos.variants import VARIANT_FIELDS, expand
 
 def make_photo_data(photographer, **overrides):
 	data = {
@@ -288,6 +301,60 @@ class PhotoFilterTests(TestCase):
 		self.assertEqual(resp.data['count'], 1)
 		self.assertEqual(resp.data['results'][0]['id'], str(self.photo2.id))
 
+	def test_color_channels_populated_on_save(self):
+		self.assertEqual((self.photo1.color_r, self.photo1.color_g, self.photo1.color_b), (17, 17, 17))
+		self.assertAlmostEqual(self.photo1.lab_a, 0, places=2)
+		self.photo1.avg_color = '#ffffff'
+		self.photo1.save(update_fields=['avg_color'])
+		self.photo1.refresh_from_db()
+		self.assertAlmostEqual(self.photo1.lab_l, 100, places=1)
+
+	def test_filter_by_nearest_color(self):
+		resp = self.client.get('/api/v1/photos/?color=%23191919&tolerance=20')
+		ids = [r['id'] for r in resp.data['results']]
+		self.assertEqual(ids, [str(self.photo1.id), str(self.photo2.id)])
+		resp = self.client.get('/api/v1/photos/?color=%23222222&tolerance=20')
+		ids = [r['id'] for r in resp.data['results']]
+		self.assertEqual(ids, [str(self.photo2.id), str(self.photo1.id)])
+
+	def test_filter_by_color_tolerance(self):
+		resp = self.client.get('/api/v1/photos/?color=%23111111&tolerance=1')
+		self.assertEqual(resp.data['count'], 1)
+		self.assertEqual(resp.data['results'][0]['id'], str(self.photo1.id))
+
+	def test_filter_by_invalid_color(self):
+		resp = self.client.get('/api/v1/photos/?color=blue')
+		self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
+
+	def test_generated_dimension_columns(self):
+		self.assertEqual((self.photo2.aspect_ratio, self.photo2.orientation), (30.0, 'landscape'))
+		self.assertAlmostEqual(self.photo2.megapixels, 0.3)
+		self.photo2.height = 6000
+		self.photo2.save()
+		self.assertEqual((self.photo2.aspect_ratio, self.photo2.orientation), (0.5, 'portrait'))
+		Photo.objects.filter(pk=self.photo1.pk).update(height=0)
+		self.photo1.refresh_from_db()
+		self.assertEqual((self.photo1.aspect_ratio, self.photo1.orientation), (None, 'landscape'))
+
+	def test_filter_by_dimensions(self):
+		resp = self.client.get('/api/v1/photos/?orientation=landscape&min_width=2000')
+		self.assertEqual([r['id'] for r in resp.data['results']], [str(self.photo2.id)])
+		self.assertEqual(resp.data['results'][0]['orientation'], 'landscape')
+		resp = self.client.get('/api/v1/photos/?max_width=2000&max_height=100&max_megapixels=0.1')
+		self.assertEqual([r['id'] for r in resp.data['results']], [str(self.photo1.id)])
+		resp = self.client.get('/api/v1/photos/?orientation=panorama')
+		self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
+
+	def test_filter_by_aspect_ratio(self):
+		resp = self.client.get('/api/v1/photos/?aspect_ratio=1:1')
+		self.assertEqual([r['id'] for r in resp.data['results']], [str(self.photo1.id)])
+		resp = self.client.get('/api/v1/photos/?aspect_ratio=29&aspect_ratio_tolerance=1.5')
+		self.assertEqual([r['id'] for r in resp.data['results']], [str(self.photo2.id)])
+		resp = self.client.get('/api/v1/photos/?aspect_ratio=29/1')
+		self.assertEqual(resp.data['count'], 0)
+		resp = self.client.get('/api/v1/photos/?aspect_ratio=4:0')
+		self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
+
 	def test_search_by_alt(self):
 		resp = self.client.get('/api/v1/photos/?search=sunset')
 		self.assertEqual(resp.data['count'], 1)
@@ -306,3 +373,532 @@ class PhotoFilterTests(TestCase):
 		resp = self.client.get('/api/v1/photos/?ordering=created_at')
 		ids = [r['id'] for r in resp.data['results']]
 		self.assertEqual(ids, [str(self.photo1.id), str(self.photo2.id)])
+
+class PhotoCursorPaginationTests(TestCase):
+	def setUp(self):
+		self.client = APIClient()
+		self.photographer = Photographer.objects.create(name='Jane', url='https://example.com/jane')
+		self.other = Photographer.objects.create(name='Other', url='https://example.com/other')
+		for i in range(45):
+			Photo.objects.create(
+				**{k: v for k, v in make_photo_data(self.photographer).items() if k not in ('photographer', 'width')},
+				width=100 + i % 3,
+				photographer=self.photographer if i % 5 else self.other,
+			)
+
+	def _walk(self, url):
+		ids, pages = [], 0
+		while url:
+			resp = self.client.get(url)
+			self.assertEqual(resp.status_code, status.HTTP_200_OK)
+			self.assertNotIn('count', resp.data)
+			ids.extend(r['id'] for r in resp.data['results'])
+			url = resp.data['next']
+			pages += 1
+		return ids, pages
+
+	def test_cursor_walks_every_photo_once(self):
+		ids, pages = self._walk('/api/v1/photos/?cursor=')
+		self.assertEqual(pages, 3)
+		self.assertEqual(len(ids), 45)
+		expected = [str(pk) for pk in Photo.objects.order_by('created_at', 'id').values_list('id', flat=True)]
+		self.assertEqual(ids, expected)
+
+	def test_cursor_with_duplicate_ordering_values(self):
+		ids, _ = self._walk('/api/v1/photos/?cursor=&ordering=-width')
+		expected = [str(pk) for pk in Photo.objects.order_by('-width', '-id').values_list('id', flat=True)]
+		self.assertEqual(ids, expected)
+
+	def test_cursor_with_filter(self):
+		ids, _ = self._walk(f'/api/v1/photos/?cursor=&photographer={self.other.id}&ordering=-created_at')
+		self.assertEqual(len(ids), 9)
+		self.assertEqual(set(ids), {str(pk) for pk in Photo.objects.filter(photographer=self.other).values_list('id', flat=True)})
+
+	def test_previous_link_returns_prior_page(self):
+		first = self.client.get('/api/v1/photos/?cursor=&ordering=height')
+		second = self.client.get(first.data['next'])
+		back = self.client.get(second.data['previous'])
+		self.assertEqual([r['id'] for r in back.data['results']], [r['id'] for r in first.data['results']])
+		self.assertIsNone(back.data['previous'])
+
+	def test_cursor_from_other_ordering_is_rejected(self):
+		first = self.client.get('/api/v1/photos/?cursor=&ordering=width')
+		resp = self.client.get(first.data['next'].replace('ordering=width', 'ordering=height'))
+		self.assertEqual(resp.status_code, status.HTTP_404_NOT_FOUND)
+
+	def test_invalid_cursor(self):
+		resp = self.client.get('/api/v1/photos/?cursor=not-a-cursor')
+		self.assertEqual(resp.status_code, status.HTTP_404_NOT_FOUND)
+
+class PhotoFullTextSearchTests(TestCase):
+	def setUp(self):
+		self.client = APIClient()
+		self.photographer = Photographer.objects.create(name='Maria Lake', url='https://example.com/maria')
+		base = {k: v for k, v in make_photo_data(self.photographer).items() if k not in ('photographer', 'alt')}
+		self.lake = Photo.objects.create(**base, photographer=self.photographer, alt='Lake at dawn, a quiet lake')
+		self.forest = Photo.objects.create(**base, photographer=self.photographer, alt='Forest trail')
+		other = Photographer.objects.create(name='Sam', url='https://example.com/sam')
+		self.sea = Photo.objects.create(**base, photographer=other, alt='Stormy sea')
+
+	def _ids(self, query):
+		resp = self.client.get(f'/api/v1/photos/?{query}')
+		self.assertEqual(resp.status_code, status.HTTP_200_OK)
+		return [r['id'] for r in resp.data['results']]
+
+	def test_results_are_ranked_by_relevance(self):
+		self.assertEqual(self._ids('search=lake'), [str(self.lake.id), str(self.forest.id)])
+
+	def test_all_words_must_match(self):
+		self.assertEqual(self._ids('search=forest maria'), [str(self.forest.id)])
+		self.assertEqual(self._ids('search=forest sam'), [])
+
+	def test_last_word_matches_as_prefix(self):
+		self.assertEqual(self._ids('search=stor'), [str(self.sea.id)])
+
+	def test_explicit_ordering_overrides_relevance(self):
+		self.assertEqual(self._ids('search=lake&ordering=-created_at'), [str(self.forest.id), str(self.lake.id)])
+
+	def test_document_follows_photographer_rename(self):
+		self.photographer.name = 'Renamed Person'
+		self.photographer.save()
+		self.assertEqual(self._ids('search=maria'), [])
+		self.assertEqual(len(self._ids('search=renamed')), 2)
+
+	def test_document_follows_queryset_updates(self):
+		Photo.objects.filter(pk=self.sea.pk).update(alt='Calm harbour')
+		self.assertEqual(self._ids('search=harbour'), [str(self.sea.id)])
+		self.assertEqual(self._ids('search=stormy'), [])
+
+	def test_search_with_cursor_pagination(self):
+		resp = self.client.get('/api/v1/photos/?search=lake&cursor=')
+		self.assertEqual([r['id'] for r in resp.data['results']], [str(self.lake.id), str(self.forest.id)])
+
+class PhotoConditionalGetTests(TestCase):
+	def setUp(self):
+		self.client = APIClient()
+		self.photographer = Photographer.objects.create(name='Etag', url='https://example.com/etag')
+		base = {k: v for k, v in make_photo_data(self.photographer).items() if k != 'photographer'}
+		self.photo = Photo.objects.create(**base, photographer=self.photographer)
+
+	def test_list_emits_validators_and_answers_304(self):
+		resp = self.client.get('/api/v1/photos/')
+		self.assertTrue(resp['ETag'].startswith('"'))
+		# MAX(updated_at) does not move on deletes.
+		self.assertNotIn('Last-Modified', resp)
+		# The anon and user throttle buckets, then the validator query.
+		with self.assertNumQueries(3):
+			resp = self.client.get('/api/v1/photos/', HTTP_IF_NONE_MATCH=resp['ETag'])
+		self.assertEqual(resp.status_code, status.HTTP_304_NOT_MODIFIED)
+		self.assertEqual(resp.content, b'')
+
+	def test_list_etag_changes_with_data_and_query(self):
+		etag = self.client.get('/api/v1/photos/')['ETag']
+		self.assertNotEqual(self.client.get('/api/v1/photos/?ordering=-width')['ETag'], etag)
+		self.photographer.name = 'Renamed'
+		self.photographer.save()
+		resp = self.client.get('/api/v1/photos/', HTTP_IF_NONE_MATCH=etag)
+		self.assertEqual(resp.status_code, status.HTTP_200_OK)
+		self.assertNotEqual(resp['ETag'], etag)
+
+	def test_cursor_pages_are_validated_without_aggregates(self):
+		url = '/api/v1/photos/?cursor='
+		etag = self.client.get(url)['ETag']
+		# The throttle buckets, then only the page itself.
+		with CaptureQueriesContext(connection) as queries:
+			resp = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+		self.assertEqual(resp.status_code, status.HTTP_304_NOT_MODIFIED)
+		self.assertEqual(len(queries), 3)
+		self.assertNotIn('COUNT(', queries[-1]['sql'].upper())
+		self.photo.alt = 'Changed'
+		self.photo.save()
+		resp = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+		self.assertEqual(resp.status_code, status.HTTP_200_OK)
+		self.assertEqual(resp.data['results'][0]['alt'], 'Changed')
+
+	def test_retrieve_answers_if_modified_since(self):
+		resp = self.client.get(f'/api/v1/photos/{self.photo.id}/')
+		resp = self.client.get(f'/api/v1/photos/{self.photo.id}/', HTTP_IF_MODIFIED_SINCE=resp['Last-Modified'])
+		self.assertEqual(resp.status_code, status.HTTP_304_NOT_MODIFIED)
+		self.assertIn('ETag', resp)
+
+	def test_retrieve_loads_the_photo_once(self):
+		# The anon and user throttle buckets, then the photo.
+		with self.assertNumQueries(3):
+			resp = self.client.get(f'/api/v1/photos/{self.photo.id}/')
+		self.assertEqual(resp.status_code, status.HTTP_200_OK)
+
+	@override_settings(RESPONSE_CACHE_TIMEOUT=300)
+	def test_cache_hits_answer_304_without_validator_queries(self):
+		cache.clear()
+		etag = self.client.get('/api/v1/photos/')['ETag']
+		# Only the throttle buckets.
+		with self.assertNumQueries(2):
+			resp = self.client.get('/api/v1/photos/', HTTP_IF_NONE_MATCH=etag)
+		self.assertEqual(resp.status_code, status.HTTP_304_NOT_MODIFIED)
+		with self.assertNumQueries(2):
+			resp = self.client.get('/api/v1/photos/')
+		self.assertEqual(resp['X-Cache'], 'HIT')
+		self.assertEqual(resp['ETag'], etag)
+
+	def test_retrieve_etag_changes_on_update(self):
+		etag = self.client.get(f'/api/v1/photos/{self.photo.id}/')['ETag']
+		self.photo.alt = 'Changed'
+		self.photo.save()
+		resp = self.client.get(f'/api/v1/photos/{self.photo.id}/', HTTP_IF_NONE_MATCH=etag)
+		self.assertEqual(resp.status_code, status.HTTP_200_OK)
+		self.assertEqual(resp.data['alt'], 'Changed')
+
+class PhotoBulkCreateTests(TestCase):
+	def setUp(self):
+		self.client = APIClient()
+		self.user = User.objects.create_user(email='bulk@example.com', password='testpass123')
+		self.photographer = Photographer.objects.create(name='Jane', url='https://example.com/jane')
+		self.client.force_authenticate(user=self.user)
+
+	def test_bulk_create_resolves_photographers_in_constant_queries(self):
+		new = {'new_photographer_name': 'New', 'new_photographer_url': 'https://example.com/new'}
+		items = [make_photo_data(self.photographer, url=f'https://example.com/{i}.jpg') for i in range(10)]
+		for i in range(10):
+			item = make_photo_data(self.photographer, url=f'https://example.com/n{i}.jpg', **new)
+			del item['photographer']
+			items.append(item)
+		# Throttles, photographer resolution, the insert, one facet rollup upsert
+		# and one photographer counter update.
+		with self.assertNumQueries(8):
+			resp = self.client.post('/api/v1/photos/bulk/', items, format='json')
+		self.assertEqual(resp.status_code, status.HTTP_201_CREATED)
+		self.assertEqual(resp.data['created'], 20)
+		self.assertEqual(Photo.objects.filter(owner=self.user).count(), 20)
+		self.assertEqual(Photographer.objects.filter(name='New').count(), 1)
+		self.assertEqual(resp.data['results'][15]['data']['photographer_name'], 'New')
+
+	def test_bulk_create_reports_per_item_errors(self):
+		missing = str(Photographer(name='x', url='https://example.com/x').id)
+		items = [
+			make_photo_data(self.photographer),
+			make_photo_data(self.photographer, width='wide'),
+			{**make_photo_data(self.photographer), 'photographer': missing},
+		]
+		resp = self.client.post('/api/v1/photos/bulk/', items, format='json')
+		self.assertEqual(resp.status_code, status.HTTP_207_MULTI_STATUS)
+		self.assertEqual([r['status'] for r in resp.data['results']], [201, 400, 400])
+		self.assertIn('width', resp.data['results'][1]['errors'])
+		self.assertIn('photographer', resp.data['results'][2]['errors'])
+		self.assertEqual(Photo.objects.count(), 1)
+
+	def test_bulk_create_rejects_invalid_payloads(self):
+		resp = self.client.post('/api/v1/photos/bulk/', {'alt': 'not a list'}, format='json')
+		self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
+		resp = self.client.post('/api/v1/photos/bulk/', [{'alt': 'incomplete'}], format='json')
+		self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
+		self.assertEqual(resp.data['failed'], 1)
+
+	def test_bulk_create_requires_authentication(self):
+		self.client.force_authenticate(user=None)
+		resp = self.client.post('/api/v1/photos/bulk/', [make_photo_data(self.photographer)], format='json')
+		self.assertEqual(resp.status_code, status.HTTP_401_UNAUTHORIZED)
+
+class PhotoBulkUpdateDeleteTests(TestCase):
+	def setUp(self):
+		self.client = APIClient()
+		self.user = User.objects.create_user(email='bulkowner@example.com', password='testpass123')
+		self.other = User.objects.create_user(email='bulkother@example.com', password='testpass123')
+		self.photographer = Photographer.objects.create(name='Jane', url='https://example.com/jane')
+		base = {k: v for k, v in make_photo_data(self.photographer).items() if k != 'photographer'}
+		self.mine = [Photo.objects.create(**base, photographer=self.photographer, owner=self.user) for _ in range(3)]
+		self.theirs = Photo.objects.create(**base, photographer=self.photographer, owner=self.other)
+		self.client.force_authenticate(user=self.user)
+
+	def test_bulk_update_by_ids_only_touches_owned_photos(self):
+		ids = [str(p.id) for p in self.mine[:2]] + [str(self.theirs.id)]
+		resp = self.client.patch(
+			'/api/v1/photos/bulk/', {'ids': ids, 'data': {'alt': 'Retagged', 'avg_color': '#ffffff'}}, format='json',
+		)
+		self.assertEqual(resp.status_code, status.HTTP_200_OK)
+		self.assertEqual(resp.data, {'matched': 3, 'updated': 2, 'not_permitted': 1, 'dry_run': False})
+		self.assertEqual(Photo.objects.filter(alt='Retagged').count(), 2)
+		self.assertAlmostEqual(Photo.objects.get(pk=self.mine[0].pk).lab_l, 100, places=1)
+		self.theirs.refresh_from_db()
+		self.assertEqual(self.theirs.alt, 'A test photo')
+
+	def test_bulk_update_by_filters_moves_photographer(self):
+		resp = self.client.patch('/api/v1/photos/bulk/', {
+			'filters': {'photographer': str(self.photographer.id)},
+			'data': {'new_photographer_name': 'Moved', 'new_photographer_url': 'https://example.com/moved'},
+		}, format='json')
+		self.assertEqual(resp.data['updated'], 3)
+		self.assertEqual(Photo.objects.filter(photographer__name='Moved').count(), 3)
+
+	def test_bulk_update_rolls_back_batch_when_src_write_fails(self):
+		photos = Photo.objects.filter(pk=self.mine[0].pk)
+		changes = {'alt': 'Half written', 'src_original': 'https://images.example.com/new.jpg'}
+		with mock.patch('clever_assignment.photos.bulk.update_src_fields', side_effect=DatabaseError):
+			with self.assertRaises(DatabaseError):
+				update_photos(photos, changes)
+		self.assertEqual(photos.get().alt, 'A test photo')
+
+	def test_bulk_delete_dry_run_and_delete(self):
+		body = {'filters': {'photographer': str(self.photographer.id)}, 'dry_run': True}
+		resp = self.client.delete('/api/v1/photos/bulk/', body, format='json')
+		self.assertEqual(resp.data, {'matched': 4, 'deleted': 3, 'not_permitted': 1, 'dry_run': True})
+		self.assertEqual(Photo.objects.count(), 4)
+		body['dry_run'] = False
+		resp = self.client.delete('/api/v1/photos/bulk/', body, format='json')
+		self.assertEqual(resp.data['deleted'], 3)
+		self.assertEqual(list(Photo.objects.values_list('id', flat=True)), [self.theirs.id])
+
+	def test_staff_can_delete_any_photo(self):
+		self.client.force_authenticate(user=User.objects.create_superuser(
+			email='bulkadmin@example.com', password='testpass123',
+		))
+		resp = self.client.delete('/api/v1/photos/bulk/', {'ids': [str(self.theirs.id)]}, format='json')
+		self.assertEqual(resp.data['deleted'], 1)
+
+	def test_bulk_selection_is_validated(self):
+		for body in ({}, {'ids': [str(self.theirs.id)], 'filters': {'owner': str(self.user.id)}},
+				{'filters': {'photographr': str(self.photographer.id)}}):
+			resp = self.client.delete('/api/v1/photos/bulk/', body, format='json')
+			self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
+		resp = self.client.patch('/api/v1/photos/bulk/', {'ids': [str(self.mine[0].id)], 'data': {}}, format='json')
+		self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
+		self.assertEqual(Photo.objects.count(), 4)
+
+class PhotoFacetTests(TestCase):
+	def setUp(self):
+		self.client = APIClient()
+		self.user = User.objects.create_user(email='facets@example.com', password='testpass123')
+		self.jane = Photographer.objects.create(name='Jane', url='https://example.com/jane')
+		self.john = Photographer.objects.create(name='John', url='https://example.com/john')
+		self.client.force_authenticate(user=self.user)
+		for i, (photographer, color, width, alt) in enumerate([
+			(self.jane, '#111111', 1920, 'Lake at dawn'), (self.jane, '#111111', 1920, 'Forest path'),
+			(self.john, '#222222', 800, 'Lake in winter'),
+		]):
+			resp = self.client.post('/api/v1/photos/', make_photo_data(
+				photographer, url=f'https://example.com/f{i}.jpg', avg_color=color, width=width, alt=alt,
+			), format='json')
+			self.assertEqual(resp.status_code, status.HTTP_201_CREATED)
+
+	def assertRollupMatchesTable(self):
+		stored = {
+			(dimension, value): count
+			for dimension, value, count in PhotoFacetCount.objects.filter(count__gt=0).values_list(
+				'dimension', 'value', 'count',
+			)
+		}
+		self.assertEqual(stored, grouped_counts(Photo.objects.all()))
+
+	def facets(self, query=''):
+		resp = self.client.get(f'/api/v1/photos/facets/{query}')
+		self.assertEqual(resp.status_code, status.HTTP_200_OK)
+		return resp.data
+
+	@skipUnless(connection.vendor == 'postgresql', 'GROUPING SETS are only used on PostgreSQL')
+	def test_grouping_sets_match_union_counts(self):
+		queryset = Photo.objects.filter(width__gt=1000)
+		self.assertEqual(
+			sorted(grouping_sets_counts(queryset, list(DIMENSIONS))),
+			sorted(union_counts(queryset, list(DIMENSIONS))),
+		)
+
+	def test_unfiltered_counts_come_from_rollup(self):
+		data = self.facets()
+		self.assertFalse(data['filtered'])
+		self.assertEqual(data['facets']['avg_color'], [{'value': '#111111', 'count': 2}, {'value': '#222222', 'count': 1}])
+		self.assertEqual(data['facets']['orientation'], [{'value': 'landscape', 'count': 2}, {'value': 'portrait', 'count': 1}])
+		self.assertEqual(data['facets']['photographer'][0], {'value': str(self.jane.id), 'count': 2, 'name': 'Jane'})
+		self.assertRollupMatchesTable()
+		# The user throttle bucket, then one rollup query per dimension; none reads the photos.
+		with self.assertNumQueries(3):
+			self.client.get('/api/v1/photos/facets/?dimensions=avg_color,orientation')
+
+	def test_rollup_follows_updates_and_deletes(self):
+		photo = Photo.objects.get(alt='Lake in winter')
+		resp = self.client.patch(f'/api/v1/photos/{photo.id}/', {'width': 2000, 'avg_color': '#111111'}, format='json')
+		self.assertEqual(resp.status_code, status.HTTP_200_OK)
+		photo = Photo.objects.get(alt='Forest path')
+		photo.height = photo.width
+		photo.save()
+		self.assertRollupMatchesTable()
+		self.assertEqual(self.facets('?dimensions=orientation')['facets']['orientation'], [
+			{'value': 'landscape', 'count': 2}, {'value': 'square', 'count': 1},
+		])
+		Photo.objects.filter(alt__startswith='Lake').delete()
+		self.assertRollupMatchesTable()
+		self.assertEqual(self.facets('?dimensions=avg_color')['facets']['avg_color'], [{'value': '#111111', 'count': 1}])
+
+	def test_rollup_follows_bulk_endpoints(self):
+		items = [make_photo_data(self.john, url=f'https://example.com/b{i}.jpg', height=3000) for i in range(3)]
+		self.assertEqual(self.client.post('/api/v1/photos/bulk/', items, format='json').status_code, 201)
+		self.assertRollupMatchesTable()
+		resp = self.client.patch('/api/v1/photos/bulk/', {
+			'filters': {'photographer': str(self.jane.id)},
+			'data': {'avg_color': '#333333', 'new_photographer_name': 'Moved', 'new_photographer_url': 'https://example.com/moved'},
+		}, format='json')
+		self.assertEqual(resp.data['updated'], 2)
+		self.assertRollupMatchesTable()
+		resp = self.client.delete('/api/v1/photos/bulk/', {'filters': {'avg_color': '#123456'}}, format='json')
+		self.assertEqual(resp.data['deleted'], 3)
+		self.assertRollupMatchesTable()
+
+	def test_filters_and_search_aggregate_matching_photos(self):
+		data = self.facets(f'?photographer={self.jane.id}')
+		self.assertTrue(data['filtered'])
+		self.assertEqual(data['facets']['avg_color'], [{'value': '#111111', 'count': 2}])
+		self.assertEqual(data['facets']['photographer'], [{'value': str(self.jane.id), 'count': 2, 'name': 'Jane'}])
+		data = self.facets('?search=lake&dimensions=orientation')
+		self.assertEqual(data['facets'], {'orientation': [{'value': 'landscape', 'count': 1}, {'value': 'portrait', 'count': 1}]})
+		data = self.facets('?color=%23111111&tolerance=1&dimensions=photographer')
+		self.assertEqual(data['facets']['photographer'], [{'value': str(self.jane.id), 'count': 2, 'name': 'Jane'}])
+
+	def test_limit_and_dimensions_are_validated(self):
+		data = self.facets('?dimensions=avg_color&limit=1')
+		self.assertEqual(data['facets'], {'avg_color': [{'value': '#111111', 'count': 2}]})
+		for query in ('?dimensions=size', '?limit=0', '?dimensions=,'):
+			resp = self.client.get(f'/api/v1/photos/facets/{query}')
+			self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
+
+	def test_rebuild_facets_repairs_drift(self):
+		PhotoFacetCount.objects.filter(dimension='avg_color').update(count=0)
+		out = StringIO()
+		call_command('rebuild_facets', stdout=out)
+		self.assertIn('2 were wrong', out.getvalue())
+		self.assertRollupMatchesTable()
+
+class PhotoExportTests(TestCase):
+	def setUp(self):
+		self.client = APIClient()
+		self.jane = Photographer.objects.create(name='Jane', url='https://example.com/jane', pexels_id=7)
+		self.bob = Photographer.objects.create(name='Bob', url='https://example.com/bob')
+		for i, photographer in enumerate([self.jane, self.jane, self.bob]):
+			data = make_photo_data(photographer, url=f'https://example.com/{i}.jpg', alt=f'Photo, "{i}"')
+			del data['photographer']
+			Photo.objects.create(**data, photographer=photographer, pexels_id=100 + i)
+
+	def export(self, query):
+		resp = self.client.get(f'/api/v1/photos/export/?{query}')
+		self.assertEqual(resp.status_code, status.HTTP_200_OK)
+		return resp, b''.join(resp.streaming_content)
+
+	def test_ndjson_is_the_default(self):
+		resp, body = self.export('')
+		self.assertEqual(resp['Content-Type'], 'application/x-ndjson; charset=utf-8')
+		rows = [json.loads(line) for line in body.decode().splitlines()]
+		self.assertEqual([row['url'] for row in rows], [f'https://example.com/{i}.jpg' for i in range(3)])
+		self.assertEqual(rows[0]['photographer'], str(self.jane.id))
+		self.assertEqual(rows[0]['photographer_name'], 'Jane')
+
+	def test_csv_uses_the_import_layout_and_list_filters(self):
+		resp, body = self.export(f'format=csv&photographer={self.jane.id}')
+		self.assertEqual(resp['Content-Disposition'], 'attachment; filename="photos.csv"')
+		reader = csv.DictReader(io.StringIO(body.decode()))
+		self.assertEqual(reader.fieldnames[:7], ['id', 'width', 'height', 'url', 'photographer', 'photographer_url', 'photographer_id'])
+		rows = list(reader)
+		self.assertEqual(len(rows), 2)
+		self.assertEqual(rows[1]['id'], '101')
+		self.assertEqual(rows[1]['photographer'], 'Jane')
+		self.assertEqual(rows[1]['photographer_id'], '7')
+		self.assertEqual(rows[1]['src.original'], 'https://example.com/o.jpg')
+		self.assertEqual(rows[1]['alt'], 'Photo, "1"')
+
+	def test_streams_in_chunks(self):
+		chunks = list(NDJSONRenderer().stream(Photo.objects.order_by('created_at'), chunk_size=2))
+		self.assertEqual([chunk.count(b'\n') for chunk in chunks], [2, 1])
+
+	async def test_asgi_requests_stream_an_async_iterator(self):
+		resp = await self.async_client.get('/api/v1/photos/export/?format=csv')
+		self.assertEqual(resp.status_code, status.HTTP_200_OK)
+		self.assertTrue(resp.is_async)
+		body = b''.join([chunk async for chunk in resp.streaming_content])
+		self.assertEqual(len(list(csv.DictReader(io.StringIO(body.decode())))), 3)
+
+	def test_invalid_filters_are_reported_as_json(self):
+		resp = self.client.get('/api/v1/photos/export/?format=csv&owner=nope')
+		self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
+		self.assertEqual(resp['Content-Type'], 'application/json')
+		self.assertIn('owner', resp.json())
+
+	def test_unknown_format(self):
+		resp = self.client.get('/api/v1/photos/export/?format=xml')
+		self.assertEqual(resp.status_code, status.HTTP_404_NOT_FOUND)
+
+	@skipUnless(pyarrow, 'pyarrow is not installed')
+	def test_parquet(self):
+		import pyarrow.parquet
+		_, body = self.export('format=parquet&ordering=-created_at')
+		table = pyarrow.parquet.read_table(pyarrow.BufferReader(body))
+		self.assertEqual(table.column('url').to_pylist(), [f'https://example.com/{i}.jpg' for i in (2, 1, 0)])
+		self.assertEqual(table.column('photographer_name').to_pylist(), ['Bob', 'Jane', 'Jane'])
+
+def pexels_src(pexels_id):
+	original = f'https://images.pexels.com/photos/{pexels_id}/pexels-photo-{pexels_id}.jpeg'
+	return {'src_original': original, **expand(original, 1)}
+
+class PhotoCompactSrcTests(TestCase):
+	def setUp(self):
+		self.client = APIClient()
+		self.user = User.objects.create_user(email='src@example.com', password='testpass123')
+		self.photographer = Photographer.objects.create(name='Jane', url='https://example.com/jane')
+		self.client.force_authenticate(user=self.user)
+
+	def stored(self, photo):
+		return Photo.objects.filter(pk=photo.pk).values('src_template', *VARIANT_FIELDS).get()
+
+	def test_template_urls_are_stored_compactly(self):
+		resp = self.client.post('/api/v1/photos/', make_photo_data(self.photographer, **pexels_src(1)), format='json')
+		self.assertEqual(resp.status_code, status.HTTP_201_CREATED)
+		self.assertEqual(resp.data['src_tiny'], pexels_src(1)['src_tiny'])
+		photo = Photo.objects.get(pk=resp.data['id'])
+		self.assertEqual(self.stored(photo), {'src_template': 1, **dict.fromkeys(VARIANT_FIELDS, '')})
+		self.assertEqual(photo.src_large2x, pexels_src(1)['src_large2x'])
+		resp = self.client.get(f'/api/v1/photos/{photo.pk}/')
+		self.assertEqual({name: resp.data[name] for name in pexels_src(1)}, pexels_src(1))
+
+	def test_other_urls_are_stored_explicitly(self):
+		resp = self.client.post('/api/v1/photos/', make_photo_data(self.photographer), format='json')
+		stored = self.stored(Photo.objects.get(pk=resp.data['id']))
+		self.assertIsNone(stored['src_template'])
+		self.assertEqual(stored['src_tiny'], 'https://example.com/t.jpg')
+
+	def test_changing_a_variant_falls_back_to_explicit_storage(self):
+		resp = self.client.post('/api/v1/photos/', make_photo_data(self.photographer, **pexels_src(1)), format='json')
+		photo_id = resp.data['id']
+		resp = self.client.patch(f'/api/v1/photos/{photo_id}/', {'src_tiny': 'https://example.com/t.jpg'}, format='json')
+		self.assertEqual(resp.data['src_medium'], pexels_src(1)['src_medium'])
+		stored = self.stored(Photo.objects.get(pk=photo_id))
+		self.assertIsNone(stored['src_template'])
+		self.assertEqual(stored['src_medium'], pexels_src(1)['src_medium'])
+		self.assertEqual(stored['src_tiny'], 'https://example.com/t.jpg')
+
+	def test_bulk_update_of_src_original_keeps_variants(self):
+		photo = Photo.objects.create(
+			**{**make_photo_data(self.photographer), **pexels_src(1), 'photographer': self.photographer}, owner=self.user,
+		)
+		resp = self.client.patch('/api/v1/photos/bulk/', {
+			'ids': [str(photo.id)], 'data': {'src_original': 'https://example.com/new.jpeg'},
+		}, format='json')
+		self.assertEqual(resp.data['updated'], 1)
+		photo = Photo.objects.get(pk=photo.pk)
+		self.assertEqual(photo.src_original, 'https://example.com/new.jpeg')
+		self.assertEqual(photo.src_large, pexels_src(1)['src_large'])
+		self.assertIsNone(self.stored(photo)['src_template'])
+
+	def test_export_and_report(self):
+		for i in range(3):
+			Photo.objects.create(**{
+				**make_photo_data(self.photographer, url=f'https://example.com/{i}.jpg'), **pexels_src(i),
+				'photographer': self.photographer,
+			})
+		rows = list(csv.DictReader(io.StringIO(b''.join(
+			self.client.get('/api/v1/photos/export/?format=csv').streaming_content
+		).decode())))
+		self.assertEqual(rows[2]['src.portrait'], pexels_src(2)['src_portrait'])
+
+		for i in range(3):
+			variants = {name: url for name, url in pexels_src(i).items() if name != 'src_original'}
+			Photo.objects.filter(url=f'https://example.com/{i}.jpg').update(src_template=None, **variants)
+		out = StringIO()
+		call_command('compact_photo_src', stdout=out)
+		self.assertIn('Compacted 3 photos.', out.getvalue())
+		self.assertIn('3 of 3 photos stored compactly.', out.getvalue())
+		self.assertEqual(Photo.objects.filter(src_large='').count(), 3)
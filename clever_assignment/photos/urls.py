@@ -1,10 +1,17 @@
+from django.conf import settings
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import PhotoViewSet
+from .views import AsyncPhotoDetailView, AsyncPhotoListView, PhotoViewSet
 
 router = DefaultRouter()
 router.register(r'', PhotoViewSet, basename='photo')
 
-urlpatterns = [
+urlpatterns = []
+if settings.ASYNC_READ_API:
+    urlpatterns += [
+        path('', AsyncPhotoListView.as_view(), name='photo-list'),
+        path('<uuid:pk>/', AsyncPhotoDetailView.as_view(), name='photo-detail'),
+    ]
+urlpatterns += [
     path('', include(router.urls)),
 ]
@@ -0,0 +1,137 @@
+"""
+Compact storage of the derived image URLs (src_large2x ... src_tiny).
+
+Pexels derives every size variant from the original image URL plus a fixed
+query string. When all variants of a photo match a known template, only
+`src_original` and the template id (`Photo.src_template`) are stored; the
+variant columns hold '' and are rebuilt when the row is loaded. Photos whose
+URLs match no template keep every URL explicitly.
+"""
+from django.db import models
+from django.db.models import Count, Q, Sum, Value
+from django.db.models.functions import Coalesce, Concat, Length
+
+# src_* fields derived from src_original, in column order.
+VARIANT_FIELDS = [
+    'src_large2x', 'src_large', 'src_medium', 'src_small', 'src_portrait', 'src_landscape', 'src_tiny',
+]
+
+# Template id -> query string appended to src_original for each variant.
+# Ids are stored in the database: never renumber or change a template, add a new one.
+VARIANT_TEMPLATES = {
+    1: {
+        'src_large2x': '?auto=compress&cs=tinysrgb&dpr=2&h=650&w=940',
+        'src_large': '?auto=compress&cs=tinysrgb&h=650&w=940',
+        'src_medium': '?auto=compress&cs=tinysrgb&h=350',
+        'src_small': '?auto=compress&cs=tinysrgb&h=130',
+        'src_portrait': '?auto=compress&cs=tinysrgb&fit=crop&h=1200&w=800',
+        'src_landscape': '?auto=compress&cs=tinysrgb&fit=crop&h=627&w=1200',
+        'src_tiny': '?auto=compress&cs=tinysrgb&dpr=1&fit=crop&h=200&w=280',
+    },
+}
+
+
+def match_template(src_original, variants):
+    """
+    Return the id of the template that rebuilds every URL in variants
+    ({field: url}) from src_original, or None.
+    """
+    if not src_original:
+        return None
+    for template_id, suffixes in VARIANT_TEMPLATES.items():
+        if all(variants.get(name) == src_original + suffix for name, suffix in suffixes.items()):
+            return template_id
+    return None
+
+
+def expand(src_original, template_id):
+    """
+    Return {field: url} for the variants of a compacted photo.
+    """
+    return {name: src_original + suffix for name, suffix in VARIANT_TEMPLATES[template_id].items()}
+
+
+class VariantURLField(models.URLField):
+    """
+    URLField for a derived variant: written as '' when the instance has a
+    src_template, so the URL is only kept in memory.
+    """
+    def pre_save(self, model_instance, add):
+        value = super().pre_save(model_instance, add)
+        return '' if getattr(model_instance, 'src_template', None) is not None else value
+
+
+def compact_photos(photo_model, batch_size=2000):
+    """
+    Compact the stored photos whose variant URLs match a template, with one
+    UPDATE per template and batch. Reads raw column values, so it works with
+    historical models in migrations. updated_at is left alone: the API
+    representation does not change. Returns the number of compacted photos.
+    """
+    rows = (
+        photo_model.objects.filter(src_template__isnull=True)
+        .values_list('pk', 'src_original', *VARIANT_FIELDS)
+        .iterator(chunk_size=batch_size)
+    )
+    blank = dict.fromkeys(VARIANT_FIELDS, '')
+    pending = {}
+    compacted = 0
+
+    def flush(template_id):
+        pks = pending.pop(template_id)
+        return photo_model.objects.filter(pk__in=pks).update(src_template=template_id, **blank)
+
+    for pk, src_original, *variants in rows:
+        template_id = match_template(src_original, dict(zip(VARIANT_FIELDS, variants)))
+        if template_id is None:
+            continue
+        pending.setdefault(template_id, []).append(pk)
+        if len(pending[template_id]) >= batch_size:
+            compacted += flush(template_id)
+    for template_id in list(pending):
+        compacted += flush(template_id)
+    return compacted
+
+
+def expand_photos(photo_model):
+    """
+    Store every variant URL explicitly again, with one UPDATE per template.
+    Returns the number of expanded photos.
+    """
+    expanded = 0
+    for template_id, suffixes in VARIANT_TEMPLATES.items():
+        urls = {name: Concat('src_original', Value(suffix)) for name, suffix in suffixes.items()}
+        expanded += photo_model.objects.filter(src_template=template_id).update(src_template=None, **urls)
+    return expanded
+
+
+def storage_report(photo_model):
+    """
+    Return the size of the stored src_* URLs and what explicit storage would
+    take: {'photos', 'compacted', 'stored_bytes', 'explicit_bytes', 'saved_bytes'}.
+    URLs are ASCII, so characters are bytes; the template id costs 2 bytes.
+    """
+    aggregates = {'photos': Count('pk'), 'compacted': Count('src_template')}
+    aggregates.update({
+        f'length_{name}': Coalesce(Sum(Length(name)), 0) for name in ['src_original', *VARIANT_FIELDS]
+    })
+    for template_id in VARIANT_TEMPLATES:
+        templated = Q(src_template=template_id)
+        aggregates[f'count_{template_id}'] = Count('pk', filter=templated)
+        aggregates[f'original_{template_id}'] = Coalesce(Sum(Length('src_original'), filter=templated), 0)
+    totals = photo_model.objects.aggregate(**aggregates)
+    stored = sum(totals[f'length_{name}'] for name in ['src_original', *VARIANT_FIELDS])
+    rebuilt = sum(
+        totals[f'original_{template_id}'] * len(suffixes)
+        + totals[f'count_{template_id}'] * sum(map(len, suffixes.values()))
+        for template_id, suffixes in VARIANT_TEMPLATES.items()
+    )
+    stored_bytes = stored + 2 * totals['compacted']
+    explicit_bytes = stored + rebuilt
+    return {
+        'photos': totals['photos'],
+        'compacted': totals['compacted'],
+        'stored_bytes': stored_bytes,
+        'explicit_bytes': explicit_bytes,
+        'saved_bytes': explicit_bytes - stored_bytes,
+    }
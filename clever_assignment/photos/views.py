@@ -1,23 +1,222 @@
-from rest_framework import viewsets, permissions
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+from django_filters.rest_framework import DjangoFilterBackend
+from rest_framework import viewsets, permissions, status
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+from clever_assignment.core.async_views import AsyncReadView
+from clever_assignment.core.cache import CachedResponseMixin
+from clever_assignment.core.conditional import ConditionalGetMixin
+from clever_assignment.photographers.models import Photographer
+from .facets import query_facets, rollup_facets
+from .filters import PhotoFilter, PhotoOrderingFilter
 from .models import Photo
-from .serializers import PhotoSerializer
+from .bulk import create_photos, delete_photos, update_photos
+from .export import EXPORT_RENDERERS
+from .serializers import (
+	PhotoBulkItemSerializer, PhotoBulkSelectionSerializer, PhotoBulkUpdateSerializer, PhotoFacetQuerySerializer,
+	PhotoSerializer,
+)
 from .permissions import IsOwnerOrAdmin
+from .search import PhotoSearchFilter
 
-class PhotoViewSet(viewsets.ModelViewSet):
+class PhotoViewSet(CachedResponseMixin, ConditionalGetMixin, viewsets.ModelViewSet):
 	"""
 	API endpoint for managing photos.
-	Supports CRUD, filtering, searching, and ordering.
+	Supports CRUD, filtering, nearest-color search, ranked full-text search, and ordering.
+	Reads support conditional GET; anonymous reads are served from the
+	versioned response cache.
 	"""
-	queryset = Photo.objects.all()
+	queryset = Photo.objects.select_related('photographer')
 	serializer_class = PhotoSerializer
 	permission_classes = [permissions.IsAuthenticatedOrReadOnly, IsOwnerOrAdmin]
-	filterset_fields = ['photographer', 'avg_color', 'owner']
-	search_fields = ['alt', 'photographer__name']
-	ordering_fields = ['created_at', 'width', 'height']
+	filter_backends = [DjangoFilterBackend, PhotoSearchFilter, PhotoOrderingFilter]
+	filterset_class = PhotoFilter
+	ordering_fields = ['created_at', 'width', 'height', 'aspect_ratio', 'megapixels']
 	ordering = ['created_at']
+	cache_generations = ('photos', 'photographers')
+	conditional_related = ('photographer',)
+	bulk_max_items = 5000
 
 	def perform_create(self, serializer):
 		"""
 		Set owner field to current user when creating a photo.
 		"""
 		serializer.save(owner=self.request.user)
+
+	@action(detail=False, methods=['get'], renderer_classes=EXPORT_RENDERERS)
+	def export(self, request):
+		"""
+		Stream every photo matching the list filters, search and ordering as
+		`?format=ndjson` (default), `csv` (the photos.csv layout) or `parquet`.
+		Rows come from a server-side cursor, so memory use is constant.
+		"""
+		renderer = request.accepted_renderer
+		queryset = self.filter_queryset(self.get_queryset())
+		content_type = f'{renderer.media_type}; charset={renderer.charset}' if renderer.charset else renderer.media_type
+		# ASGI only streams async iterators; a sync one is buffered in full.
+		stream = renderer.astream(queryset) if isinstance(request._request, ASGIRequest) else renderer.stream(queryset)
+		response = StreamingHttpResponse(stream, content_type=content_type)
+		response['Content-Disposition'] = f'attachment; filename="photos.{renderer.extension}"'
+		return response
+
+	@action(detail=False, methods=['get'])
+	def facets(self, request):
+		"""
+		Count photos per value of each requested dimension (`avg_color`,
+		`photographer`, `orientation`), top `limit` values first. Takes the
+		list filters and search; without any, the counts are read from the
+		facet rollup instead of aggregating the photos.
+		"""
+		return self.cached_response(self.get_facets, request)
+
+	def get_facets(self, request):
+		"""
+		Build the facets response (cached for anonymous clients like list reads).
+		"""
+		params = PhotoFacetQuerySerializer(data=request.query_params)
+		params.is_valid(raise_exception=True)
+		dimensions, limit = params.validated_data['dimensions'], params.validated_data['limit']
+		filtered = any(
+			request.query_params.get(name)
+			for name in [*self.filterset_class.base_filters, PhotoSearchFilter.search_param]
+		)
+		if filtered:
+			facets = query_facets(self.filter_queryset(self.get_queryset()), dimensions, limit)
+		else:
+			facets = rollup_facets(dimensions, limit)
+
+		data = {
+			dimension: [{'value': value, 'count': count} for value, count in values]
+			for dimension, values in facets.items()
+		}
+		if data.get('photographer'):
+			names = {
+				str(pk): name for pk, name in Photographer.objects.filter(
+					pk__in=[entry['value'] for entry in data['photographer']],
+				).values_list('pk', 'name')
+			}
+			for entry in data['photographer']:
+				entry['name'] = names.get(entry['value'])
+		return Response({'filtered': filtered, 'facets': data})
+
+	@action(detail=False, methods=['post'], url_path='bulk', serializer_class=PhotoBulkItemSerializer)
+	def bulk(self, request):
+		"""
+		Create up to `bulk_max_items` photos from a JSON list in one transaction.
+		Items are validated independently; valid items are inserted and the
+		response lists a result per item, in request order. Returns 201 when
+		every item was created, 207 when some were rejected and 400 when none
+		were created.
+		"""
+		items = request.data
+		if not isinstance(items, list) or not items:
+			return Response({'detail': 'Expected a non-empty list of photos.'}, status=status.HTTP_400_BAD_REQUEST)
+		if len(items) > self.bulk_max_items:
+			return Response(
+				{'detail': f'At most {self.bulk_max_items} photos can be created per request.'},
+				status=status.HTTP_400_BAD_REQUEST,
+			)
+
+		valid, errors = [], {}
+		for index, item in enumerate(items):
+			serializer = self.get_serializer(data=item)
+			if serializer.is_valid():
+				valid.append((index, serializer.validated_data))
+			else:
+				errors[index] = serializer.errors
+		created, rejected = create_photos(valid, request.user) if valid else ({}, {})
+		errors.update(rejected)
+
+		data = PhotoSerializer(list(created.values()), many=True, context=self.get_serializer_context()).data
+		created_data = dict(zip(created, data))
+		results = [
+			{'index': index, 'status': status.HTTP_201_CREATED, 'data': created_data[index]}
+			if index in created_data else
+			{'index': index, 'status': status.HTTP_400_BAD_REQUEST, 'errors': errors[index]}
+			for index in range(len(items))
+		]
+		if not errors:
+			code = status.HTTP_201_CREATED
+		elif created:
+			code = status.HTTP_207_MULTI_STATUS
+		else:
+			code = status.HTTP_400_BAD_REQUEST
+		return Response({'created': len(created), 'failed': len(errors), 'results': results}, status=code)
+
+	@bulk.mapping.patch
+	def bulk_update(self, request):
+		"""
+		Update the photos selected by `ids` or `filters` with the fields in `data`.
+		"""
+		serializer = PhotoBulkUpdateSerializer(data=request.data)
+		serializer.is_valid(raise_exception=True)
+		selected, permitted = self.get_bulk_querysets(request, serializer.validated_data)
+		return self.bulk_response(
+			selected, permitted, 'updated', serializer.validated_data['dry_run'],
+			lambda: update_photos(permitted, serializer.validated_data['data']),
+		)
+
+	@bulk.mapping.delete
+	def bulk_destroy(self, request):
+		"""
+		Delete the photos selected by `ids` or `filters`.
+		"""
+		serializer = PhotoBulkSelectionSerializer(data=request.data)
+		serializer.is_valid(raise_exception=True)
+		selected, permitted = self.get_bulk_querysets(request, serializer.validated_data)
+		return self.bulk_response(
+			selected, permitted, 'deleted', serializer.validated_data['dry_run'],
+			lambda: delete_photos(permitted),
+		)
+
+	def get_bulk_querysets(self, request, selection):
+		"""
+		Return the selected photos and the subset the user may modify.
+		Ownership is enforced with an `owner_id` predicate instead of loading
+		each object for IsOwnerOrAdmin; staff may modify every photo.
+		"""
+		queryset = Photo.objects.all()
+		if 'ids' in selection:
+			selected = queryset.filter(pk__in=selection['ids'])
+		else:
+			filters = selection['filters']
+			filterset = self.filterset_class(data=filters, queryset=queryset, request=request)
+			unknown = sorted(set(filters) - set(filterset.filters))
+			if unknown:
+				raise ValidationError({'filters': [f'Unknown filter: {name}' for name in unknown]})
+			if not filterset.is_valid():
+				raise ValidationError({'filters': filterset.errors})
+			selected = filterset.qs
+		permitted = selected if request.user.is_staff else selected.filter(owner_id=request.user.id)
+		return selected, permitted
+
+	@staticmethod
+	def bulk_response(selected, permitted, verb, dry_run, apply):
+		"""
+		Run a bulk operation (or only count it in dry-run mode) and report the counts.
+		"""
+		matched = selected.count()
+		permitted_count = permitted.count()
+		return Response({
+			'matched': matched,
+			verb: permitted_count if dry_run else apply(),
+			'not_permitted': matched - permitted_count,
+			'dry_run': dry_run,
+		})
+
+
+class AsyncPhotoListView(AsyncReadView):
+	"""
+	Async photo list (GET); creation is delegated to PhotoViewSet.
+	"""
+	view_class = PhotoViewSet
+	actions = {'get': 'list', 'post': 'create'}
+
+class AsyncPhotoDetailView(AsyncReadView):
+	"""
+	Async photo retrieve (GET); writes are delegated to PhotoViewSet.
+	"""
+	view_class = PhotoViewSet
+	actions = {'get': 'retrieve', 'put': 'update', 'patch': 'partial_update', 'delete': 'destroy'}
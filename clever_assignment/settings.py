@@ -33,6 +33,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'rest_framework_simplejwt',
     'django_filters',
@@ -44,6 +45,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'clever_assignment.core.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -56,6 +58,7 @@ MIDDLEWARE = [
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(days=1),
     "REFRESH_TOKEN_LIFETIME": timedelta(days=1),
+    "TOKEN_OBTAIN_SERIALIZER": "clever_assignment.users.serializers.ClaimsTokenObtainPairSerializer",
 }
 
 ROOT_URLCONF = 'clever_assignment.urls'
@@ -84,6 +87,15 @@ AUTH_USER_MODEL = 'users.User'
 # Database
 # https://docs.djangoproject.com/en/6.0/ref/settings/#databases
 
+# With POSTGRES_POOL each process keeps a psycopg connection pool between
+# POSTGRES_POOL_MIN_SIZE and POSTGRES_POOL_MAX_SIZE connections; requests wait
+# up to POSTGRES_POOL_TIMEOUT seconds for one, idle connections above the
+# minimum are closed after POSTGRES_POOL_MAX_IDLE seconds and every connection
+# is replaced after POSTGRES_POOL_MAX_LIFETIME seconds. Without it, connections
+# persist for POSTGRES_CONN_MAX_AGE seconds. Either way connections are checked
+# before reuse (CONN_HEALTH_CHECKS), so a dropped connection is never handed out.
+POSTGRES_POOL = os.environ.get('POSTGRES_POOL', 'True').lower() in ('true', '1')
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.postgresql',
@@ -92,14 +104,78 @@ DATABASES = {
         'PASSWORD': os.environ.get('POSTGRES_PASSWORD', 'adminpassword'),
         'HOST': os.environ.get('POSTGRES_HOST', 'db'),
         'PORT': os.environ.get('POSTGRES_PORT', '5432'),
+        'CONN_HEALTH_CHECKS': True,
+        # Pooling and persistent connections are exclusive.
+        'CONN_MAX_AGE': 0 if POSTGRES_POOL else int(os.environ.get('POSTGRES_CONN_MAX_AGE', '60')),
+        'OPTIONS': {
+            'pool': {
+                'min_size': int(os.environ.get('POSTGRES_POOL_MIN_SIZE', '2')),
+                'max_size': int(os.environ.get('POSTGRES_POOL_MAX_SIZE', '10')),
+                'timeout': float(os.environ.get('POSTGRES_POOL_TIMEOUT', '10')),
+                'max_idle': float(os.environ.get('POSTGRES_POOL_MAX_IDLE', '300')),
+                'max_lifetime': float(os.environ.get('POSTGRES_POOL_MAX_LIFETIME', '3600')),
+                # Requests queued beyond this are refused at once (0: no limit).
+                'max_waiting': int(os.environ.get('POSTGRES_POOL_MAX_WAITING', '0')),
+            },
+        } if POSTGRES_POOL else {},
     }
 }
 
+# Cache (local memory by default; point CACHE_BACKEND/CACHE_LOCATION at a shared
+# backend such as memcached or redis when running several processes)
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', ''),
+    }
+}
+
+# Whether every process (web workers, management commands) sees the same cache.
+# Invalidation goes through the cache, so the caches below default to off without it
+SHARED_CACHE = CACHES['default']['BACKEND'] not in (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+# Seconds anonymous photo/photographer reads are cached for; 0 disables it
+RESPONSE_CACHE_TIMEOUT = int(os.environ.get('RESPONSE_CACHE_TIMEOUT', '300' if SHARED_CACHE else '0'))
+
+# Serve photo and photographer reads from the native async views (run under ASGI)
+ASYNC_READ_API = os.environ.get('ASYNC_READ_API', 'False').lower() in ('true', '1')
+
+# Apply DEFAULT_THROTTLE_RATES; benchmark_api turns this off for in-process replays
+API_THROTTLING = True
+
+# Store src_original plus a variant template id instead of every src_* URL when they match
+PHOTO_SRC_COMPACT = os.environ.get('PHOTO_SRC_COMPACT', 'True').lower() in ('true', '1')
+
+# Seconds authenticated users are served from the cache instead of a query per request
+JWT_USER_CACHE_TIMEOUT = int(os.environ.get('JWT_USER_CACHE_TIMEOUT', '60' if SHARED_CACHE else '0'))
+
+# Authenticate safe-method requests from the signed token claims alone, without loading the user
+# (revocations are checked in the cache, so this needs a shared cache)
+JWT_STATELESS_READS = os.environ.get('JWT_STATELESS_READS', 'False').lower() in ('true', '1')
+
+# Directory where each worker process writes its request metrics for /api/v1/metrics/
+# (unset: the endpoint reports the serving process only), and how often in seconds
+METRICS_DIR = os.environ.get('METRICS_DIR') or None
+METRICS_FLUSH_INTERVAL = float(os.environ.get('METRICS_FLUSH_INTERVAL', '5'))
+
+# Bearer token a scraper must send to /api/v1/metrics/, and the client addresses
+# (REMOTE_ADDR) allowed without it
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN') or None
+METRICS_ALLOWED_IPS = [ip for ip in os.environ.get('METRICS_ALLOWED_IPS', '127.0.0.1,::1').split(',') if ip]
+
+# Entries in the per-process (name, url) -> photographer id resolution cache; 0 disables it
+PHOTOGRAPHER_RESOLVER_CACHE_SIZE = int(
+    os.environ.get('PHOTOGRAPHER_RESOLVER_CACHE_SIZE', '10000' if SHARED_CACHE else '0')
+)
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'clever_assignment.users.authentication.CachedJWTAuthentication',
     ),
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    'DEFAULT_PAGINATION_CLASS': 'clever_assignment.core.pagination.PageOrCursorPagination',
     'PAGE_SIZE': 20,
     'DEFAULT_FILTER_BACKENDS': [
         'django_filters.rest_framework.DjangoFilterBackend',
@@ -108,15 +184,21 @@ REST_FRAMEWORK = {
     ],
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
     'DEFAULT_THROTTLE_CLASSES': [
-        'rest_framework.throttling.AnonRateThrottle',
-        'rest_framework.throttling.UserRateThrottle',
+        'clever_assignment.core.throttling.AnonRateThrottle',
+        'clever_assignment.core.throttling.UserRateThrottle',
     ],
     'DEFAULT_THROTTLE_RATES': {
         'anon': '100/hour',
         'user': '1000/hour',
+        'autocomplete': '120/minute',
     },
 }
 
+# Where build_schema writes the precomputed OpenAPI schema served at /api/schema/,
+# and how long clients may cache it (its URL is versioned by the docs pages)
+SCHEMA_ARTIFACT_DIR = os.environ.get('SCHEMA_ARTIFACT_DIR', str(BASE_DIR / 'build' / 'schema'))
+SCHEMA_CACHE_MAX_AGE = int(os.environ.get('SCHEMA_CACHE_MAX_AGE', '86400'))
+
 SPECTACULAR_SETTINGS = {
     'TITLE': 'Photo Management API',
     'DESCRIPTION': 'RESTful API for managing photos and photographers.',
@@ -17,7 +17,7 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
-from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView, SpectacularRedocView
+from clever_assignment.core.schema import RedocView, SchemaView, SwaggerView
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -26,8 +26,8 @@ urlpatterns = [
     path('api/v1/photographers/', include('clever_assignment.photographers.urls')),
     path('api/v1/auth/login/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('api/v1/auth/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
-    path('api/schema/', SpectacularAPIView.as_view(), name='schema'),
-    path('api/docs/', SpectacularSwaggerView.as_view(url_name='schema'), name='swagger-ui'),
-    path('api/redoc/', SpectacularRedocView.as_view(url_name='schema'), name='redoc'),
+    path('api/schema/', SchemaView.as_view(), name='schema'),
+    path('api/docs/', SwaggerView.as_view(url_name='schema'), name='swagger-ui'),
+    path('api/redoc/', RedocView.as_view(url_name='schema'), name='redoc'),
     path('api/v1/', include('clever_assignment.core.urls')),
 ]
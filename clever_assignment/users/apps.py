@@ -3,3 +3,11 @@ from django.apps import AppConfig
 class UsersConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'clever_assignment.users'
+
+    def ready(self):
+        # Registers the OpenAPI extension for the JWT authenticators.
+        from . import schema  # noqa: F401
+        from django.db.models.signals import post_delete, post_save
+        from .authentication import invalidate_cached_user
+        post_save.connect(invalidate_cached_user, sender=self.get_model('User'))
+        post_delete.connect(invalidate_cached_user, sender=self.get_model('User'))
@@ -0,0 +1,209 @@
+"""
+JWT authentication for the API.
+
+The user cache and the auth fingerprints below live in the default cache,
+so they need a backend every process shares (enforced by core.checks): a
+process-local cache would keep serving users another process deactivated.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+USER_CACHE_KEY = 'jwt_user:{}'
+# Claim carrying auth_fingerprint() of the user at login.
+AUTH_CLAIM = 'auth'
+# Current auth_fingerprint() of a user whose User.AUTH_FIELDS changed; tokens
+# with another fingerprint are refused on stateless reads.
+AUTH_FINGERPRINT_KEY = 'jwt_auth:{}'
+# Fingerprint stored for deleted users, which no token carries.
+DELETED_FINGERPRINT = ''
+
+def auth_fingerprint(user):
+	"""
+	Digest of the user's User.AUTH_FIELDS (password, active and staff flags).
+	"""
+	return hashlib.sha256(repr(sorted(user.get_auth_values().items())).encode('utf-8')).hexdigest()
+
+def store_fingerprints(fingerprints):
+	"""
+	Drop the cached users and record their current fingerprints, given as
+	{user_id: fingerprint}, for as long as an access token lives.
+	"""
+	cache.delete_many([USER_CACHE_KEY.format(user_id) for user_id in fingerprints])
+	cache.set_many(
+		{AUTH_FINGERPRINT_KEY.format(user_id): fingerprint for user_id, fingerprint in fingerprints.items()},
+		int(api_settings.ACCESS_TOKEN_LIFETIME.total_seconds()),
+	)
+
+def invalidate_users(user_ids):
+	"""
+	Apply changes to users made without the model signals, e.g. with
+	QuerySet.update(): drop the cached users and refuse tokens issued
+	before the change on stateless reads. One query.
+	"""
+	from .models import User
+
+	fingerprints = {str(user_id): DELETED_FINGERPRINT for user_id in user_ids}
+	for user in User.objects.filter(pk__in=user_ids).only('pk', *User.AUTH_FIELDS):
+		fingerprints[str(user.pk)] = auth_fingerprint(user)
+	store_fingerprints(fingerprints)
+
+def invalidate_cached_user(sender, instance, **kwargs):
+	"""
+	post_save/post_delete receiver dropping the cached user, so changes to
+	is_active, is_staff or the password apply to the next request. Deleting
+	a user or changing its User.AUTH_FIELDS also revokes the tokens issued
+	before, on stateless reads.
+	"""
+	user_id = str(getattr(instance, api_settings.USER_ID_FIELD))
+	previous = getattr(instance, 'loaded_auth_values', None)
+	instance.loaded_auth_values = instance.get_auth_values()
+	if 'created' not in kwargs:
+		store_fingerprints({user_id: DELETED_FINGERPRINT})
+	elif not kwargs['created'] and previous != instance.loaded_auth_values:
+		store_fingerprints({user_id: auth_fingerprint(instance)})
+	else:
+		cache.delete(USER_CACHE_KEY.format(user_id))
+
+class AsyncJWTAuthentication(JWTAuthentication):
+	"""
+	JWTAuthentication with an async entry point for the async read views.
+	Token validation is pure computation; only the user lookup hits the
+	database, through the async ORM.
+	"""
+	async def aauthenticate(self, request):
+		"""
+		Async variant of authenticate().
+		"""
+		validated_token = self.get_request_token(request)
+		if validated_token is None:
+			return None
+		return await self.aget_user(validated_token), validated_token
+
+	def get_request_token(self, request):
+		"""
+		Return the validated token of the Authorization header, or None.
+		"""
+		header = self.get_header(request)
+		if header is None:
+			return None
+		raw_token = self.get_raw_token(header)
+		if raw_token is None:
+			return None
+		return self.get_validated_token(raw_token)
+
+	async def aget_user(self, validated_token):
+		"""
+		Async variant of get_user(), with the same checks.
+		"""
+		user_id = self.get_user_id(validated_token)
+		try:
+			user = await self.user_model.objects.aget(**{api_settings.USER_ID_FIELD: user_id})
+		except self.user_model.DoesNotExist as e:
+			raise AuthenticationFailed(_("User not found"), code="user_not_found") from e
+		self.check_user(user, validated_token)
+		return user
+
+	@staticmethod
+	def get_user_id(validated_token):
+		try:
+			return validated_token[api_settings.USER_ID_CLAIM]
+		except KeyError as e:
+			raise InvalidToken(_("Token contained no recognizable user identification")) from e
+
+	@staticmethod
+	def check_user(user, validated_token):
+		"""
+		The checks get_user() runs on a loaded user.
+		"""
+		if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+			raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+		if api_settings.CHECK_REVOKE_TOKEN:
+			if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+				raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+
+class CachedJWTAuthentication(AsyncJWTAuthentication):
+	"""
+	JWT authentication serving users from the cache for
+	JWT_USER_CACHE_TIMEOUT seconds instead of a query per request. Saving or
+	deleting a user drops its entry (see invalidate_cached_user); the active
+	and revocation checks still run on every request.
+
+	With JWT_STATELESS_READS, safe methods get a TokenUser built from the
+	signed claims without touching the database. Its is_staff claim is set
+	at login, so only read-only permission checks should rely on it. Tokens
+	issued before the user was deactivated, deleted or had its password or
+	staff flags changed are refused: their AUTH_CLAIM no longer matches the
+	fingerprint stored in the cache by the change.
+
+	Writes through QuerySet.update() skip the signals: they must call
+	invalidate_users() for the changed users.
+	"""
+	def authenticate(self, request):
+		validated_token = self.get_request_token(request)
+		if validated_token is None:
+			return None
+		if self.is_stateless(request):
+			fingerprint = cache.get(AUTH_FINGERPRINT_KEY.format(self.get_user_id(validated_token)))
+			return self.get_token_user(validated_token, fingerprint), validated_token
+		return self.get_user(validated_token), validated_token
+
+	async def aauthenticate(self, request):
+		validated_token = self.get_request_token(request)
+		if validated_token is None:
+			return None
+		if self.is_stateless(request):
+			fingerprint = await cache.aget(AUTH_FINGERPRINT_KEY.format(self.get_user_id(validated_token)))
+			return self.get_token_user(validated_token, fingerprint), validated_token
+		return await self.aget_user(validated_token), validated_token
+
+	@staticmethod
+	def is_stateless(request):
+		return settings.JWT_STATELESS_READS and request.method in SAFE_METHODS
+
+	def get_token_user(self, validated_token, fingerprint=None):
+		"""
+		Lightweight user backed by the token claims. fingerprint is the
+		stored auth_fingerprint() of the user, if it changed recently.
+		"""
+		self.get_user_id(validated_token)
+		if fingerprint is not None and validated_token.get(AUTH_CLAIM) != fingerprint:
+			raise AuthenticationFailed(_("Token has been revoked"), code="token_revoked")
+		return api_settings.TOKEN_USER_CLASS(validated_token)
+
+	def get_user(self, validated_token):
+		if not settings.JWT_USER_CACHE_TIMEOUT:
+			return super().get_user(validated_token)
+		user_id = self.get_user_id(validated_token)
+		key = USER_CACHE_KEY.format(user_id)
+		user = cache.get(key)
+		if user is None:
+			try:
+				user = self.user_model.objects.get(**{api_settings.USER_ID_FIELD: user_id})
+			except self.user_model.DoesNotExist as e:
+				raise AuthenticationFailed(_("User not found"), code="user_not_found") from e
+			cache.set(key, user, settings.JWT_USER_CACHE_TIMEOUT)
+		self.check_user(user, validated_token)
+		return user
+
+	async def aget_user(self, validated_token):
+		if not settings.JWT_USER_CACHE_TIMEOUT:
+			return await super().aget_user(validated_token)
+		user_id = self.get_user_id(validated_token)
+		key = USER_CACHE_KEY.format(user_id)
+		user = await cache.aget(key)
+		if user is None:
+			try:
+				user = await self.user_model.objects.aget(**{api_settings.USER_ID_FIELD: user_id})
+			except self.user_model.DoesNotExist as e:
+				raise AuthenticationFailed(_("User not found"), code="user_not_found") from e
+			await cache.aset(key, user, settings.JWT_USER_CACHE_TIMEOUT)
+		self.check_user(user, validated_token)
+		return user
@@ -0,0 +1,145 @@
+"""
+Helpers for bulk user provisioning from CSV or JSON Lines files.
+Used by the `import_users` management command.
+
+Each input record has an `email` and either a plain `password` or a
+`password_hash` already in Django's format. Plain passwords are hashed on a
+process pool, since the configured hasher (PBKDF2 by default) is
+deliberately slow and single-threaded per password.
+"""
+import csv
+import json
+import time
+from dataclasses import dataclass, field
+from itertools import islice
+
+from django.contrib.auth.hashers import identify_hasher, make_password
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+
+from .models import User, normalize_email
+
+
+@dataclass
+class UserImportStats:
+    """
+    Running totals for a user import. errors and duplicates hold
+    (line, message) tuples.
+    """
+    rows: int = 0
+    created: int = 0
+    hashed: int = 0
+    hash_seconds: float = 0.0
+    duplicates: list = field(default_factory=list)
+    errors: list = field(default_factory=list)
+
+
+def read_records(file, fmt):
+    """
+    Yield (line_number, record) from a CSV file with a header row or from
+    JSON Lines. Blank JSON lines are skipped; malformed ones yield a string
+    error instead of a record.
+    """
+    if fmt == 'csv':
+        reader = csv.DictReader(file)
+        for row in reader:
+            yield reader.line_num, row
+        return
+    for line, text in enumerate(file, start=1):
+        if not text.strip():
+            continue
+        try:
+            record = json.loads(text)
+        except ValueError as e:
+            yield line, f'Invalid JSON: {e}'
+            continue
+        yield line, record if isinstance(record, dict) else 'Expected a JSON object.'
+
+
+def read_batches(records, batch_size):
+    """
+    Yield lists of at most batch_size (line, record) tuples.
+    """
+    records = iter(records)
+    while batch := list(islice(records, batch_size)):
+        yield batch
+
+
+def parse_batch(batch, seen, stats):
+    """
+    Validate a batch and drop duplicates, before any password is hashed.
+    Returns [(line, email, password, password_hash)] for the new users;
+    exactly one of password and password_hash is set. seen holds the emails
+    of earlier batches.
+    """
+    parsed = []
+    for line, record in batch:
+        stats.rows += 1
+        if isinstance(record, str):
+            stats.errors.append((line, record))
+            continue
+        email = normalize_email(str(record.get('email') or ''))
+        password, password_hash = record.get('password') or None, record.get('password_hash') or None
+        try:
+            validate_email(email)
+        except ValidationError:
+            stats.errors.append((line, f'Invalid email {email!r}.'))
+            continue
+        if (password is None) == (password_hash is None):
+            stats.errors.append((line, 'Expected exactly one of password and password_hash.'))
+            continue
+        if password_hash is not None:
+            try:
+                identify_hasher(password_hash)
+            except ValueError:
+                stats.errors.append((line, 'password_hash is not in a format of a configured hasher.'))
+                continue
+        if email in seen:
+            stats.duplicates.append((line, f'{email} appears earlier in the file.'))
+            continue
+        seen.add(email)
+        parsed.append((line, email, password, password_hash))
+
+    existing = set(User.objects.filter(email__in=[row[1] for row in parsed]).values_list('email', flat=True))
+    if existing:
+        for line, email, _, _ in parsed:
+            if email in existing:
+                stats.duplicates.append((line, f'{email} is already registered.'))
+        parsed = [row for row in parsed if row[1] not in existing]
+    return parsed
+
+
+def hash_passwords(passwords, pool, workers):
+    """
+    Hash plain passwords with the configured hasher, spread over the pool
+    when one is given.
+    """
+    if pool is None:
+        return [make_password(password) for password in passwords]
+    chunksize = max(1, len(passwords) // (workers * 4))
+    return list(pool.map(make_password, passwords, chunksize=chunksize))
+
+
+def create_users(parsed, stats, pool=None, workers=1):
+    """
+    Hash the plain passwords of a parsed batch and insert the users with a
+    single bulk_create. Emails registered concurrently since parse_batch()
+    checked them are skipped by the insert and reported as duplicates.
+    """
+    plain = [password for _, _, password, _ in parsed if password is not None]
+    started = time.monotonic()
+    hashes = iter(hash_passwords(plain, pool, workers))
+    stats.hash_seconds += time.monotonic() - started
+    stats.hashed += len(plain)
+
+    users = [
+        User(email=email, password=password_hash if password is None else next(hashes))
+        for _, email, password, password_hash in parsed
+    ]
+    User.objects.bulk_create(users, ignore_conflicts=True)
+    # Primary keys are generated here, so the rows that made it are known.
+    inserted = set(User.objects.filter(pk__in=[user.pk for user in users]).values_list('pk', flat=True))
+    for (line, email, _, _), user in zip(parsed, users):
+        if user.pk not in inserted:
+            stats.duplicates.append((line, f'{email} was registered during the import.'))
+    stats.created += len(inserted)
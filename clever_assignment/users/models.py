@@ -3,6 +3,13 @@ from django.db import models
 from django.contrib.auth.models import AbstractBaseUser, PermissionsMixin, BaseUserManager
 import uuid
 
+def normalize_email(email):
+	"""
+	Canonical form of an email address: surrounding whitespace removed,
+	lowercased. Used by registration and the import_users command.
+	"""
+	return email.strip().lower()
+
 class UserManager(BaseUserManager):
 	"""
 	Custom manager for User model.
@@ -48,6 +55,21 @@ class User(AbstractBaseUser, PermissionsMixin):
 	USERNAME_FIELD = 'email'
 	REQUIRED_FIELDS = []
 
+	# Fields deciding whether issued tokens may still be used; their values
+	# when loaded are remembered in `loaded_auth_values` (see
+	# users.authentication.invalidate_cached_user).
+	AUTH_FIELDS = ['password', 'is_active', 'is_staff', 'is_superuser']
+
+	@classmethod
+	def from_db(cls, db, field_names, values):
+		instance = super().from_db(db, field_names, values)
+		if all(name in instance.__dict__ for name in cls.AUTH_FIELDS):
+			instance.loaded_auth_values = instance.get_auth_values()
+		return instance
+
+	def get_auth_values(self):
+		return {name: getattr(self, name) for name in self.AUTH_FIELDS}
+
 	def __str__(self):
 		"""
 		String representation of User.
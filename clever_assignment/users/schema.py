@@ -0,0 +1,9 @@
+from drf_spectacular.contrib.rest_framework_simplejwt import SimpleJWTScheme
+
+class AsyncJWTScheme(SimpleJWTScheme):
+	"""
+	Document the project's JWT authenticators (subclasses of simplejwt's
+	JWTAuthentication) as the same `jwtAuth` bearer scheme.
+	"""
+	target_class = 'clever_assignment.users.authentication.AsyncJWTAuthentication'
+	match_subclasses = True
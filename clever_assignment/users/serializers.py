@@ -1,5 +1,7 @@
 from rest_framework import serializers
-from .models import User
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from .authentication import AUTH_CLAIM, auth_fingerprint
+from .models import User, normalize_email
 
 class UserRegistrationSerializer(serializers.ModelSerializer):
     """
@@ -26,4 +28,17 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
         """
         Normalize email input.
         """
-        return value.strip().lower()
+        return normalize_email(value)
+
+class ClaimsTokenObtainPairSerializer(TokenObtainPairSerializer):
+    """
+    Login serializer adding the staff flags and the auth fingerprint to the
+    token claims, for the stateless read mode of CachedJWTAuthentication.
+    """
+    @classmethod
+    def get_token(cls, user):
+        token = super().get_token(user)
+        token['is_staff'] = user.is_staff
+        token['is_superuser'] = user.is_superuser
+        token[AUTH_CLAIM] = auth_fingerprint(user)
+        return token
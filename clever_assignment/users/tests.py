@@ -1,6 +1,12 @@
-from django.test import TestCase
-from rest_framework.test import APIClient
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient, APIRequestFactory
 from rest_framework import status
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.tokens import RefreshToken
+from clever_assignment.users.authentication import CachedJWTAuthentication, invalidate_users
 from clever_assignment.users.models import User
 
 class UserRegistrationTests(TestCase):
@@ -66,3 +72,96 @@ class AuthTokenTests(TestCase):
 	def test_token_refresh_invalid(self):
 		resp = self.client.post('/api/v1/auth/refresh/', {'refresh': 'invalidtoken'})
 		self.assertEqual(resp.status_code, status.HTTP_401_UNAUTHORIZED)
+
+@override_settings(JWT_USER_CACHE_TIMEOUT=60)
+class CachedJWTAuthenticationTests(TestCase):
+	def setUp(self):
+		cache.clear()
+		self.factory = APIRequestFactory()
+		self.user = User.objects.create_user(email='cached@example.com', password='testpass123')
+		self.token = str(RefreshToken.for_user(self.user).access_token)
+
+	def request(self, method='get'):
+		return getattr(self.factory, method)('/api/v1/photos/', HTTP_AUTHORIZATION=f'Bearer {self.token}')
+
+	def test_user_is_served_from_cache(self):
+		with self.assertNumQueries(1):
+			user, _ = CachedJWTAuthentication().authenticate(self.request())
+		self.assertEqual(user, self.user)
+		with self.assertNumQueries(0):
+			user, _ = CachedJWTAuthentication().authenticate(self.request())
+		self.assertEqual(user.email, 'cached@example.com')
+		with self.assertNumQueries(0):
+			user, _ = async_to_sync(CachedJWTAuthentication().aauthenticate)(self.request())
+		self.assertEqual(user, self.user)
+
+	def test_changes_to_user_apply_immediately(self):
+		CachedJWTAuthentication().authenticate(self.request())
+		self.user.is_staff = True
+		self.user.save()
+		user, _ = CachedJWTAuthentication().authenticate(self.request())
+		self.assertTrue(user.is_staff)
+		self.user.is_active = False
+		self.user.save()
+		with self.assertRaises(AuthenticationFailed):
+			CachedJWTAuthentication().authenticate(self.request())
+		self.user.delete()
+		with self.assertRaises(AuthenticationFailed):
+			async_to_sync(CachedJWTAuthentication().aauthenticate)(self.request())
+
+	@override_settings(JWT_STATELESS_READS=True)
+	def test_stateless_reads(self):
+		self.user.is_staff = True
+		self.user.save()
+		login = self.client.post('/api/v1/auth/login/', {'email': 'cached@example.com', 'password': 'testpass123'})
+		self.token = login.data['access']
+		with self.assertNumQueries(0):
+			user, _ = CachedJWTAuthentication().authenticate(self.request())
+		self.assertIsInstance(user, TokenUser)
+		self.assertEqual(user.pk, str(self.user.pk))
+		self.assertTrue(user.is_staff)
+		user, _ = CachedJWTAuthentication().authenticate(self.request('post'))
+		self.assertIsInstance(user, User)
+
+	def login(self):
+		login = self.client.post('/api/v1/auth/login/', {'email': self.user.email, 'password': 'testpass123'})
+		self.token = login.data['access']
+
+	@override_settings(JWT_STATELESS_READS=True)
+	def test_stateless_reads_refuse_revoked_tokens(self):
+		self.login()
+		self.user.email = 'renamed@example.com'
+		self.user.save()
+		CachedJWTAuthentication().authenticate(self.request())
+		self.user.is_staff = True
+		self.user.save()
+		with self.assertRaises(AuthenticationFailed):
+			CachedJWTAuthentication().authenticate(self.request())
+		self.login()
+		user, _ = CachedJWTAuthentication().authenticate(self.request())
+		self.assertTrue(user.is_staff)
+		self.user.is_active = False
+		self.user.save()
+		with self.assertRaises(AuthenticationFailed):
+			CachedJWTAuthentication().authenticate(self.request())
+		with self.assertRaises(AuthenticationFailed):
+			async_to_sync(CachedJWTAuthentication().aauthenticate)(self.request())
+
+	@override_settings(JWT_STATELESS_READS=True)
+	def test_queryset_updates_are_invalidated_explicitly(self):
+		self.login()
+		CachedJWTAuthentication().authenticate(self.request('post'))
+		User.objects.filter(pk=self.user.pk).update(is_active=False)
+		invalidate_users([self.user.pk])
+		with self.assertRaises(AuthenticationFailed):
+			CachedJWTAuthentication().authenticate(self.request('post'))
+		with self.assertRaises(AuthenticationFailed):
+			CachedJWTAuthentication().authenticate(self.request())
+
+	def test_deactivated_user_is_rejected_by_api(self):
+		client = APIClient()
+		client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.token}')
+		self.assertEqual(client.get('/api/v1/photos/').status_code, status.HTTP_200_OK)
+		self.user.is_active = False
+		self.user.save()
+		self.assertEqual(client.get('/api/v1/photos/').status_code, status.HTTP_401_UNAUTHORIZED)